@@ -0,0 +1,111 @@
+"""
+Liaison des ingrédients parsés vers des ressources DBpedia
+Utilise un automate Aho-Corasick construit une seule fois sur les libellés de
+tous les liens dbo:wikiPageWikiLink, pour trouver en un seul passage les
+ressources mentionnées dans le nom d'un ingrédient
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import re
+import unicodedata
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents and collapse non-alphanumeric runs to single spaces"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^a-z0-9]+', ' ', text.lower())
+    return text.strip()
+
+
+def resource_label(uri: str) -> str:
+    """Derive a folded label from a DBpedia resource URI (ex: Lime_(fruit) -> "lime")"""
+    local_name = uri.rstrip('/').split('/')[-1]
+    local_name = re.sub(r'\([^)]*\)', '', local_name)
+    return fold_text(local_name.replace('_', ' '))
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher (Aho-Corasick automaton)"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            if ch not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][ch] = len(self.goto) - 1
+            state = self.goto[state][ch]
+        if pattern not in self.output[state]:
+            self.output[state].append(pattern)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Return (end_index, pattern) for every pattern occurrence in the text"""
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for pattern in self.output[state]:
+                matches.append((i, pattern))
+        return matches
+
+
+class IngredientLinker:
+    """
+    Lie les noms d'ingrédients aux ressources DBpedia liées depuis un cocktail
+
+    L'automate est construit une fois sur les libellés de toutes les ressources;
+    chaque lien est ensuite restreint à celles présentes dans dbo:wikiPageWikiLink
+    du cocktail concerné.
+    """
+
+    def __init__(self, resource_uris: Iterable[str]):
+        self.resources_by_label: Dict[str, Set[str]] = {}
+        for uri in resource_uris:
+            label = resource_label(uri)
+            if len(label) > 1:
+                self.resources_by_label.setdefault(label, set()).add(uri)
+        self.matcher = AhoCorasick(self.resources_by_label.keys())
+
+    def link(self, ingredient_name: str, candidate_uris: Set[str]) -> Optional[str]:
+        """
+        Return the DBpedia URI best matching an ingredient name among the candidates
+
+        Only whole-word matches are kept and the longest label wins
+        (ex: "sweet vermouth" -> Sweet_vermouth rather than Vermouth).
+        """
+        text = f" {fold_text(ingredient_name)} "
+        best_uri, best_length = None, 0
+        for end, label in self.matcher.find_all(text):
+            start = end - len(label) + 1
+            if text[start - 1] != ' ' or text[end + 1] != ' ' or len(label) <= best_length:
+                continue
+            uris = sorted(self.resources_by_label[label] & candidate_uris)
+            if uris:
+                best_uri, best_length = uris[0], len(label)
+        return best_uri
@@ -0,0 +1,245 @@
+"""
+Matrice d'incidence creuse cocktails × ingrédients
+Construite une seule fois pour une liste de cocktails (celle du parser pour une
+version des données) et partagée par les services: faisabilité, optimiseur,
+planner et similarité s'expriment alors en opérations NumPy/SciPy vectorisées
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from backend.models.cocktail import Cocktail
+
+# Number of partners precomputed per ingredient, and the available rankings
+PAIRS_TOP_K = 20
+PAIR_RANKINGS = ('count', 'lift')
+# Number of Jaccard neighbours precomputed per cocktail, and rows per sparse product
+JACCARD_TOP_K = 20
+JACCARD_CHUNK_ROWS = 1024
+
+
+class IncidenceMatrix:
+    """
+    Binary CSR matrix M (n_cocktails × n_ingredients) with M[c, i] = 1 when cocktail c
+    uses ingredient i. Rows follow the order of the cocktail list; ingredient columns
+    are keyed by their canonical URI when the parser linked one, by lowercased name otherwise.
+    """
+
+    def __init__(self, cocktails: Sequence[Cocktail]):
+        self.cocktails: List[Cocktail] = list(cocktails)
+        self.cocktail_index: Dict[str, int] = {}
+        self.ingredient_ids: List[str] = []
+        self.ingredient_names: List[str] = []
+        self.ingredient_index: Dict[str, int] = {}
+        self._columns_by_name: Dict[str, int] = {}
+
+        rows, cols = [], []
+        for row, cocktail in enumerate(self.cocktails):
+            self.cocktail_index.setdefault(cocktail.id, row)
+            names = cocktail.parsed_ingredients or []
+            uris = cocktail.ingredient_uris if cocktail.ingredient_uris and len(cocktail.ingredient_uris) == len(names) else None
+            for position, name in enumerate(names):
+                col = self._column(uris[position] if uris else name.lower().strip(), name)
+                rows.append(row)
+                cols.append(col)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(self.cocktails), len(self.ingredient_ids))
+        )
+        # Duplicate (cocktail, ingredient) pairs are summed by SciPy, clamp back to 1
+        matrix.data[:] = 1.0
+        matrix.sort_indices()
+        self.matrix: sparse.csr_matrix = matrix
+        self.sizes: np.ndarray = np.diff(matrix.indptr)
+        self._by_ingredient: Optional[sparse.csr_matrix] = None
+        self._pairs: Optional[Dict[str, List[List[Dict[str, Any]]]]] = None
+        self._jaccard_neighbors: Optional[List[List[Tuple[int, float]]]] = None
+        # Guards the structures above, filled on first use by concurrent requests
+        # (reentrant: the pair computation reads by_ingredient)
+        self._lazy_lock = threading.RLock()
+
+    def _column(self, key: str, name: str) -> int:
+        col = self.ingredient_index.get(key)
+        if col is None:
+            col = len(self.ingredient_ids)
+            self.ingredient_index[key] = col
+            self.ingredient_ids.append(key)
+            self.ingredient_names.append(name)
+        self._columns_by_name.setdefault(name.lower().strip(), col)
+        return col
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def by_ingredient(self) -> sparse.csr_matrix:
+        """Transposed matrix (ingredients × cocktails), built on first use"""
+        with self._lazy_lock:
+            if self._by_ingredient is None:
+                self._by_ingredient = self.matrix.T.tocsr()
+            return self._by_ingredient
+
+    def column(self, ingredient: str) -> Optional[int]:
+        """Column of an ingredient given by id (URI) or by name (case-insensitive)"""
+        col = self.ingredient_index.get(ingredient)
+        if col is None:
+            col = self._columns_by_name.get(ingredient.lower().strip())
+        return col
+
+    def ingredients_of(self, row: int) -> np.ndarray:
+        """Columns of the ingredients of a cocktail row"""
+        return self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+
+    def cocktails_with(self, col: int) -> np.ndarray:
+        """Rows of the cocktails using an ingredient column"""
+        by_ingredient = self.by_ingredient
+        return by_ingredient.indices[by_ingredient.indptr[col]:by_ingredient.indptr[col + 1]]
+
+    def ingredient_vector(self, ingredients: Iterable[str]) -> np.ndarray:
+        """Indicator vector over ingredient columns; unknown ingredients are ignored"""
+        vector = np.zeros(len(self.ingredient_ids), dtype=np.float32)
+        for ingredient in ingredients:
+            col = self.column(ingredient)
+            if col is not None:
+                vector[col] = 1.0
+        return vector
+
+    def missing_counts(self, available: np.ndarray) -> np.ndarray:
+        """Number of ingredients each cocktail still needs given an availability vector"""
+        return self.sizes - np.rint(self.matrix @ available).astype(self.sizes.dtype)
+
+    def similar_cocktails(self, row: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Return (row, Jaccard score) of the cocktails sharing the most ingredients with a row,
+        best first (ties in catalog order). Cocktails without common ingredient are skipped.
+        The top JACCARD_TOP_K neighbours of every cocktail are precomputed on first call;
+        larger limits are computed for this row only.
+        """
+        if limit > JACCARD_TOP_K:
+            return self._jaccard_rows(np.array([row]), limit)[0]
+        with self._lazy_lock:
+            if self._jaccard_neighbors is None:
+                neighbors = []
+                for start in range(0, self.shape[0], JACCARD_CHUNK_ROWS):
+                    rows = np.arange(start, min(start + JACCARD_CHUNK_ROWS, self.shape[0]))
+                    neighbors.extend(self._jaccard_rows(rows, JACCARD_TOP_K))
+                self._jaccard_neighbors = neighbors
+            return self._jaccard_neighbors[row][:limit]
+
+    def _jaccard_rows(self, rows: np.ndarray, limit: int) -> List[List[Tuple[int, float]]]:
+        """
+        Jaccard = |A ∩ B| / (|A| + |B| - |A ∩ B|) for a block of rows against every cocktail;
+        the intersections are the non-zeros of one sparse product M[rows] · Mᵀ.
+        """
+        intersections = (self.matrix[rows] @ self.matrix.T).tocsr()
+        neighbors = []
+        for position, row in enumerate(rows):
+            start, end = intersections.indptr[position], intersections.indptr[position + 1]
+            others = intersections.indices[start:end]
+            counts = intersections.data[start:end]
+            keep = others != row
+            others, counts = others[keep], counts[keep]
+            scores = counts / (self.sizes[row] + self.sizes[others] - counts)
+            if len(scores) > limit:
+                # Keep every candidate tied with the limit-th best score so ties stay in catalog order
+                threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+                candidates = np.flatnonzero(scores >= threshold)
+                others, scores = others[candidates], scores[candidates]
+            order = np.lexsort((others, -scores))[:limit]
+            neighbors.append([(int(others[i]), float(scores[i])) for i in order])
+        return neighbors
+
+    def top_pairs(self, ingredient: str, limit: int = 10,
+                  sort_by: str = 'count') -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the ingredients most often used together with an ingredient (id or name).
+        Partners are precomputed on first call, ranked by co-occurrence count or by lift;
+        returns None for an unknown ingredient.
+        """
+        if sort_by not in PAIR_RANKINGS:
+            raise ValueError(f"Unknown ranking '{sort_by}', expected one of {list(PAIR_RANKINGS)}")
+        col = self.column(ingredient)
+        if col is None:
+            return None
+        with self._lazy_lock:
+            if self._pairs is None:
+                self._pairs = self._compute_pairs()
+            return self._pairs[sort_by][col][:limit]
+
+    def _compute_pairs(self) -> Dict[str, List[List[Dict[str, Any]]]]:
+        """
+        Co-occurrence C = IᵀI: C[i, j] counts the cocktails using both i and j and the
+        diagonal holds each ingredient's support. lift = C[i, j]·n / (C[i, i]·C[j, j]) with n
+        the number of cocktails having ingredients, and pmi = log2(lift).
+        """
+        cooccurrence = (self.by_ingredient @ self.matrix).tocsr()
+        support = cooccurrence.diagonal()
+        n_cocktails = max(int(np.count_nonzero(self.sizes)), 1)
+
+        pairs = {ranking: [] for ranking in PAIR_RANKINGS}
+        for col in range(cooccurrence.shape[0]):
+            start, end = cooccurrence.indptr[col], cooccurrence.indptr[col + 1]
+            partners = cooccurrence.indices[start:end]
+            counts = cooccurrence.data[start:end]
+            keep = partners != col
+            partners, counts = partners[keep], counts[keep]
+            lifts = counts * n_cocktails / (support[col] * support[partners])
+
+            by_count = np.lexsort((partners, -lifts, -counts))[:PAIRS_TOP_K]
+            by_lift = np.lexsort((partners, -counts, -lifts))[:PAIRS_TOP_K]
+            for ranking, order in (('count', by_count), ('lift', by_lift)):
+                pairs[ranking].append([
+                    {
+                        'id': self.ingredient_ids[partners[i]],
+                        'name': self.ingredient_names[partners[i]],
+                        'count': int(counts[i]),
+                        'lift': round(float(lifts[i]), 4),
+                        'pmi': round(float(np.log2(lifts[i])), 4)
+                    }
+                    for i in order
+                ])
+        return pairs
+
+
+# Matrix of the last list seen, keyed by data version (parser catalog) or content fingerprint
+_cache: Dict[str, IncidenceMatrix] = {}
+_lock = threading.Lock()
+
+
+def _fingerprint(cocktails: Sequence[Cocktail]) -> str:
+    """Fingerprint of what the matrix is built from: ids, ingredient names and URIs, in order"""
+    digest = hashlib.sha1()
+    for cocktail in cocktails:
+        digest.update(repr((cocktail.id, cocktail.parsed_ingredients, cocktail.ingredient_uris)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def get_incidence(cocktails: Optional[Sequence[Cocktail]] = None) -> IncidenceMatrix:
+    """
+    Return the incidence matrix of a cocktail list (the parser's catalog by default)
+
+    The catalog matrix is cached under the data version, so it is built once per version
+    of the TTL file; any other list is cached under a fingerprint of its contents. Only
+    the last matrix is kept.
+    """
+    from backend.data.ttl_parser import get_all_cocktails, get_data_version
+    catalog = get_all_cocktails()
+    if cocktails is None or cocktails is catalog:
+        cocktails, key = catalog, f"catalog:{get_data_version()}"
+    else:
+        key = f"list:{_fingerprint(cocktails)}"
+    with _lock:
+        incidence = _cache.get(key)
+        if incidence is None:
+            incidence = IncidenceMatrix(cocktails)
+            _cache.clear()
+            _cache[key] = incidence
+            print(f"Incidence matrix built: {incidence.shape[0]} cocktails x {incidence.shape[1]} ingredients, "
+                  f"{incidence.matrix.nnz} links")
+        return incidence
@@ -0,0 +1,88 @@
+"""
+Index plein texte des littéraux du graphe RDF
+Découpe chaque littéral (en minuscules) en trigrammes pour retrouver rapidement
+les littéraux susceptibles de contenir un terme, sans rescanner tout le graphe
+"""
+
+from rdflib import Graph, Literal
+from typing import Dict, List, Set, Tuple
+import threading
+import weakref
+
+NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    """Return the set of character trigrams of an already lowercased string"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class LiteralTextIndex:
+    """Inverted trigram index over every literal object of a graph"""
+
+    def __init__(self, graph: Graph):
+        self.literals: List[Literal] = []
+        self.postings: Dict[str, Set[int]] = {}
+        self.version = len(graph)
+        self._build(graph)
+
+    def _build(self, graph: Graph):
+        seen = set()
+        for obj in graph.objects():
+            if not isinstance(obj, Literal) or obj in seen:
+                continue
+            seen.add(obj)
+            literal_id = len(self.literals)
+            self.literals.append(obj)
+            for gram in _ngrams(str(obj).lower()):
+                self.postings.setdefault(gram, set()).add(literal_id)
+
+    def can_lookup(self, term: str) -> bool:
+        """A term can be looked up only if it has at least one trigram"""
+        return len(term) >= NGRAM_SIZE
+
+    def candidates(self, term: str) -> List[Literal]:
+        """
+        Return every literal whose lowercased text may contain the term (case-insensitive)
+
+        The result is a superset of the exact matches: it holds all literals that
+        contain every trigram of the term, so callers must keep their own check.
+        """
+        grams = sorted(_ngrams(term.lower()), key=lambda g: len(self.postings.get(g, ())))
+        if not grams:
+            return list(self.literals)
+
+        ids = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not ids:
+                break
+            ids &= self.postings.get(gram, set())
+        return [self.literals[i] for i in sorted(ids)]
+
+
+# id(graph) -> (weak reference to the graph, its index); the reference tells a live graph
+# from a new one reusing the id, and its callback drops the entry once the graph is collected
+_indexes: Dict[int, Tuple[weakref.ref, LiteralTextIndex]] = {}
+_lock = threading.Lock()
+
+
+def _forget(key: int, ref: weakref.ref):
+    # Called by the garbage collector, possibly while _lock is held: no locking here
+    entry = _indexes.get(key)
+    if entry is not None and entry[0] is ref:
+        _indexes.pop(key, None)
+
+
+def get_text_index(graph: Graph) -> LiteralTextIndex:
+    """
+    Return the shared text index of a graph, rebuilt when its triple count changes
+    """
+    key = id(graph)
+    with _lock:
+        entry = _indexes.get(key)
+        index = entry[1] if entry is not None and entry[0]() is graph else None
+        if index is None or index.version != len(graph):
+            index = LiteralTextIndex(graph)
+            _indexes[key] = (weakref.ref(graph, lambda ref: _forget(key, ref)), index)
+            print(f"Text index built: {len(index.literals)} literals, {len(index.postings)} trigrams")
+        return index
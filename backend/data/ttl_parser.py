@@ -13,11 +13,14 @@ sys.path.insert(0, str(backend_path.resolve()))
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS
 from typing import List, Dict, Any, Optional, Set
+from collections import Counter
+import hashlib
 import os
 import re
 
 from backend.models.cocktail import Cocktail
 from backend.models.ingredient import Ingredient
+from backend.data.entity_linker import IngredientLinker
 
 # Définition des namespaces DBpedia
 DBR = Namespace("http://dbpedia.org/resource/")
@@ -26,6 +29,10 @@ DBP = Namespace("http://dbpedia.org/property/")
 DCT = Namespace("http://purl.org/dc/terms/")
 FOAF = Namespace("http://xmlns.com/foaf/0.1/")
 
+# Namespaces MarmiTonic pour les triples dérivés (matérialisés au chargement)
+MARMI = Namespace("http://marmitonic.local/ontology/")
+INGREDIENT_BASE = "http://marmitonic.local/ingredient/"
+
 
 class IBADataParser:
     """Parser pour les données IBA en format Turtle avec extraction d'ingrédients"""
@@ -57,7 +64,11 @@ class IBADataParser:
         self.ttl_file_path = ttl_file_path
         self._ingredients_cache = None  # Cache pour les ingrédients dédupliqués
         self._cocktails_cache = None     # Cache pour les cocktails
+        self._dbpedia_links: Dict[str, str] = {}  # URI ingrédient -> ressource DBpedia liée
+        self.data_version = None  # Empreinte du fichier TTL, clé des structures dérivées
         self._load_data()
+        self._materialize_ingredient_triples()
+        self._link_ingredients()
         self._initialized = True
         print(f"IBADataParser initialized with {len(self.graph)} triples")
     
@@ -70,6 +81,11 @@ class IBADataParser:
         slug = slug.strip('-')
         return slug
     
+    @staticmethod
+    def ingredient_uri(normalized: str) -> str:
+        """Generate the MarmiTonic URI of an ingredient from its normalized name"""
+        return f"{INGREDIENT_BASE}{normalized.replace(' ', '_')}"
+    
     def _load_data(self):
         """Charge le fichier TTL dans le graph RDFLib"""
         import time
@@ -81,6 +97,7 @@ class IBADataParser:
             print(f"Loading TTL file: {file_path}...")
             start_time = time.time()
             self.graph.parse(str(file_path), format="turtle", encoding="utf-8")
+            self.data_version = hashlib.sha1(file_path.read_bytes()).hexdigest()[:16]
             load_time = time.time() - start_time
             print(f"Loaded {len(self.graph)} triples in {load_time:.3f}s")
         except FileNotFoundError:
@@ -90,6 +107,62 @@ class IBADataParser:
             print(f"Error loading file: {e}")
             raise
     
+    def _materialize_ingredient_triples(self):
+        """
+        Matérialise les ingrédients parsés sous forme de triples dérivés
+        
+        Pour chaque cocktail ayant un dbp:ingredients, ajoute:
+            ?cocktail marmitonic:hasIngredient ?ingredient .
+            ?ingredient a marmitonic:Ingredient ; rdfs:label "Nom"@en .
+        Les requêtes peuvent ainsi joindre sur des URIs au lieu de scanner le texte
+        brut avec FILTER(CONTAINS(LCASE(?ingredients), "...")).
+        """
+        self.graph.bind("marmitonic", MARMI)
+        
+        derived = []
+        for cocktail_ref, ingredients_text in self.graph.subject_objects(DBP.ingredients):
+            for ingredient_name in self._parse_ingredients_text(str(ingredients_text)):
+                normalized = self._normalize_ingredient_name(ingredient_name)
+                ingredient_ref = URIRef(self.ingredient_uri(normalized))
+                derived.append((cocktail_ref, MARMI.hasIngredient, ingredient_ref))
+                derived.append((ingredient_ref, RDF.type, MARMI.Ingredient))
+                derived.append((ingredient_ref, RDFS.label, Literal(normalized.title(), lang="en")))
+        
+        before = len(self.graph)
+        for triple in derived:
+            self.graph.add(triple)
+        print(f"Materialized {len(self.graph) - before} derived ingredient triples")
+    
+    def _link_ingredients(self):
+        """
+        Lie chaque ingrédient canonique à une ressource DBpedia
+        
+        Pour chaque cocktail, le nom de chaque ingrédient est comparé (Aho-Corasick)
+        aux libellés des ressources de son dbo:wikiPageWikiLink. La ressource la plus
+        souvent retenue sur l'ensemble des cocktails est gardée et matérialisée avec
+        rdfs:seeAlso sur l'URI de l'ingrédient.
+        """
+        links_by_cocktail = {}
+        for cocktail_ref, link in self.graph.subject_objects(DBO.wikiPageWikiLink):
+            links_by_cocktail.setdefault(cocktail_ref, set()).add(str(link))
+        
+        linker = IngredientLinker(set().union(*links_by_cocktail.values()) if links_by_cocktail else [])
+        
+        votes: Dict[str, Counter] = {}
+        for cocktail_ref, ingredients_text in self.graph.subject_objects(DBP.ingredients):
+            candidates = links_by_cocktail.get(cocktail_ref, set())
+            for ingredient_name in self._parse_ingredients_text(str(ingredients_text)):
+                normalized = self._normalize_ingredient_name(ingredient_name)
+                dbpedia_uri = linker.link(normalized, candidates)
+                if dbpedia_uri:
+                    votes.setdefault(self.ingredient_uri(normalized), Counter())[dbpedia_uri] += 1
+        
+        for ingredient_uri, counter in votes.items():
+            dbpedia_uri = counter.most_common(1)[0][0]
+            self._dbpedia_links[ingredient_uri] = dbpedia_uri
+            self.graph.add((URIRef(ingredient_uri), RDFS.seeAlso, URIRef(dbpedia_uri)))
+        print(f"Linked {len(self._dbpedia_links)} ingredients to DBpedia resources")
+    
     def _parse_ingredients_text(self, ingredients_text: str) -> List[str]:
         """
         Parse le texte des ingrédients pour extraire les noms
@@ -301,12 +374,15 @@ class IBADataParser:
             
             # Parser les ingrédients
             parsed_ingredients = []
+            ingredient_uris = []
             ingredients_raw = None
             if row.ingredients:
                 ingredients_raw = str(row.ingredients)
                 raw_ingredients = self._parse_ingredients_text(ingredients_raw)
                 # Normalize and Title Case for consistency
-                parsed_ingredients = [self._normalize_ingredient_name(ing).title() for ing in raw_ingredients]
+                normalized_ingredients = [self._normalize_ingredient_name(ing) for ing in raw_ingredients]
+                parsed_ingredients = [name.title() for name in normalized_ingredients]
+                ingredient_uris = [self.ingredient_uri(name) for name in normalized_ingredients]
             
             # Construire les labels multilingues
             labels = {}
@@ -338,6 +414,7 @@ class IBADataParser:
                 image=str(row.img) if row.img else None,
                 ingredients=ingredients_raw,
                 parsed_ingredients=parsed_ingredients,
+                ingredient_uris=ingredient_uris,
                 preparation=str(row.prep) if row.prep else None,
                 served=str(row.served) if row.served else None,
                 garnish=str(row.garnish) if row.garnish else None,
@@ -450,7 +527,7 @@ class IBADataParser:
         ingredient_list = []
         for normalized, data in ingredients_dict.items():
             # Créer un ID unique basé sur le nom normalisé
-            ingredient_id = f"http://marmitonic.local/ingredient/{normalized.replace(' ', '_')}"
+            ingredient_id = self.ingredient_uri(normalized)
             
             # Créer l'instance Ingredient
             ingredient = Ingredient(
@@ -458,7 +535,8 @@ class IBADataParser:
                 name=normalized.title(), # Use normalized name for consistency (e.g. "Dry Vermouth" -> "Vermouth")
                 description=f"Utilisé dans {data['count']} cocktails IBA",
                 categories=[f"Count:{data['count']}"],  # Stocker le count dans les catégories temporairement
-                related_concepts=data["cocktails"]  # Cocktails qui utilisent cet ingrédient
+                related_concepts=data["cocktails"],  # Cocktails qui utilisent cet ingrédient
+                dbpedia_uri=self._dbpedia_links.get(ingredient_id)
             )
             ingredient_list.append(ingredient)
         
@@ -595,6 +673,10 @@ def execute_sparql(query: str) -> List[Dict[str, Any]]:
     """Exécute une requête SPARQL"""
     return get_parser().execute_sparql(query)
 
+def get_data_version() -> str:
+    """Retourne l'empreinte des données chargées (clé des caches dérivés)"""
+    return get_parser().data_version
+
 
 if __name__ == "__main__":
     # Test du parser
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routes.cocktails import router as cocktails
+from backend.routes.cocktails import router as cocktails, similarity_service
 from backend.routes.ingredients import router as ingredients
 from backend.routes.planner import router as planner
 from backend.routes.llm import router as llm
@@ -8,6 +8,7 @@ from backend.routes.graphs import router as graphs
 from backend.utils.front_server import mount_frontend
 from backend.utils.graph_loader import get_shared_graph
 from backend.data.ttl_parser import get_all_cocktails, get_all_ingredients
+from backend.services.graph_service import GraphService
 from rdflib import Graph
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -30,6 +31,10 @@ async def lifespan(app: FastAPI):
     ingredients = get_all_ingredients()
     print(f"   Loaded {len(ingredients)} ingredients")
     
+    analysis = GraphService().analyze_graph()
+    if analysis:
+        print(f"   Detected {len(analysis['community_members'])} graph communities")
+    
     cache_time = time.time() - cache_start
     total_time = time.time() - start_time
     
@@ -40,6 +45,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("\nMarmiTonic API Shutting down...")
+    similarity_service.save_query_cache()
 
 app = FastAPI(lifespan=lifespan)
 
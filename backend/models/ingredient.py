@@ -12,6 +12,7 @@ class Ingredient(BaseModel):
     related_concepts: Optional[List[str]] = Field(None, description="Related concepts and ingredients")
     labels: Optional[Dict[str, str]] = Field(None, description="Multilingual labels")
     descriptions: Optional[Dict[str, str]] = Field(None, description="Multilingual descriptions")
+    dbpedia_uri: Optional[str] = Field(None, description="DBpedia resource linked to the ingredient")
 
     model_config = ConfigDict(
         json_encoders = {
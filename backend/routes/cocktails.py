@@ -1,12 +1,44 @@
 from fastapi import APIRouter, HTTPException, Query, Response
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from ..services.cocktail_service import CocktailService
-from ..services.similarity_service import SimilarityService
+from ..services.similarity_service import SimilarityService, SEARCH_MODES
 
 router = APIRouter()
 similarity_service = SimilarityService()
 cocktail_service = CocktailService()
 
+# Maximum number of queries accepted by one batched semantic search
+MAX_SEMANTIC_BATCH = 100
+
+class SemanticBatchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = Field(5, ge=1, le=20)
+    mode: str = "dense"
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    served: Optional[str] = None
+    category: Optional[str] = None
+    feasible_for: Optional[str] = None
+
+def similarity_filters(include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                       served: Optional[str] = None, category: Optional[str] = None,
+                       feasible_for: Optional[str] = None):
+    """Filters applied inside the vector search, or None when no filter is set"""
+    filters = {
+        "include_ingredients": include,
+        "exclude_ingredients": exclude,
+        "served": served,
+        "category": category,
+        "feasible_for": feasible_for
+    }
+    filters = {key: value for key, value in filters.items() if value}
+    return filters or None
+
+def check_search_mode(mode: str):
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown search mode '{mode}', expected one of {list(SEARCH_MODES)}")
+
 # Use a getter to ensure we can mock the cocktail service
 def get_cocktail_service():
     return cocktail_service
@@ -45,25 +77,72 @@ async def get_cocktails_by_ingredients(ingredients: List[str] = Query(..., descr
     
 # similarity endpoints
 @router.get("/similar/{cocktail_id}")
-async def get_similar_cocktails(cocktail_id: str, limit: int = Query(5, ge=1, le=20)):
+async def get_similar_cocktails(cocktail_id: str, limit: int = Query(5, ge=1, le=20),
+                                include: Optional[List[str]] = Query(None, description="Ingredients the results must all contain"),
+                                exclude: Optional[List[str]] = Query(None, description="Ingredients the results must not contain"),
+                                served: Optional[str] = Query(None), category: Optional[str] = Query(None),
+                                feasible_for: Optional[str] = Query(None, description="Only cocktails this user can make")):
+    filters = similarity_filters(include, exclude, served, category, feasible_for)
     try:
-        results = similarity_service.find_similar_cocktails(cocktail_id, top_k=limit)
+        results = similarity_service.find_similar_cocktails(cocktail_id, top_k=limit, filters=filters)
         return {"cocktail_id": cocktail_id, "similar_cocktails": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding similar cocktails: {str(e)}")
 
 @router.get("/search-semantic")
-async def search_cocktails_semantic(query: str = Query(...), top_k: int = Query(5, ge=1, le=20)):
+async def search_cocktails_semantic(query: str = Query(...), top_k: int = Query(5, ge=1, le=20),
+                                   mode: str = Query("dense", description="'dense' (embeddings) or 'hybrid' (BM25 + embeddings)"),
+                                   include: Optional[List[str]] = Query(None), exclude: Optional[List[str]] = Query(None),
+                                   served: Optional[str] = Query(None), category: Optional[str] = Query(None),
+                                   feasible_for: Optional[str] = Query(None)):
+    check_search_mode(mode)
+    filters = similarity_filters(include, exclude, served, category, feasible_for)
     try:
-        results = similarity_service.find_similar_by_text(query, top_k=top_k)
+        results = await similarity_service.find_similar_by_text_async(query, top_k=top_k, filters=filters, mode=mode)
         return {"query": query, "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in semantic search: {str(e)}")
 
+@router.post("/search-semantic/batch")
+def search_cocktails_semantic_batch(request: SemanticBatchRequest):
+    """
+    Semantic search for many queries at once: one model pass and one index search for the whole batch.
+    Declared sync: FastAPI runs the encoding and the search in its threadpool, off the event loop.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(request.queries) > MAX_SEMANTIC_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SEMANTIC_BATCH} queries per batch")
+    check_search_mode(request.mode)
+    try:
+        filters = similarity_filters(request.include, request.exclude, request.served, request.category,
+                                     request.feasible_for)
+        results = similarity_service.find_similar_by_texts(request.queries, top_k=request.top_k, filters=filters,
+                                                           mode=request.mode)
+        return {"results": [{"query": query, "results": query_results}
+                            for query, query_results in zip(request.queries, results)]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in semantic search: {str(e)}")
+
+@router.get("/search-semantic/stats")
+async def get_semantic_search_stats():
+    """Query embedding cache hit rate and micro-batching statistics"""
+    try:
+        return similarity_service.query_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving semantic search stats: {str(e)}")
+
 @router.get("/similar-by-ingredients")
-async def get_similar_by_ingredients(ingredients: List[str] = Query(...), top_k: int = Query(5, ge=1, le=20)):
+async def get_similar_by_ingredients(ingredients: List[str] = Query(...), top_k: int = Query(5, ge=1, le=20),
+                                     mode: str = Query("dense", description="'dense' (embeddings) or 'hybrid' (BM25 + embeddings)"),
+                                     include: Optional[List[str]] = Query(None), exclude: Optional[List[str]] = Query(None),
+                                     served: Optional[str] = Query(None), category: Optional[str] = Query(None),
+                                     feasible_for: Optional[str] = Query(None)):
+    check_search_mode(mode)
+    filters = similarity_filters(include, exclude, served, category, feasible_for)
     try:
-        results = similarity_service.find_similar_by_ingredients(ingredients, top_k=top_k)
+        results = await similarity_service.find_similar_by_ingredients_async(ingredients, top_k=top_k,
+                                                                             filters=filters, mode=mode)
         return {"ingredients": ingredients, "similar_cocktails": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding similar cocktails: {str(e)}")
@@ -1,49 +1,163 @@
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response
+from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
-from backend.services.graph_service import GraphService
+from backend.services.graph_service import GraphService, MAX_SUBGRAPH_NODES, SUBGRAPH_METRICS
+
+try:
+    import msgpack
+except ImportError:  # Binary payloads are optional, columnar JSON is served instead
+    msgpack = None
 
 router = APIRouter()
 
+# Compact graph payloads negotiated with the Accept header
+COLUMNAR_MEDIA_TYPE = "application/vnd.marmitonic.graph+json"
+MSGPACK_MEDIA_TYPES = ("application/x-msgpack", "application/msgpack")
+
+# Maximum time a request waits for a layout before answering without coordinates
+LAYOUT_WAIT_SECONDS = 1.0
+
 class SparqlGraphRequest(BaseModel):
     query: str
 
+def _graph_response(graph_data: Dict[str, Any], accept: str):
+    """
+    Serialize graph data according to the Accept header:
+    - MessagePack (columnar, binary) when requested and available
+    - columnar JSON (node table + integer-indexed links) for COLUMNAR_MEDIA_TYPE
+    - D3 nodes/links JSON otherwise
+    """
+    headers = {"Vary": "Accept"}
+    wants_msgpack = any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+    if wants_msgpack or COLUMNAR_MEDIA_TYPE in accept:
+        columnar = GraphService.to_columnar(graph_data)
+        if wants_msgpack and msgpack is not None:
+            return Response(content=msgpack.packb(columnar), media_type=MSGPACK_MEDIA_TYPES[0], headers=headers)
+        return JSONResponse(content=columnar, media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+
+    return JSONResponse(content={
+        'nodes': graph_data['nodes'],
+        'links': graph_data['edges']
+    }, headers=headers)
+
 @router.post("/sparql", response_model=Dict[str, Any])
-async def get_sparql_graph_post(request: SparqlGraphRequest):
+def get_sparql_graph_post(request: SparqlGraphRequest, http_request: Request,
+                          layout: bool = Query(False, description="Attach precomputed x/y positions to nodes")):
     """
     Return graph data directly from SPARQL query results.
     Accepts a custom SPARQL query in the body.
+    Send 'Accept: application/vnd.marmitonic.graph+json' (or application/x-msgpack)
+    to receive the compact columnar format.
+    With layout=true, nodes carry x/y positions in [-1, 1] computed server-side once
+    per data version and query; they are omitted while the layout is still computing.
+    Declared sync: FastAPI runs it in its threadpool, so waiting for the layout
+    never blocks the event loop.
+    """
+    service = GraphService()
+    try:
+        # Rows are streamed from the SPARQL cursor and assembled in the D3 shape
+        graph_data = service.get_graph_data(request.query, stream=True)
+        if not graph_data:
+            graph_data = {'nodes': [], 'edges': []}
+        elif layout:
+            positions = service.get_layout(graph_data, GraphService.query_fingerprint(request.query),
+                                           wait=LAYOUT_WAIT_SECONDS)
+            GraphService.attach_layout(graph_data, positions)
+
+        return _graph_response(graph_data, http_request.headers.get("accept", ""))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get SPARQL graph: {str(e)}")
+
+@router.get("/ego/{node_id:path}", response_model=Dict[str, Any])
+def get_ego_graph(node_id: str, http_request: Request,
+                  radius: int = Query(1, ge=1, le=3, description="Number of hops around the node"),
+                  max_nodes: int = Query(100, ge=1, le=MAX_SUBGRAPH_NODES)):
+    """
+    Return the k-hop neighbourhood of a cocktail (slug) or ingredient (URI).
+    Nodes carry the precomputed full-graph positions once they are available.
+    Declared sync: a cold graph build runs in FastAPI's threadpool.
+    """
+    service = GraphService()
+    try:
+        graph_data = service.get_ego_network(node_id, radius=radius, max_nodes=max_nodes)
+        positions = service.get_full_layout() if graph_data else None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get ego graph: {str(e)}")
+    if graph_data is None:
+        raise HTTPException(status_code=404, detail=f"Node '{node_id}' not found in graph")
+    GraphService.attach_layout(graph_data, positions)
+    return _graph_response(graph_data, http_request.headers.get("accept", ""))
+
+@router.get("/top", response_model=Dict[str, Any])
+def get_top_graph(http_request: Request,
+                  n: int = Query(50, ge=1, le=MAX_SUBGRAPH_NODES, description="Number of nodes"),
+                  metric: str = Query("degree", description="Ranking: degree or betweenness")):
+    """
+    Return the subgraph induced by the N most central nodes of the cocktail-ingredient graph.
+    Declared sync: a cold graph build and centrality ranking run in FastAPI's threadpool.
     """
+    if metric not in SUBGRAPH_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric '{metric}', expected one of {sorted(SUBGRAPH_METRICS)}")
     service = GraphService()
     try:
-        # Pass the query to GraphService which now supports flexible parsing
-        graph_data = service.get_graph_data(request.query)
+        graph_data = service.get_top_subgraph(limit=n, metric=metric)
         if not graph_data:
-            return {"nodes": [], "links": []}
-        
-        # Convert to D3.js compatible format
-        d3_format = {
-            'nodes': [],
-            'links': []
+            graph_data = {'nodes': [], 'edges': []}
+        GraphService.attach_layout(graph_data, service.get_full_layout())
+        return _graph_response(graph_data, http_request.headers.get("accept", ""))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get top graph: {str(e)}")
+
+@router.get("/communities", response_model=Dict[str, Any])
+def get_community_overview():
+    """
+    Return the community-collapsed overview: one node per community (with its size)
+    and inter-community links weighted by the number of edges between them.
+    Declared sync: community detection on a cold data version runs in FastAPI's threadpool.
+    """
+    service = GraphService()
+    try:
+        overview = service.get_community_overview()
+        if not overview:
+            return {'nodes': [], 'links': [], 'modularity': 0.0}
+        return {
+            'nodes': overview['nodes'],
+            'links': overview['edges'],
+            'modularity': overview['modularity']
         }
-        
-        # Process nodes
-        for node in graph_data['nodes']:
-            d3_format['nodes'].append({
-                'id': node['id'],
-                'name': node['name'],
-                'type': node['type']
-            })
-        
-        # Process edges as links
-        # Note: edges in service were dicts with source, target
-        for edge in graph_data['edges']:
-            d3_format['links'].append({
-                'source': edge['source'],
-                'target': edge['target'],
-                'value': 1  # Default weight
-            })
-        
-        return d3_format
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get SPARQL graph: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get community overview: {str(e)}")
+
+@router.get("/communities/{community_id}", response_model=Dict[str, Any])
+def get_community_graph(community_id: int, http_request: Request,
+                        max_nodes: int = Query(MAX_SUBGRAPH_NODES, ge=1, le=MAX_SUBGRAPH_NODES)):
+    """
+    Expand one community of the overview into its cocktails and ingredients.
+    Declared sync so a cold community detection runs in FastAPI's threadpool.
+    """
+    service = GraphService()
+    try:
+        graph_data = service.get_community_subgraph(community_id, max_nodes=max_nodes)
+        positions = service.get_full_layout() if graph_data else None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get community graph: {str(e)}")
+    if graph_data is None:
+        raise HTTPException(status_code=404, detail=f"Community {community_id} not found")
+    GraphService.attach_layout(graph_data, positions)
+    return _graph_response(graph_data, http_request.headers.get("accept", ""))
+
+@router.get("/layout")
+def get_graph_layout():
+    """
+    Return precomputed positions of the full cocktail-ingredient graph.
+    'ready' is false while the background worker is still computing them.
+    Declared sync so the bounded wait for the layout runs in FastAPI's threadpool.
+    """
+    service = GraphService()
+    try:
+        positions = service.get_full_layout(wait=LAYOUT_WAIT_SECONDS)
+        return {"ready": positions is not None, "positions": positions or {}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get graph layout: {str(e)}")
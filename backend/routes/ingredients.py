@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List
 from ..services.ingredient_service import IngredientService
 from ..services.ingredient_optimizer_service import IngredientOptimizerService
+from ..data.incidence import PAIR_RANKINGS, PAIRS_TOP_K
 
 router = APIRouter()
 
@@ -52,4 +53,19 @@ async def optimize_ingredients(N: int = Query(..., description="Number of ingred
         result = optimizer_service.find_optimal_ingredients(N)
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to optimize ingredients: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to optimize ingredients: {str(e)}")
+
+@router.get("/{ingredient_id:path}/pairs")
+async def get_ingredient_pairs(ingredient_id: str,
+                               limit: int = Query(10, ge=1, le=PAIRS_TOP_K, description="Number of partners"),
+                               sort: str = Query("count", description="Ranking: count or lift")):
+    """Ingredients that most often appear alongside the given one (id or name), with lift and PMI"""
+    if sort not in PAIR_RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking '{sort}', expected one of {list(PAIR_RANKINGS)}")
+    try:
+        result = service.get_ingredient_pairs(ingredient_id, limit=limit, sort_by=sort)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve ingredient pairs: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Ingredient '{ingredient_id}' not found")
+    return result
@@ -0,0 +1,79 @@
+"""
+Index lexical BM25 (Okapi) des textes des cocktails
+Complète la recherche dense: un nom exact ou un ingrédient rare, peu marqués dans les
+embeddings, ressortent par correspondance de mots. Les poids BM25 sont précalculés dans
+une matrice creuse documents × termes: une requête coûte un produit matrice-vecteur.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from backend.services.embedding_backends import tokenize
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+
+class BM25Index:
+    """Index figé d'une liste de textes (la ligne i est le texte i)"""
+
+    def __init__(self, texts: Sequence[str], k1: float = DEFAULT_K1, b: float = DEFAULT_B, source=None):
+        # Objet indexé (liste de cocktails), pour savoir si l'index est encore à jour
+        self.source = source
+        self.vocabulary: Dict[str, int] = {}
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            for term, count in Counter(tokenize(text)).items():
+                indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        tf = sparse.csr_matrix((np.array(counts, dtype=np.float32), np.array(indices, dtype=np.int64), indptr),
+                               shape=(len(texts), len(self.vocabulary)))
+        lengths = np.asarray(tf.sum(axis=1), dtype=np.float32).ravel()
+        average_length = float(lengths.mean()) if len(texts) and lengths.mean() > 0 else 1.0
+        document_frequency = np.bincount(tf.indices, minlength=len(self.vocabulary))
+        idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+        row_lengths = np.repeat(lengths, np.diff(tf.indptr))
+        saturation = k1 * (1.0 - b + b * row_lengths / average_length)
+        weights = tf.data * (k1 + 1.0) / (tf.data + saturation) * idf[tf.indices]
+        self.matrix = sparse.csr_matrix((weights.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def scores(self, query: str) -> np.ndarray:
+        """Score BM25 de chaque texte (chaque terme de la requête compte une fois)"""
+        columns = {self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary}
+        if not columns:
+            return np.zeros(len(self), dtype=np.float32)
+        terms = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        terms[list(columns)] = 1.0
+        return self.matrix @ terms
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Lignes des k meilleurs textes (score > 0), restreintes au masque allowed, et leurs scores"""
+        scores = self.scores(query)
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0.0)
+        rows = np.flatnonzero(scores > 0)
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
+
+
+def reciprocal_rank_fusion(rankings: List[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fusion de classements par rang réciproque: score(d) = Σ 1 / (k + rang de d), rang à
+    partir de 1. Ne dépend que des rangs, donc pas des échelles (cosinus, BM25) des scores.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda entry: -entry[1])
@@ -1,6 +1,8 @@
 from .ingredient_service import IngredientService
 from ..models.cocktail import Cocktail
 from typing import List, Dict, Any, Optional
+import numpy as np
+from ..data.incidence import get_incidence
 from ..data.ttl_parser import (
     get_all_cocktails as get_local_cocktails,
     get_cocktails_by_ingredients as get_local_cocktails_by_ingredients,
@@ -35,38 +37,29 @@ class CocktailService:
 
     def get_feasible_cocktails(self, user_id: str) -> List[Cocktail]:
         """Get cocktails that can be made with the user's inventory"""
-        all_cocktails = self.get_all_cocktails()
-        # Ensure we're comparing normalized ingredient names
-        inventory = {ing.lower() for ing in self.ingredient_service.get_inventory(user_id)}
-        
-        feasible = []
-        for cocktail in all_cocktails:
-            if cocktail.parsed_ingredients:
-                # Use the robustly parsed ingredients from ttl_parser
-                cocktail_ingredients = {ing.lower() for ing in cocktail.parsed_ingredients}
-                
-                if cocktail_ingredients.issubset(inventory):
-                    feasible.append(cocktail)
-        
-        return feasible
+        incidence = get_incidence(self.get_all_cocktails())
+        # Inventory names are matched case-insensitively against the ingredient columns
+        available = incidence.ingredient_vector(self.ingredient_service.get_inventory(user_id))
+        missing = incidence.missing_counts(available)
+
+        feasible_rows = np.flatnonzero((incidence.sizes > 0) & (missing == 0))
+        return [incidence.cocktails[row] for row in feasible_rows]
 
     def get_almost_feasible_cocktails(self, user_id: str) -> List[Dict[str, Any]]:
         """Get cocktails that are almost feasible (missing 1-2 ingredients)"""
-        all_cocktails = self.get_all_cocktails()
-        inventory = {ing.lower() for ing in self.ingredient_service.get_inventory(user_id)}
-        
+        incidence = get_incidence(self.get_all_cocktails())
+        available = incidence.ingredient_vector(self.ingredient_service.get_inventory(user_id))
+        missing_counts = incidence.missing_counts(available)
+
         almost_feasible = []
-        for cocktail in all_cocktails:
-            if cocktail.parsed_ingredients:
-                cocktail_ingredients = {ing.lower() for ing in cocktail.parsed_ingredients}
-                missing = list(cocktail_ingredients - inventory)
-                
-                if 1 <= len(missing) <= 2:
-                    almost_feasible.append({
-                        "cocktail": cocktail,
-                        "missing": missing
-                    })
-        
+        for row in np.flatnonzero((missing_counts >= 1) & (missing_counts <= 2)):
+            missing = [incidence.ingredient_names[col].lower()
+                       for col in incidence.ingredients_of(row) if not available[col]]
+            almost_feasible.append({
+                "cocktail": incidence.cocktails[row],
+                "missing": missing
+            })
+
         return almost_feasible
 
     def get_cocktails_by_ingredients(self, ingredients: List[str]) -> List[Cocktail]:
@@ -79,130 +72,51 @@ class CocktailService:
 
     def get_similar_cocktails(self, cocktail_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get cocktails similar to the given cocktail based on ingredient overlap"""
-        all_cocktails = self.get_all_cocktails()
-
-        # Find the target cocktail
-        target_cocktail = None
-        for cocktail in all_cocktails:
-            if cocktail.id == cocktail_id:
-                target_cocktail = cocktail
-                break
-
-        if not target_cocktail or not target_cocktail.parsed_ingredients:
+        incidence = get_incidence(self.get_all_cocktails())
+        target = incidence.cocktail_index.get(cocktail_id)
+        if target is None:
             return []
 
-        target_ingredients = set(ing.lower() for ing in target_cocktail.parsed_ingredients)
-        similarities = []
-
-        for cocktail in all_cocktails:
-            if cocktail.id == cocktail_id or not cocktail.parsed_ingredients:
-                continue
-
-            cocktail_ingredients = set(ing.lower() for ing in cocktail.parsed_ingredients)
-            intersection = len(target_ingredients & cocktail_ingredients)
-            union = len(target_ingredients | cocktail_ingredients)
-
-            if union > 0:
-                similarity_score = intersection / union
-                similarities.append({
-                    "cocktail": cocktail,
-                    "similarity_score": similarity_score
-                })
-
-        # Sort by similarity score descending and return top limit
-        similarities.sort(key=lambda x: x["similarity_score"], reverse=True)
-        return similarities[:limit]
+        # Jaccard neighbours are precomputed once per catalog by the incidence matrix
+        return [
+            {"cocktail": incidence.cocktails[row], "similarity_score": score}
+            for row, score in incidence.similar_cocktails(target, limit)
+            if incidence.cocktails[row].id != cocktail_id
+        ]
 
     def get_same_vibe_cocktails(self, cocktail_id: str, limit: int = 10) -> List[Cocktail]:
         """Get cocktails in the same graph community/cluster as the given cocktail"""
         from .graph_service import GraphService  # Import locally to avoid circular imports
 
-        all_cocktails = self.get_all_cocktails()
-
-        # Find the target cocktail
-        target_cocktail = None
-        for cocktail in all_cocktails:
-            if cocktail.id == cocktail_id:
-                target_cocktail = cocktail
-                break
-
-        if not target_cocktail:
-            return []
-
-        # Get graph analysis with communities
-        graph_service = GraphService()
-        graph_data = graph_service.build_graph()
-        if not graph_data:
-            return []
-            
-        analysis = graph_service.analyze_graph(graph_data)
+        # Communities are precomputed once per data version by the graph service
+        analysis = GraphService().analyze_graph()
         if not analysis:
             return []
-            
-        communities = analysis.get('communities', {})
-
-        # Find the community of the target cocktail (using cocktail id, not name)
-        target_community = None
-        for node, community_id in communities.items():
-            if node == target_cocktail.id:
-                target_community = community_id
-                break
 
+        target_community = analysis['communities'].get(cocktail_id)
         if target_community is None:
             return []
 
-        # Find all cocktails in the same community
+        cocktails_by_id = {c.id: c for c in self.get_all_cocktails()}
+
+        # Members are ordered by centrality, ingredients are skipped
         same_vibe_cocktails = []
-        for cocktail in all_cocktails:
-            if cocktail.id != cocktail_id and cocktail.id in communities:
-                if communities[cocktail.id] == target_community:
-                    same_vibe_cocktails.append(cocktail)
+        for node in analysis['community_members'][target_community]:
+            if node != cocktail_id and node in cocktails_by_id:
+                same_vibe_cocktails.append(cocktails_by_id[node])
+                if len(same_vibe_cocktails) >= limit:
+                    break
 
-        # Return up to limit cocktails
-        return same_vibe_cocktails[:limit]
+        return same_vibe_cocktails
 
     def get_bridge_cocktails(self, limit: int = 10) -> List[Cocktail]:
         """Get cocktails that connect different communities (bridge cocktails)"""
         from .graph_service import GraphService  # Import locally to avoid circular imports
 
-        all_cocktails = self.get_all_cocktails()
-
-        # Get graph analysis with communities
-        graph_service = GraphService()
-        graph_data = graph_service.build_graph()
-        if not graph_data:
+        # Bridge scores are ranked once per data version by the graph service
+        bridge_scores = GraphService().get_bridge_scores(limit=limit)
+        if not bridge_scores:
             return []
-            
-        analysis = graph_service.analyze_graph(graph_data)
-        if not analysis:
-            return []
-            
-        communities = analysis.get('communities', {})
-
-        bridge_cocktails = []
-
-        for cocktail in all_cocktails:
-            if not cocktail.parsed_ingredients:
-                continue
-
-            # Collect communities of ingredients used in this cocktail
-            ingredient_communities = set()
-            for ingredient_name in cocktail.parsed_ingredients:
-                # Find ingredient ID by name (since graph nodes use ingredient IDs)
-                # First, get all ingredients to find matching ID
-                from .ingredient_service import IngredientService
-                ingredient_service = IngredientService()
-                ingredients = ingredient_service.get_all_ingredients()
-                
-                for ing in ingredients:
-                    if ing.name.lower() == ingredient_name.lower():
-                        if ing.id in communities:
-                            ingredient_communities.add(communities[ing.id])
-                        break
-
-            # If ingredients span more than one community, it's a bridge cocktail
-            if len(ingredient_communities) > 1:
-                bridge_cocktails.append(cocktail)
-
-        # Return up to limit bridge cocktails
-        return bridge_cocktails[:limit]
+
+        cocktails_by_id = {c.id: c for c in self.get_all_cocktails()}
+        return [cocktails_by_id[score['id']] for score in bridge_scores if score['id'] in cocktails_by_id]
@@ -0,0 +1,167 @@
+"""
+Backends d'embedding de SimilarityService
+Chaque backend expose encode(textes) -> matrice float32 et un model_id qui identifie ses
+vecteurs (empreintes de contenu, manifeste de l'index, cache des requêtes):
+    torch    modèle sentence-transformers sur PyTorch
+    onnx     même modèle exporté en ONNX int8 sur onnxruntime
+    lexical  vectoriseur par hachage en NumPy pur: aucun modèle à télécharger,
+             démarrage en quelques millisecondes, similarité lexicale approximative
+Les modèles sont chargés au premier encodage: importer le service ne charge rien.
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Type
+import re
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Modèles dont le tokenizer met le texte en minuscules: la casse ne change pas leurs embeddings
+UNCASED_MODELS = frozenset({
+    "sentence-transformers/all-MiniLM-L6-v2",
+    "sentence-transformers/all-MiniLM-L12-v2",
+})
+# Dimension du vectoriseur lexical (nombre de seaux de hachage)
+LEXICAL_FEATURES = 2048
+# Mots trop fréquents pour distinguer deux cocktails, y compris les libellés des textes indexés
+LEXICAL_STOPWORDS = frozenset("""
+    a an and au aux avec ce cocktail cocktails de des du en et for in la le les of on or ou par pour sur the to un une with
+    nom ingredients description noms alternatifs categories lies
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots normalisés (minuscules, sans accents), hors mots vides et lettres isolées"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [w for w in re.findall(r"[a-z0-9]+", text) if w not in LEXICAL_STOPWORDS and len(w) > 1]
+
+
+class EmbeddingBackend(ABC):
+    """Interface commune: name, model_id et encode(); chaque backend fournit _load()"""
+
+    name = ""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, artifacts_dir: Optional[Path] = None):
+        self.model_name = model_name
+        self.artifacts_dir = artifacts_dir
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return self.model_name
+
+    @property
+    def uncased(self) -> bool:
+        """Vrai si la casse du texte n'influe pas sur les embeddings"""
+        return self.model_name in UNCASED_MODELS
+
+    @property
+    def model(self):
+        """Modèle sous-jacent, chargé au premier accès"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    @abstractmethod
+    def _load(self):
+        """Charge le modèle sous-jacent (appelé une seule fois, au premier accès)"""
+
+    def encode(self, texts: Sequence[str], show_progress_bar: bool = False) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), show_progress_bar=show_progress_bar), dtype=np.float32)
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        print(f"Chargement du modèle {self.model_name}...")
+        return SentenceTransformer(self.model_name)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """Le modèle est exporté et contrôlé (parité avec torch) au premier chargement"""
+
+    name = "onnx"
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.model_name}@onnx-int8"
+
+    def _load(self):
+        from backend.services.onnx_embedding import OnnxEmbeddingModel, export_quantized_model
+        onnx_dir = Path(self.artifacts_dir) / "onnx" / self.model_name.replace("/", "__")
+        if not OnnxEmbeddingModel.is_exported(onnx_dir):
+            print(f"Export du modèle {self.model_name} en ONNX int8...")
+            export_quantized_model(self.model_name, onnx_dir)
+        return OnnxEmbeddingModel(onnx_dir)
+
+
+class LexicalBackend(EmbeddingBackend):
+    """
+    Vectoriseur par hachage (sans état): mots, paires de mots consécutifs et trigrammes de
+    caractères, poids 1 + log(tf), signe alterné par hachage pour compenser les collisions.
+    Sans IDF, les vecteurs d'un texte ne dépendent pas du reste du catalogue, ce qui garde
+    l'index incrémental valide.
+    """
+
+    name = "lexical"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, artifacts_dir: Optional[Path] = None,
+                 n_features: int = LEXICAL_FEATURES):
+        super().__init__(model_name, artifacts_dir)
+        self.n_features = n_features
+
+    @property
+    def model_id(self) -> str:
+        return f"lexical-hashing-{self.n_features}"
+
+    @property
+    def uncased(self) -> bool:
+        return True
+
+    def _load(self):
+        return self
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        words = tokenize(text)
+        tokens = list(words)
+        tokens.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            tokens.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return tokens
+
+    def encode(self, texts: Sequence[str], show_progress_bar: bool = False) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.array([zlib.crc32(token.encode('utf-8')) for token in self._tokens(text)], dtype=np.int64)
+            if not len(hashes):
+                continue
+            buckets, counts = np.unique(hashes, return_counts=True)
+            signs = np.where(buckets & (1 << 31), -1.0, 1.0)
+            np.add.at(vectors[row], buckets % self.n_features, signs * (1.0 + np.log(counts)))
+        return vectors
+
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    LexicalBackend.name: LexicalBackend,
+}
+
+
+def create_backend(name: str, model_name: str = DEFAULT_MODEL_NAME,
+                   artifacts_dir: Optional[Path] = None) -> EmbeddingBackend:
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Backend d'embedding inconnu '{name}', attendu parmi {list(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[name](model_name, artifacts_dir)
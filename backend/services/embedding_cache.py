@@ -0,0 +1,109 @@
+"""
+Cache LRU des embeddings de requêtes texte
+Les requêtes fréquentes ("fruité", "rafraîchissant", combinaisons d'ingrédients) ne
+repassent plus par le modèle: texte normalisé -> vecteur normalisé, borné en taille,
+avec compteurs de hits et sauvegarde optionnelle sur disque.
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_QUERY_CACHE_SIZE = 1024
+
+
+class EmbeddingLRUCache:
+    """
+    LRU thread-safe (le modèle tourne dans le thread du QueryBatcher), propre à un modèle.
+    lowercase n'est vrai que pour un modèle insensible à la casse: "Gin" et "gin" y ont
+    le même embedding et partagent une entrée.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_QUERY_CACHE_SIZE, model_name: str = "", lowercase: bool = False):
+        self.max_size = max_size
+        self.model_name = model_name
+        self.lowercase = lowercase
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def normalize(self, text: str) -> str:
+        """Clé du cache: espaces normalisés, et casse ignorée si le modèle l'ignore"""
+        key = " ".join(text.split())
+        return key.lower() if self.lowercase else key
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.normalize(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def set(self, text: str, vector: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        key = self.normalize(text)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def save(self, path: Path) -> None:
+        """Sauvegarde les entrées (des plus anciennes aux plus récentes) dans un .npz"""
+        with self._lock:
+            texts = list(self._entries.keys())
+            vectors = list(self._entries.values())
+        if not texts:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, model_name=np.array(self.model_name), lowercase=np.array(self.lowercase),
+                     texts=np.array(texts), vectors=np.stack(vectors).astype(np.float32))
+        os.replace(tmp_path, path)
+
+    def load(self, path: Path) -> bool:
+        """Recharge un cache sauvegardé pour le même modèle et les mêmes clés; renvoie False sinon"""
+        if not path.exists():
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if str(stored["model_name"]) != self.model_name:
+                    return False
+                # Les caches antérieurs à l'option avaient toujours des clés en minuscules
+                lowercase = bool(stored["lowercase"]) if "lowercase" in stored.files else True
+                if lowercase != self.lowercase:
+                    return False
+                texts, vectors = stored["texts"], stored["vectors"]
+                for text, vector in zip(texts[-self.max_size:], vectors[-self.max_size:]):
+                    self.set(str(text), vector)
+            return True
+        except Exception as e:
+            print(f"Erreur chargement du cache de requêtes: {e}")
+            return False
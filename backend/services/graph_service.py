@@ -1,11 +1,30 @@
 import networkx as nx
-from typing import Dict, List, Any, Optional
+import hashlib
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, List, Any, Optional
 from backend.services.cocktail_service import CocktailService
 from backend.services.ingredient_service import IngredientService
 from backend.services.sparql_service import SparqlService
+from backend.utils.cache import SimpleCache
+from backend.data.ttl_parser import IBADataParser, get_data_version
+
+# Upper bound on the size of the subgraphs served for drill-down
+MAX_SUBGRAPH_NODES = 500
+# Node rankings available for top-N subgraphs
+SUBGRAPH_METRICS = {'degree': 'degree_centrality', 'betweenness': 'betweenness_centrality'}
 
 
 class GraphService:
+    # Cocktail-ingredient graph shared by all instances, keyed by data version
+    _graph_cache: Dict[str, Dict[str, Any]] = {}
+    _cache_lock = threading.Lock()
+    # Layout positions keyed by data version and query fingerprint, computed off the request path
+    _layout_cache = SimpleCache(ttl=24 * 3600, max_size=128)
+    _layout_jobs: Dict[str, Future] = {}
+    _layout_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graph-layout")
+
     def __init__(self):
         self.cocktail_service = CocktailService()
         self.ingredient_service = IngredientService()
@@ -15,182 +34,539 @@ class GraphService:
         """
         Build a graph from cocktail and ingredient data.
         Returns graph data in a format suitable for analysis and visualization.
+        The graph is built once per data version and shared by every caller,
+        so the returned dict must be treated as read-only.
         """
         try:
-            # Get all cocktails and ingredients
-            cocktails = self.cocktail_service.get_all_cocktails()
-            ingredients = self.ingredient_service.get_all_ingredients()
-            
-            # Build graph data structure
-            graph_data = {
-                'nodes': [],
-                'edges': []
-            }
-            
-            # Add cocktail nodes
-            cocktail_nodes = {}
-            for cocktail in cocktails:
-                if cocktail.id and cocktail.name:
-                    cocktail_nodes[cocktail.id] = {
-                        'id': cocktail.id,
-                        'name': cocktail.name,
-                        'type': 'cocktail'
-                    }
-                    graph_data['nodes'].append(cocktail_nodes[cocktail.id])
-            
-            # Add ingredient nodes
-            ingredient_nodes = {}
-            for ingredient in ingredients:
-                if ingredient.id and ingredient.name:
-                    ingredient_nodes[ingredient.id] = {
-                        'id': ingredient.id,
-                        'name': ingredient.name,
-                        'type': 'ingredient'
-                    }
-                    graph_data['nodes'].append(ingredient_nodes[ingredient.id])
-            
-            # Add edges between cocktails and their ingredients
-            for cocktail in cocktails:
-                if cocktail.id and hasattr(cocktail, 'parsed_ingredients') and cocktail.parsed_ingredients:
-                    for ingredient_name in cocktail.parsed_ingredients:
-                        # Find ingredient by name (simplified for testing)
-                        # Use case-insensitive matching and check for partial matches
-                        ing_name_lower = ingredient_name.lower().strip()
-                        for ingredient in ingredients:
-                            if ingredient.id and ingredient.name:
-                                target_name_lower = ingredient.name.lower().strip()
-                                if ing_name_lower == target_name_lower or \
-                                   ing_name_lower in target_name_lower or \
-                                   target_name_lower in ing_name_lower:
-                                    graph_data['edges'].append({
-                                        'source': cocktail.id,
-                                        'target': ingredient.id,
-                                        'type': 'cocktail_ingredient'
-                                    })
-                                    break
-            
-            return graph_data
-            
+            return self._get_cached_graph()['data']
         except Exception as e:
             print(f"Error building graph: {e}")
             raise Exception("Failed to build graph")
 
-    def get_graph_data(self, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def get_networkx_graph(self) -> nx.Graph:
+        """Return the shared NetworkX cocktail-ingredient graph for the current data version"""
+        return self._get_cached_graph()['graph']
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop the cached graph (it is rebuilt on next access)"""
+        with cls._cache_lock:
+            cls._graph_cache.clear()
+
+    def _get_cached_graph(self) -> Dict[str, Any]:
+        version = get_data_version()
+        with self._cache_lock:
+            cached = self._graph_cache.get(version)
+            if cached is None:
+                data = self._build_graph_data()
+                cached = {'data': data, 'graph': self.to_networkx_graph(data)}
+                # Only keep the current data version
+                self._graph_cache.clear()
+                self._graph_cache[version] = cached
+                print(f"Cocktail graph built for data version {version}: "
+                      f"{len(data['nodes'])} nodes, {len(data['edges'])} edges")
+            return cached
+
+    def analyze_graph(self, graph_data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Detect communities and compute centralities of the cocktail-ingredient graph.
+        For the shared graph (graph_data omitted or returned by build_graph) the
+        analysis runs once per data version and is then served from cache.
+        Returns:
+            communities: node id -> community id
+            community_members: community id -> node ids, most central first
+            degree_centrality / betweenness_centrality: node id -> score
+            modularity: quality of the partition
+            bridge_scores: cocktails whose ingredients span several communities,
+                ranked by communities spanned, participation coefficient, betweenness
+        """
+        try:
+            cached = self._get_cached_graph()
+            if graph_data is not None and graph_data is not cached['data']:
+                return self._compute_analysis(self.to_networkx_graph(graph_data))
+
+            with self._cache_lock:
+                if 'analysis' not in cached:
+                    cached['analysis'] = self._compute_analysis(cached['graph'])
+                return cached['analysis']
+        except Exception as e:
+            print(f"Error analyzing graph: {e}")
+            return None
+
+    def get_node_community(self, node_id: str) -> Optional[int]:
+        """Return the precomputed community of a node (cocktail slug or ingredient id)"""
+        analysis = self.analyze_graph()
+        if not analysis:
+            return None
+        return analysis['communities'].get(node_id)
+
+    def get_bridge_scores(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the top entries of the precomputed bridge-cocktail ranking"""
+        analysis = self.analyze_graph()
+        if not analysis:
+            return []
+        return analysis['bridge_scores'][:limit]
+
+    def get_ego_network(self, node_id: str, radius: int = 1,
+                        max_nodes: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Return the k-hop neighbourhood of a cocktail or ingredient of the shared graph.
+        Nodes are visited breadth-first, closest hops first and most connected first
+        within a hop, until max_nodes is reached. Returns None for an unknown node.
+        """
+        graph = self.get_networkx_graph()
+        if node_id not in graph:
+            return None
+        max_nodes = max(1, min(max_nodes, MAX_SUBGRAPH_NODES))
+        adjacency = graph.adj
+
+        selected = {node_id}
+        frontier = [node_id]
+        for _ in range(radius):
+            next_frontier = {
+                neighbor for node in frontier for neighbor in adjacency[node] if neighbor not in selected
+            }
+            if not next_frontier:
+                break
+            ranked = sorted(next_frontier, key=lambda n: (-len(adjacency[n]), n))
+            ranked = ranked[:max_nodes - len(selected)]
+            selected.update(ranked)
+            frontier = ranked
+            if len(selected) >= max_nodes:
+                break
+
+        return self._subgraph_data(graph, [node_id] + sorted(selected - {node_id}))
+
+    def get_top_subgraph(self, limit: int = 50, metric: str = 'degree') -> Optional[Dict[str, Any]]:
+        """
+        Return the subgraph induced by the `limit` most central nodes of the shared graph.
+        metric is 'degree' or 'betweenness' (precomputed by analyze_graph).
+        """
+        if metric not in SUBGRAPH_METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {sorted(SUBGRAPH_METRICS)}")
+        analysis = self.analyze_graph()
+        if analysis is None:
+            return None
+        scores = analysis[SUBGRAPH_METRICS[metric]]
+        limit = max(1, min(limit, MAX_SUBGRAPH_NODES))
+        top_nodes = sorted(scores, key=lambda n: (-scores[n], n))[:limit]
+        return self._subgraph_data(self.get_networkx_graph(), top_nodes)
+
+    def get_community_overview(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the community-collapsed view of the shared graph: one supernode per
+        precomputed community and one edge per pair of connected communities, weighted
+        by the number of cocktail-ingredient edges between them. Cached per data version.
+        """
+        analysis = self.analyze_graph()
+        if analysis is None:
+            return None
+        cached = self._get_cached_graph()
+        with self._cache_lock:
+            if 'overview' not in cached:
+                cached['overview'] = self._compute_community_overview(cached['graph'], analysis)
+            return cached['overview']
+
+    def get_community_subgraph(self, community_id: int,
+                               max_nodes: int = MAX_SUBGRAPH_NODES) -> Optional[Dict[str, Any]]:
+        """
+        Expand a single community into its cocktails and ingredients (most central first,
+        at most max_nodes). Returns None for an unknown community.
+        """
+        analysis = self.analyze_graph()
+        if analysis is None or community_id not in analysis['community_members']:
+            return None
+        members = analysis['community_members'][community_id]
+        max_nodes = max(1, min(max_nodes, MAX_SUBGRAPH_NODES))
+        return self._subgraph_data(self.get_networkx_graph(), members[:max_nodes])
+
+    @staticmethod
+    def _compute_community_overview(graph: nx.Graph, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        communities = analysis['communities']
+        nodes = []
+        for community_id, members in analysis['community_members'].items():
+            types = [graph.nodes[member].get('type') for member in members]
+            # Name the supernode after its most central ingredients
+            labels = [graph.nodes[member].get('name') for member, node_type in zip(members, types)
+                      if node_type == 'ingredient'][:2] or [graph.nodes[members[0]].get('name')]
+            nodes.append({
+                'id': f"community:{community_id}",
+                'community': community_id,
+                'name': ' · '.join(labels),
+                'type': 'community',
+                'size': len(members),
+                'cocktails': types.count('cocktail'),
+                'ingredients': types.count('ingredient')
+            })
+
+        weights: Dict[tuple, int] = {}
+        for source, target in graph.edges():
+            pair = tuple(sorted((communities[source], communities[target])))
+            if pair[0] != pair[1]:
+                weights[pair] = weights.get(pair, 0) + 1
+
+        edges = [
+            {'source': f"community:{a}", 'target': f"community:{b}", 'value': weight}
+            for (a, b), weight in sorted(weights.items())
+        ]
+        return {'nodes': nodes, 'edges': edges, 'modularity': analysis['modularity']}
+
+    @staticmethod
+    def _subgraph_data(graph: nx.Graph, node_ids: List[str]) -> Dict[str, Any]:
+        """Build D3 graph data for the subgraph induced by node_ids (in the given order)"""
+        # Each undirected edge is emitted once, from its cocktail end when there is one
+        def edge_order(node_id):
+            return (graph.nodes[node_id].get('type') != 'cocktail', node_id)
+
+        selected = set(node_ids)
+        nodes = []
+        edges = []
+        for node_id in node_ids:
+            attributes = graph.nodes[node_id]
+            nodes.append({'id': node_id, 'name': attributes.get('name'), 'type': attributes.get('type')})
+            for neighbor in graph.adj[node_id]:
+                if neighbor in selected and edge_order(node_id) < edge_order(neighbor):
+                    edges.append({'source': node_id, 'target': neighbor, 'value': 1})
+        return {'nodes': nodes, 'edges': edges}
+
+    @staticmethod
+    def _compute_analysis(graph: nx.Graph) -> Dict[str, Any]:
+        if graph.number_of_nodes() == 0:
+            return {
+                'communities': {},
+                'community_members': {},
+                'degree_centrality': {},
+                'betweenness_centrality': {},
+                'modularity': 0.0,
+                'bridge_scores': []
+            }
+
+        # Louvain with a fixed seed so communities are stable for a given data version
+        partition = nx.community.louvain_communities(graph, seed=42)
+        partition = sorted(partition, key=lambda members: (-len(members), min(members)))
+
+        degree = nx.degree_centrality(graph)
+        # Sample pivots on large graphs, exact betweenness otherwise
+        sample_size = None if graph.number_of_nodes() <= 1000 else 500
+        betweenness = nx.betweenness_centrality(graph, k=sample_size, seed=42)
+
+        communities = {}
+        community_members = {}
+        for community_id, members in enumerate(partition):
+            community_members[community_id] = sorted(members, key=lambda n: (-degree[n], n))
+            for node in members:
+                communities[node] = community_id
+
+        return {
+            'communities': communities,
+            'community_members': community_members,
+            'degree_centrality': degree,
+            'betweenness_centrality': betweenness,
+            'modularity': nx.community.modularity(graph, partition),
+            'bridge_scores': GraphService._compute_bridge_scores(graph, communities, betweenness)
+        }
+
+    @staticmethod
+    def _compute_bridge_scores(graph: nx.Graph, communities: Dict[str, int],
+                               betweenness: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        Rank cocktails by how many ingredient communities they connect.
+        The participation coefficient is 1 - sum_s (k_s / k)^2 where k_s is the
+        number of ingredients of the cocktail that belong to community s.
+        """
+        scores = []
+        for node, attributes in graph.nodes(data=True):
+            if attributes.get('type') != 'cocktail':
+                continue
+            neighbors = list(graph.neighbors(node))
+            if not neighbors:
+                continue
+
+            per_community: Dict[int, int] = {}
+            for neighbor in neighbors:
+                community_id = communities[neighbor]
+                per_community[community_id] = per_community.get(community_id, 0) + 1
+            if len(per_community) < 2:
+                continue
+
+            degree = len(neighbors)
+            participation = 1.0 - sum((count / degree) ** 2 for count in per_community.values())
+            scores.append({
+                'id': node,
+                'communities_spanned': len(per_community),
+                'participation_coefficient': participation,
+                'betweenness': betweenness.get(node, 0.0)
+            })
+
+        scores.sort(key=lambda s: (-s['communities_spanned'], -s['participation_coefficient'],
+                                   -s['betweenness'], s['id']))
+        return scores
+
+    def _build_graph_data(self) -> Dict[str, Any]:
+        # Get all cocktails and ingredients
+        cocktails = self.cocktail_service.get_all_cocktails()
+        ingredients = self.ingredient_service.get_all_ingredients()
+        
+        # Build graph data structure
+        graph_data = {
+            'nodes': [],
+            'edges': []
+        }
+        
+        # Add cocktail nodes
+        cocktail_nodes = {}
+        for cocktail in cocktails:
+            if cocktail.id and cocktail.name:
+                cocktail_nodes[cocktail.id] = {
+                    'id': cocktail.id,
+                    'name': cocktail.name,
+                    'type': 'cocktail'
+                }
+                graph_data['nodes'].append(cocktail_nodes[cocktail.id])
+        
+        # Add ingredient nodes, indexed by id and by normalized name
+        ingredient_nodes = {}
+        ingredient_ids_by_name = {}
+        for ingredient in ingredients:
+            if ingredient.id and ingredient.name:
+                ingredient_nodes[ingredient.id] = {
+                    'id': ingredient.id,
+                    'name': ingredient.name,
+                    'type': 'ingredient'
+                }
+                ingredient_ids_by_name.setdefault(ingredient.name.lower().strip(), ingredient.id)
+                graph_data['nodes'].append(ingredient_nodes[ingredient.id])
+        
+        # Add edges between cocktails and their ingredients
+        for cocktail in cocktails:
+            if cocktail.id not in cocktail_nodes or not cocktail.parsed_ingredients:
+                continue
+            # Prefer the canonical ids linked by the parser, fall back to a name lookup
+            ingredient_ids = cocktail.ingredient_uris or [
+                ingredient_ids_by_name.get(name.lower().strip()) for name in cocktail.parsed_ingredients
+            ]
+            seen = set()
+            for ingredient_id in ingredient_ids:
+                if ingredient_id in ingredient_nodes and ingredient_id not in seen:
+                    seen.add(ingredient_id)
+                    graph_data['edges'].append({
+                        'source': cocktail.id,
+                        'target': ingredient_id,
+                        'type': 'cocktail_ingredient'
+                    })
+        
+        return graph_data
+
+    def get_graph_data(self, query: Optional[str] = None, stream: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get graph data from SPARQL service and convert to graph format.
         Requires a query - no default fallback.
         Uses parsed ingredients from cocktails to create individual ingredient nodes.
+        Nodes ({id, name, type}) and edges ({source, target, value}) are already in
+        the D3 shape; edges are deduplicated with hashed (source, target) keys.
+        With stream=True, SELECT rows are consumed as the query evaluation produces
+        them (see SparqlService.iter_local_query) instead of being materialized first.
         """
         try:
             # Query data from SPARQL service
             if not query:
                 raise ValueError("No SPARQL query provided")
             
-            rows = self.sparql_service.execute_local_query(query)
+            if stream:
+                rows = self.sparql_service.iter_local_query(query)
+            else:
+                rows = self.sparql_service.execute_local_query(query)
             
-            if not rows:
+            if rows is None:
                 return None
             
-            # Build graph from query results
-            nodes = {}
-            edges = []
+            return self._assemble_graph(rows)
             
-            # Get all cocktails with parsed ingredients for enrichment
-            cocktails = self.cocktail_service.get_all_cocktails()
-            cocktails_by_uri = {c.uri: c for c in cocktails if hasattr(c, 'uri')}
+        except Exception as e:
+            print(f"Error getting graph data: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def _assemble_graph(self, rows: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Build nodes and edges from SPARQL rows in a single linear pass"""
+        nodes = {}   # raw value (or ingredient id) -> node, only cocktails and ingredients
+        edges = {}   # (source, target) -> edge, insertion ordered
+        
+        # Get all cocktails with parsed ingredients for enrichment
+        cocktails = self.cocktail_service.get_all_cocktails()
+        cocktails_by_uri = {c.uri: c for c in cocktails if hasattr(c, 'uri')}
+        
+        row_count = 0
+        for row in rows:
+            row_count += 1
+            row_values = []
+            cocktail_uri = None
+            cocktail_name_from_query = None
             
-            for row in rows:
-                row_values = []
-                cocktail_uri = None
-                cocktail_name_from_query = None
-                
-                for var_name, value_obj in row.items():
-                    val = value_obj['value']
-                    type_ = value_obj['type']
-                    
-                    # Track cocktail URI and name
-                    if var_name == 'cocktail':
-                        cocktail_uri = val
-                    elif var_name == 'name':
-                        cocktail_name_from_query = val
-                    
-                    if val not in nodes:
-                        # Use the name from query if available for better display
-                        node_name = val.split('/')[-1].replace('_', ' ') if type_ == 'uri' else val
-                        if var_name == 'cocktail' and cocktail_name_from_query:
-                            node_name = cocktail_name_from_query
-                        
-                        # For cocktails, get the slug ID from cocktail_service
-                        cocktail_id = val  # Default to URI
-                        if var_name == 'cocktail' and cocktail_uri in cocktails_by_uri:
-                            cocktail_id = cocktails_by_uri[cocktail_uri].id  # Use slug ID
-                        
-                        nodes[val] = {
-                            'id': cocktail_id if var_name == 'cocktail' else val,
-                            'uri': val if var_name == 'cocktail' else None,  # Keep URI for reference
-                            'name': node_name,
-                            'type': 'cocktail' if var_name == 'cocktail' else ('ingredient' if type_ == 'uri' else 'literal')
-                        }
-                    row_values.append(val)
+            for var_name, value_obj in row.items():
+                val = value_obj['value']
+                type_ = value_obj['type']
+                if val is None:
+                    continue  # Unbound OPTIONAL variable
                 
-                # Update cocktail node with proper name and ID if we got it from query
-                if cocktail_uri and cocktail_uri in nodes and cocktail_uri in cocktails_by_uri:
-                    nodes[cocktail_uri]['name'] = cocktail_name_from_query or nodes[cocktail_uri]['name']
-                    nodes[cocktail_uri]['id'] = cocktails_by_uri[cocktail_uri].id  # Ensure slug ID
+                # Track cocktail URI and name
+                if var_name == 'cocktail':
+                    cocktail_uri = val
+                elif var_name == 'name':
+                    cocktail_name_from_query = val
                 
-                # Create edges between cocktail and ingredients (use URI as key)
-                if len(row_values) > 1:
-                    source = row_values[0]
-                    for target in row_values[1:]:
-                        if source != target:
-                            edges.append({
-                                'source': cocktails_by_uri[source].id if source in cocktails_by_uri else source,
-                                'target': target
-                            })
-                
-                # Add parsed ingredients as individual nodes
-                if cocktail_uri and cocktail_uri in cocktails_by_uri:
-                    cocktail = cocktails_by_uri[cocktail_uri]
-                    if hasattr(cocktail, 'parsed_ingredients') and cocktail.parsed_ingredients:
-                        for ingredient_name in cocktail.parsed_ingredients:
-                            # Create unique ID for ingredient
-                            ingredient_id = f"ingredient:{ingredient_name.lower().replace(' ', '_')}"
-                            
-                            if ingredient_id not in nodes:
-                                nodes[ingredient_id] = {
-                                    'id': ingredient_id,
-                                    'name': ingredient_name,
-                                    'type': 'ingredient'
-                                }
-                            
-                            # Add edge from cocktail (using slug ID) to ingredient
-                            if not any(e['source'] == cocktail.id and e['target'] == ingredient_id for e in edges):
-                                edges.append({
-                                    'source': cocktail.id,  # Use slug ID
-                                    'target': ingredient_id
-                                })
-            
-            # Filter out literal nodes (text fields like dbp:ingredients raw text)
-            # Keep only cocktail and ingredient nodes
-            filtered_nodes = [node for node in nodes.values() if node['type'] in ['cocktail', 'ingredient']]
+                # Literal values (e.g. raw dbp:ingredients text) never become nodes
+                if val not in nodes and (var_name == 'cocktail' or type_ == 'uri'):
+                    if var_name == 'cocktail':
+                        # For cocktails, use the slug ID from cocktail_service when known
+                        node_name = cocktail_name_from_query or val.split('/')[-1].replace('_', ' ')
+                        node_id = cocktails_by_uri[val].id if val in cocktails_by_uri else val
+                        nodes[val] = {'id': node_id, 'name': node_name, 'type': 'cocktail'}
+                    else:
+                        nodes[val] = {'id': val, 'name': val.split('/')[-1].replace('_', ' '), 'type': 'ingredient'}
+                row_values.append(val)
             
-            # Filter edges to only those connecting filtered nodes
-            filtered_node_ids = {node['id'] for node in filtered_nodes}
-            filtered_edges = [
-                edge for edge in edges 
-                if edge['source'] in filtered_node_ids and edge['target'] in filtered_node_ids
-            ]
+            # Update cocktail node with proper name if we got it from query
+            if cocktail_uri and cocktail_uri in nodes and cocktail_name_from_query:
+                nodes[cocktail_uri]['name'] = cocktail_name_from_query
             
-            return {
-                'nodes': filtered_nodes,
-                'edges': filtered_edges
-            }
+            # Create edges between the first value and the others
+            if len(row_values) > 1:
+                source = row_values[0]
+                source_id = cocktails_by_uri[source].id if source in cocktails_by_uri else source
+                for target in row_values[1:]:
+                    if source != target and (source_id, target) not in edges:
+                        edges[(source_id, target)] = {'source': source_id, 'target': target, 'value': 1}
             
-        except Exception as e:
-            print(f"Error getting graph data: {e}")
-            import traceback
-            traceback.print_exc()
+            # Add parsed ingredients as individual nodes
+            cocktail = cocktails_by_uri.get(cocktail_uri) if cocktail_uri else None
+            if cocktail is not None and cocktail.parsed_ingredients:
+                ingredient_ids = cocktail.ingredient_uris or [
+                    IBADataParser.ingredient_uri(name.lower()) for name in cocktail.parsed_ingredients
+                ]
+                for ingredient_name, ingredient_id in zip(cocktail.parsed_ingredients, ingredient_ids):
+                    # Canonical ingredient ID linked at load time by the parser
+                    if ingredient_id not in nodes:
+                        nodes[ingredient_id] = {'id': ingredient_id, 'name': ingredient_name, 'type': 'ingredient'}
+                    if (cocktail.id, ingredient_id) not in edges:
+                        edges[(cocktail.id, ingredient_id)] = {'source': cocktail.id, 'target': ingredient_id, 'value': 1}
+        
+        if row_count == 0:
             return None
+        
+        # Keep only edges connecting two known nodes
+        node_ids = {node['id'] for node in nodes.values()}
+        return {
+            'nodes': list(nodes.values()),
+            'edges': [edge for key, edge in edges.items() if key[0] in node_ids and key[1] in node_ids]
+        }
+
+    @staticmethod
+    def query_fingerprint(query: str) -> str:
+        """Fingerprint a SPARQL query, ignoring whitespace differences"""
+        normalized = re.sub(r'\s+', ' ', query).strip()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+    def compute_layout(self, graph_data: Dict[str, Any]) -> Dict[str, List[float]]:
+        """
+        Compute a force-directed (Fruchterman-Reingold) layout with NetworkX.
+        Positions are centered on 0 and scaled to [-1, 1], the client maps them to its viewport.
+        """
+        graph = self.to_networkx_graph(graph_data)
+        if graph.number_of_nodes() == 0:
+            return {}
+        positions = nx.spring_layout(graph, seed=42, iterations=50)
+        return {node: [round(float(x), 4), round(float(y), 4)] for node, (x, y) in positions.items()}
+
+    def get_layout(self, graph_data: Dict[str, Any], fingerprint: str,
+                   wait: float = 0.0) -> Optional[Dict[str, List[float]]]:
+        """
+        Return cached layout positions for a graph, or schedule their computation.
+        The layout is computed once per data version and fingerprint by a background
+        worker; the caller waits at most `wait` seconds and gets None if it is not ready.
+        """
+        key = f"{get_data_version()}:{fingerprint}"
+        with self._cache_lock:
+            positions = self._layout_cache.get(key)
+            if positions is not None:
+                return positions
+            job = self._layout_jobs.get(key)
+            if job is None:
+                job = self._layout_executor.submit(self._run_layout_job, key, graph_data)
+                self._layout_jobs[key] = job
+
+        try:
+            return job.result(timeout=wait)
+        except FutureTimeoutError:
+            return None
+
+    def get_full_layout(self, wait: float = 0.0) -> Optional[Dict[str, List[float]]]:
+        """Return the layout of the shared cocktail-ingredient graph"""
+        return self.get_layout(self.build_graph(), "full", wait=wait)
+
+    def _run_layout_job(self, key: str, graph_data: Dict[str, Any]) -> Dict[str, List[float]]:
+        try:
+            positions = self.compute_layout(graph_data)
+            with self._cache_lock:
+                self._layout_cache.set(key, positions)
+            return positions
+        finally:
+            with self._cache_lock:
+                self._layout_jobs.pop(key, None)
+
+    @staticmethod
+    def attach_layout(graph_data: Dict[str, Any], positions: Optional[Dict[str, List[float]]]) -> Dict[str, Any]:
+        """Add x/y coordinates to the nodes that have a computed position"""
+        if positions:
+            for node in graph_data['nodes']:
+                position = positions.get(node['id'])
+                if position is not None:
+                    node['x'], node['y'] = position
+        return graph_data
+
+    @staticmethod
+    def to_columnar(graph_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert D3 graph data to a compact columnar payload.
+        Nodes become parallel arrays (type stored as an index into 'types') and
+        links reference nodes by their integer position instead of repeating ids.
+        Layout coordinates, when attached, are added as 'x' and 'y' columns.
+        """
+        types: List[str] = []
+        type_codes: Dict[str, int] = {}
+        node_positions: Dict[str, int] = {}
+        columns = {'id': [], 'name': [], 'type': []}
+        has_layout = any('x' in node for node in graph_data['nodes'])
+        if has_layout:
+            columns['x'] = []
+            columns['y'] = []
+
+        for position, node in enumerate(graph_data['nodes']):
+            node_type = node.get('type')
+            if node_type not in type_codes:
+                type_codes[node_type] = len(types)
+                types.append(node_type)
+            node_positions[node['id']] = position
+            columns['id'].append(node['id'])
+            columns['name'].append(node.get('name'))
+            columns['type'].append(type_codes[node_type])
+            if has_layout:
+                columns['x'].append(node.get('x'))
+                columns['y'].append(node.get('y'))
+
+        sources, targets = [], []
+        for edge in graph_data['edges']:
+            if edge['source'] in node_positions and edge['target'] in node_positions:
+                sources.append(node_positions[edge['source']])
+                targets.append(node_positions[edge['target']])
+
+        return {
+            'format': 'columnar',
+            'types': types,
+            'nodes': columns,
+            'links': {'source': sources, 'target': targets}
+        }
 
     def to_networkx_graph(self, graph_data: Dict[str, Any]):
         """
@@ -201,7 +577,7 @@ class GraphService:
         # Add nodes
         for node in graph_data['nodes']:
             node_id = node['id']
-            graph.add_node(node_id)
+            graph.add_node(node_id, name=node.get('name'), type=node.get('type'))
         
         # Add edges
         for edge in graph_data['edges']:
@@ -1,6 +1,8 @@
 from typing import List, Dict, Set
+import numpy as np
 from .cocktail_service import CocktailService
 from .ingredient_service import IngredientService
+from ..data.incidence import get_incidence
 
 class IngredientOptimizerService:
     def __init__(self):
@@ -18,81 +20,39 @@ class IngredientOptimizerService:
         Returns:
             Dict[str, any]: Dictionary containing selected ingredients and cocktail count
         """
-        # Step 1: Get all cocktails and filter those that require too many ingredients
-        all_cocktails = self.cocktail_service.get_all_cocktails()
-        
-        # Pre-process cocktails to sets for faster lookup
-        # Only consider cocktails that have ingredients and can possibly be made with N ingredients
-        valid_cocktails = []
-        possible_ingredients = set()
-        
-        for c in all_cocktails:
-            if c.parsed_ingredients and len(c.parsed_ingredients) <= N:
-                ing_set = set(c.parsed_ingredients)
-                valid_cocktails.append({
-                    'cocktail': c,
-                    'ingredients': ing_set
-                })
-                possible_ingredients.update(ing_set)
-        
-        selected_ingredients = set()
-        
+        # Step 1: Restrict the incidence matrix to cocktails that can possibly be made with N ingredients
+        incidence = get_incidence(self.cocktail_service.get_all_cocktails())
+        valid_rows = np.flatnonzero((incidence.sizes > 0) & (incidence.sizes <= N))
+        valid = incidence.matrix[valid_rows]
+        valid_by_ingredient = valid.T.tocsr()
+
+        # Candidates are the ingredients used by at least one valid cocktail
+        possible = np.diff(valid_by_ingredient.indptr) > 0
+        selected = np.zeros(incidence.shape[1], dtype=np.float32)
+        missing = incidence.sizes[valid_rows].astype(np.float64)
+
         # Step 2: Iteratively select N ingredients
         for _ in range(N):
-            best_ingredient = None
-            best_score = -1.0
-            
-            # Identify candidates (ingredients not yet selected)
-            candidates = possible_ingredients - selected_ingredients
-            
-            if not candidates:
+            candidates = possible & (selected == 0)
+            if not candidates.any():
                 break
-                
-            for ingredient in candidates:
-                score = 0.0
-                
-                # Calculate score based on how much this ingredient helps complete cocktails
-                for vc in valid_cocktails:
-                    required = vc['ingredients']
-                    if ingredient not in required:
-                        continue
-                        
-                    # Calculate missing ingredients if we were to add this one
-                    missing_count = sum(1 for i in required if i not in selected_ingredients)
-                    
-                    # If this ingredient is one of the missing ones, it reduces the count by 1
-                    # We want to know the *current* missing count (including this ingredient)
-                    # The loop above calculates missing count *before* adding this ingredient.
-                    # Wait, careful. "if i not in selected_ingredients".
-                    # Since 'ingredient' is from 'candidates' (not selected), it IS in the missing count.
-                    
-                    # We want to incentivize completing cocktails.
-                    # If missing_count == 1: picking this ingredient -> Complete! Score High.
-                    
-                    if missing_count == 1:
-                        score += 100.0
-                    else:
-                        # missing_count > 1. 
-                        # We reward progress. smaller missing_count is better.
-                        score += 1.0 / missing_count
-                
-                if score > best_score:
-                    best_score = score
-                    best_ingredient = ingredient
-            
-            if best_ingredient:
-                selected_ingredients.add(best_ingredient)
-        
+
+            # Each valid cocktail rewards its missing ingredients: completing it (1 missing)
+            # is worth 100, otherwise progress is worth 1 / missing
+            weights = np.where(missing == 1, 100.0, 1.0 / np.maximum(missing, 1))
+            weights[missing == 0] = 0.0
+            scores = valid_by_ingredient @ weights
+            scores[~candidates] = -1.0
+
+            best_ingredient = int(np.argmax(scores))
+            selected[best_ingredient] = 1.0
+            missing -= valid_by_ingredient[best_ingredient].toarray().ravel()
+
         # Step 3: Calculate final results
-        completed_count = 0
-        possible_cocktails = []
-        for vc in valid_cocktails:
-            if vc['ingredients'].issubset(selected_ingredients):
-                completed_count += 1
-                possible_cocktails.append(vc['cocktail'])
-        
+        possible_cocktails = [incidence.cocktails[row] for row in valid_rows[missing == 0]]
+
         return {
-            "ingredients": list(selected_ingredients),
-            "cocktail_count": completed_count,
+            "ingredients": [incidence.ingredient_names[col] for col in np.flatnonzero(selected)],
+            "cocktail_count": len(possible_cocktails),
             "cocktails": possible_cocktails
-        }
\ No newline at end of file
+        }
@@ -1,10 +1,11 @@
 
 from backend.services.sparql_service import SparqlService
 from backend.models.ingredient import Ingredient
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
 from pathlib import Path
 from backend.utils.graph_loader import get_shared_graph
 from backend.data.ttl_parser import get_all_ingredients as get_local_ingredients
+from backend.data.incidence import get_incidence
 
 class IngredientService:
     def __init__(self, local_ingredient_loader=None):
@@ -231,3 +232,24 @@ class IngredientService:
         except Exception as e:
             print(f"Error getting all categories: {e}")
             return []
+
+    def get_ingredient_pairs(self, ingredient_id: str, limit: int = 10,
+                             sort_by: str = "count") -> Optional[Dict[str, Any]]:
+        """
+        Get the ingredients that most often appear alongside an ingredient (id or name),
+        read from the co-occurrence table precomputed on the cocktail catalog.
+        Returns None if the ingredient is not used by any cocktail.
+        """
+        incidence = get_incidence()
+        pairs = incidence.top_pairs(ingredient_id, limit=limit, sort_by=sort_by)
+        if pairs is None:
+            return None
+        col = incidence.column(ingredient_id)
+        return {
+            "ingredient": {
+                "id": incidence.ingredient_ids[col],
+                "name": incidence.ingredient_names[col],
+                "cocktail_count": len(incidence.cocktails_with(col))
+            },
+            "pairs": pairs
+        }
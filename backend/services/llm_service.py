@@ -2,40 +2,7 @@ from openai import OpenAI
 from os import getenv
 from dotenv import load_dotenv
 import hashlib
-import time
-
-class SimpleCache:
-    """Simple in-memory cache with TTL support."""
-    
-    def __init__(self, ttl: int = 3600, max_size: int = 100):
-        self.ttl = ttl
-        self.max_size = max_size
-        self.cache = {}  # key: (value, timestamp)
-    
-    def _cleanup(self):
-        """Remove expired entries from cache."""
-        current_time = time.time()
-        expired_keys = [key for key, (_, timestamp) in self.cache.items() 
-                      if current_time - timestamp > self.ttl]
-        for key in expired_keys:
-            del self.cache[key]
-    
-    def get(self, key):
-        """Get value from cache if not expired."""
-        self._cleanup()
-        if key in self.cache:
-            value, timestamp = self.cache[key]
-            return value
-        return None
-    
-    def set(self, key, value):
-        """Set value in cache with current timestamp."""
-        self._cleanup()
-        # Remove oldest entry if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.items(), key=lambda x: x[1][1])[0]
-            del self.cache[oldest_key]
-        self.cache[key] = (value, time.time())
+from backend.utils.cache import SimpleCache
 
 class LLMService:
     def __init__(self, cache_ttl: int = 3600, cache_size: int = 100):
@@ -74,7 +41,7 @@ class LLMService:
 
         header = """You are a SPARQL query generator for cocktail data in RDF/Turtle format.
 
-IMPORTANT: The RDF graph contains 56 cocktails with 2419 triples. Cocktails are NOT declared with 'a dbo:Cocktail' (no rdf:type declaration). Instead, cocktails are identified by having properties like dbp:ingredients, dbp:prep, etc.
+IMPORTANT: The RDF graph contains 56 cocktails. Cocktails are NOT declared with 'a dbo:Cocktail' (no rdf:type declaration). Instead, cocktails are identified by having properties like dbp:ingredients, dbp:prep, etc.
 
 Namespaces available:
 - dbr: http://dbpedia.org/resource/
@@ -83,6 +50,7 @@ Namespaces available:
 - rdfs: http://www.w3.org/2000/01/rdf-schema#
 - dct: http://purl.org/dc/terms/
 - foaf: http://xmlns.com/foaf/0.1/
+- marmitonic: http://marmitonic.local/ontology/
 
 Properties available in the graph:
 1. rdfs:label - cocktail names (in @en and @fr)
@@ -96,10 +64,15 @@ Properties available in the graph:
 9. dbo:wikiPageWikiLink - related resources (e.g., ingredients, related cocktails)
 10. dct:subject - categories (e.g., dbc:Cocktails_with_gin, dbc:Cocktails_with_vodka)
 11. foaf:depiction - image URLs
+12. marmitonic:hasIngredient - links a cocktail to each of its ingredients (one URI per ingredient, precomputed from dbp:ingredients)
+13. rdfs:label on ingredient URIs - ingredient names in Title Case (in @en), e.g. "Vodka", "Lime Juice", "Sweet Vermouth"
 
 HOW TO QUERY COCKTAILS:
 - To get all cocktails: SELECT ?cocktail WHERE { ?cocktail dbp:ingredients ?ingredients. }
-- To search by ingredient: Use FILTER(CONTAINS(LCASE(?ingredients), "vodka")) on dbp:ingredients
+- To search by ingredient: join on marmitonic:hasIngredient and match the ingredient label exactly, e.g.
+  SELECT ?cocktail ?label WHERE { ?cocktail marmitonic:hasIngredient ?ing . ?ing rdfs:label "Vodka"@en . ?cocktail rdfs:label ?label . FILTER(LANG(?label) = "en") }
+- To list the ingredients of a cocktail: ?cocktail marmitonic:hasIngredient ?ing . ?ing rdfs:label ?ingredientName
+- Only scan the raw dbp:ingredients text (FILTER(CONTAINS(LCASE(?ingredients), "..."))) for quantities or wording that is not an ingredient name
 - To filter by language: Use FILTER(LANG(?label) = "en") or FILTER(LANG(?label) = "fr")
 
 Examples of cocktails in the graph: Black Russian, Moscow mule, Bloody Mary, Cosmopolitan, Espresso martini, French martini, Long Island iced tea, Vesper, Martini, Mojito, Margarita, Daiquiri, etc.
@@ -0,0 +1,232 @@
+"""
+Backend d'inférence ONNX quantifié (int8) pour le modèle d'embeddings de phrases
+Le modèle sentence-transformers est exporté une fois en ONNX puis quantifié dynamiquement
+en int8; l'inférence tourne ensuite sur onnxruntime (CPU) avec le tokenizer Rust, sans
+charger PyTorch. Un contrôle de parité compare les embeddings aux embeddings torch.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # Backend optionnel: SimilarityService garde le modèle PyTorch
+    onnxruntime = None
+    Tokenizer = None
+
+ONNX_MODEL_FILE = "model_qint8.onnx"
+ONNX_CONFIG_FILE = "onnx_config.json"
+TOKENIZER_FILE = "tokenizer.json"
+# Similarité cosinus minimale exigée entre embeddings torch et ONNX int8
+PARITY_MIN_COSINE = 0.98
+PARITY_TEXTS = [
+    "Cocktail fruité et rafraîchissant pour l'été",
+    "Nom: Mojito | Ingrédients: Rhum blanc, Menthe, Citron vert, Sucre, Eau gazeuse",
+    "Nom: Negroni | Ingrédients: Gin, Campari, Vermouth rouge | Catégories: Apéritif",
+    "Something bitter and strong with whiskey",
+    "Cocktail avec les ingrédients: vodka, jus de cranberry, triple sec",
+    "Boisson chaude épicée pour l'hiver",
+]
+
+
+class OnnxEmbeddingModel:
+    """
+    Modèle exporté par export_quantized_model: même interface encode() que
+    SentenceTransformer (mean pooling puis normalisation L2).
+    """
+
+    def __init__(self, model_dir: Path, num_threads: int = 0, config: Optional[Dict[str, Any]] = None):
+        if onnxruntime is None:
+            raise ImportError("onnxruntime est requis pour le backend ONNX (pip install onnxruntime)")
+        self.model_dir = Path(model_dir)
+        if config is None:
+            with open(self.model_dir / ONNX_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        self.config: Dict[str, Any] = config
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(self.model_dir / ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    @staticmethod
+    def is_exported(model_dir: Path, min_cosine: float = PARITY_MIN_COSINE) -> bool:
+        """Export complet et dont la parité enregistrée atteint min_cosine"""
+        model_dir = Path(model_dir)
+        if not all((model_dir / name).exists() for name in (ONNX_MODEL_FILE, ONNX_CONFIG_FILE, TOKENIZER_FILE)):
+            return False
+        try:
+            with open(model_dir / ONNX_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                parity = json.load(f).get("parity") or {}
+            return float(parity["min_cosine"]) >= min_cosine
+        except (KeyError, TypeError, ValueError, OSError):
+            return False
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def encode(self, sentences: Sequence[str], batch_size: int = 32,
+               show_progress_bar: Optional[bool] = None, **kwargs) -> np.ndarray:
+        """Embeddings normalisés (float32); les textes sont triés par longueur pour limiter le padding"""
+        sentences = list(sentences)
+        embeddings = np.zeros((len(sentences), self.config["dimension"]), dtype=np.float32)
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        for start in range(0, len(sentences), batch_size):
+            rows = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([sentences[row] for row in rows])
+            features = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: features[name] for name in self.input_names})[0]
+            mask = features["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            embeddings[rows] = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+
+def export_quantized_model(model_name: str, output_dir: Path, parity_texts: Optional[List[str]] = None,
+                           min_cosine: float = PARITY_MIN_COSINE) -> Dict[str, Any]:
+    """
+    Exporte un modèle sentence-transformers (Transformer + mean pooling) en ONNX, le quantifie
+    en int8 (poids, quantification dynamique) et vérifie la parité avec les embeddings torch.
+    Le modèle est écrit dans un répertoire temporaire voisin, mis en place seulement si la
+    parité est atteinte: sinon il est supprimé et ValueError est levée.
+    Nécessite torch, onnx et onnxruntime au moment de l'export seulement.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = reference[0], reference[1]
+    if not _is_mean_pooling(pooling.get_config_dict()):
+        raise ValueError(f"Pooling {pooling.get_config_dict()} non supporté par le backend ONNX")
+    tokenizer = transformer.tokenizer
+    if not tokenizer.is_fast:
+        raise ValueError("Un tokenizer rapide (tokenizer.json) est requis pour le backend ONNX")
+
+    output_dir = Path(output_dir)
+    export_dir = output_dir.with_name(f".{output_dir.name}.tmp")
+    shutil.rmtree(export_dir, ignore_errors=True)
+    export_dir.mkdir(parents=True)
+    try:
+        config = _export(reference, export_dir, model_name, parity_texts or PARITY_TEXTS)
+    except Exception:
+        shutil.rmtree(export_dir, ignore_errors=True)
+        raise
+    parity = config["parity"]
+    print(f"Modèle ONNX int8 exporté: cosinus min {parity['min_cosine']}, moyen {parity['mean_cosine']}")
+    if parity["min_cosine"] < min_cosine:
+        shutil.rmtree(export_dir, ignore_errors=True)
+        raise ValueError(f"Parité insuffisante avec les embeddings torch: {parity['min_cosine']} < {min_cosine}")
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(export_dir, output_dir)
+    return config
+
+
+def _export(reference, output_dir: Path, model_name: str, parity_texts: List[str]) -> Dict[str, Any]:
+    """Export ONNX, quantification et contrôle de parité dans output_dir; renvoie la configuration écrite"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    transformer = reference[0]
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(str(output_dir))
+
+    sample = tokenizer(["exemple de cocktail"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = output_dir / "model.onnx"
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(transformer.auto_model.eval()), tuple(sample[name] for name in input_names), str(fp32_path),
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=17, dynamo=False
+        )
+    quantize_dynamic(str(fp32_path), str(output_dir / ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+
+    config = {
+        "model_name": model_name,
+        "dimension": transformer.auto_model.config.hidden_size,
+        "max_seq_length": reference.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "pooling": "mean",
+        "quantization": "dynamic-int8",
+    }
+    config["parity"] = check_parity(reference, OnnxEmbeddingModel(output_dir, config=config), parity_texts)
+    with open(output_dir / ONNX_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    return config
+
+
+def _is_mean_pooling(config: Dict[str, Any]) -> bool:
+    # sentence-transformers >= 6 donne le mode directement, les versions antérieures un booléen par mode
+    if "pooling_mode" in config:
+        return config["pooling_mode"] == "mean"
+    modes = [key for key, enabled in config.items() if key.startswith("pooling_mode_") and enabled]
+    return modes == ["pooling_mode_mean_tokens"]
+
+
+def check_parity(reference, candidate, texts: List[str]) -> Dict[str, Any]:
+    """Similarité cosinus, texte par texte, entre les embeddings de deux modèles"""
+    expected = np.asarray(reference.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts), dtype=np.float32)
+    expected /= np.maximum(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12)
+    actual /= np.maximum(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12)
+    cosines = (expected * actual).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6)
+    }
+
+
+def _query_latency_ms(model, texts: List[str], repeats: int = 20) -> float:
+    model.encode(texts[:1])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            model.encode([text])
+    return (time.perf_counter() - start) * 1000 / (repeats * len(texts))
+
+
+if __name__ == "__main__":
+    # Export, contrôle de parité et comparaison de latence par requête torch / ONNX int8
+    import argparse
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Exporte le modèle d'embeddings en ONNX int8")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", required=True, help="Répertoire du modèle exporté")
+    args = parser.parse_args()
+
+    export_quantized_model(args.model, Path(args.output))
+    torch_ms = _query_latency_ms(SentenceTransformer(args.model, device="cpu"), PARITY_TEXTS)
+    onnx_ms = _query_latency_ms(OnnxEmbeddingModel(Path(args.output)), PARITY_TEXTS)
+    print(f"Latence par requête: torch {torch_ms:.2f} ms, onnx int8 {onnx_ms:.2f} ms")
@@ -1,5 +1,6 @@
 from backend.services.cocktail_service import CocktailService
 from backend.services.ingredient_service import IngredientService
+from backend.data.incidence import get_incidence
 from typing import List, Dict, Set
 
 
@@ -11,12 +12,12 @@ class PlannerService:
         self._build_mapping()
 
     def _build_mapping(self):
-        cocktails = self.cocktail_service.get_all_cocktails()
-        for cocktail in cocktails:
-            if cocktail.parsed_ingredients:
-                self.cocktail_ingredients[cocktail.name] = set(cocktail.parsed_ingredients)
-            else:
-                self.cocktail_ingredients[cocktail.name] = set()
+        # Read each cocktail's ingredients from the shared incidence matrix rows
+        incidence = get_incidence(self.cocktail_service.get_all_cocktails())
+        for row, cocktail in enumerate(incidence.cocktails):
+            self.cocktail_ingredients[cocktail.name] = {
+                incidence.ingredient_names[col] for col in incidence.ingredients_of(row)
+            }
 
   
 
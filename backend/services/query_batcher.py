@@ -0,0 +1,83 @@
+"""
+Micro-batching des requêtes d'embedding concurrentes
+Les requêtes qui arrivent pendant une courte fenêtre (quelques ms) ou jusqu'à une taille
+maximale de lot sont encodées ensemble en un seul passage du modèle, puis chaque vecteur
+est rendu à la requête qui l'attendait.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Fenêtre d'attente par défaut avant d'encoder un lot, et taille maximale d'un lot
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH_SIZE = 32
+
+
+class QueryBatcher:
+    """
+    Regroupe les appels concurrents à encode_batch (liste de textes -> matrice de vecteurs).
+    Le modèle tourne dans un thread dédié: la boucle d'événements reste libre et les
+    requêtes arrivées pendant un encodage forment naturellement le lot suivant.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], np.ndarray],
+                 window_ms: float = DEFAULT_BATCH_WINDOW_MS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être au moins 1")
+        self.encode_batch = encode_batch
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-encoder")
+        self.batches = 0
+        self.queries = 0
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Embedding d'un texte, encodé avec les autres requêtes de la même fenêtre"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Un même texte demandé plusieurs fois dans le lot n'est encodé qu'une fois
+        rows: Dict[str, int] = {}
+        for text, _ in batch:
+            rows.setdefault(text, len(rows))
+        try:
+            vectors = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.encode_batch, list(rows)
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.queries += len(batch)
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[rows[text]])
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "average_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0
+        }
@@ -1,30 +1,112 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import pickle
+from pathlib import Path
+import json
 import os
 import hashlib
+import threading
 import time
 from backend.models.cocktail import Cocktail
 from backend.models.vibe_cluster import VibeCluster
 from backend.services.cocktail_service import CocktailService
-from backend.services.llm_service import LLMService, SimpleCache
+from backend.services.llm_service import LLMService
+from backend.utils.cache import SimpleCache
+from backend.services.query_batcher import QueryBatcher, DEFAULT_BATCH_WINDOW_MS, DEFAULT_MAX_BATCH_SIZE
+from backend.services.embedding_cache import EmbeddingLRUCache, DEFAULT_QUERY_CACHE_SIZE
+from backend.services.embedding_backends import EmbeddingBackend, create_backend, DEFAULT_MODEL_NAME
+from backend.services.vector_index import (
+    INDEX_TYPES, IVF_RETRAIN_GROWTH, SEARCH_PARAMS, apply_search_params, build_vector_index,
+    resolve_index_type, resolve_params, search_parameters, supports_remove
+)
+from backend.services.bm25_index import BM25Index, reciprocal_rank_fusion
+from backend.data.incidence import get_incidence
+
+# Poids par défaut des signaux du classement fusionné (embedding, ingrédients, graphe)
+DEFAULT_FUSION_WEIGHTS = {"embedding": 0.5, "ingredients": 0.3, "graph": 0.2}
+# Voisins conservés par cocktail dans la table fusionnée, et lignes traitées par bloc
+FUSED_TOP_K = 20
+FUSED_CHUNK_ROWS = 256
+# Filtres acceptés par les recherches (appliqués dans FAISS par un sélecteur d'ids)
+SIMILARITY_FILTERS = ("include_ingredients", "exclude_ingredients", "served", "category", "feasible_for")
+# Recherche texte: "dense" (embeddings seuls) ou "hybrid" (BM25 + embeddings fusionnés par rang réciproque)
+SEARCH_MODES = ("dense", "hybrid")
+# Candidats pris dans chaque classement avant la fusion, et constante k de la fusion par rang réciproque
+HYBRID_CANDIDATES = 50
+RRF_K = 60
+# Répertoire des artefacts de l'index (surchargeable par variable d'environnement) et leur format
+ARTIFACTS_DIR_ENV = "MARMITONIC_SIMILARITY_DIR"
+# Active la sauvegarde du cache des embeddings de requêtes dans le répertoire d'artefacts
+PERSIST_QUERY_CACHE_ENV = "MARMITONIC_PERSIST_QUERY_CACHE"
+# Backend d'embedding (torch, onnx ou lexical, voir embedding_backends)
+EMBEDDING_BACKEND_ENV = "MARMITONIC_EMBEDDING_BACKEND"
+# Type d'index FAISS (auto, flat, ivf_flat, ivf_pq ou hnsw, voir vector_index)
+INDEX_TYPE_ENV = "MARMITONIC_INDEX_TYPE"
+DEFAULT_ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "data" / "similarity"
+ARTIFACTS_FORMAT_VERSION = 3
+ARTIFACT_FILES = {
+    "manifest": "manifest.json",
+    "embeddings": "embeddings.npy",
+    "index": "faiss.index",
+    "fused": "fused_neighbors.json",
+    "query_cache": "query_embeddings.npz"
+}
 
 
 class SimilarityService:
     """Service de recherche de cocktails similaires avec FAISS et RAG."""
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", cache_ttl: int = 3600, cache_size: int = 100):
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, cache_ttl: int = 3600, cache_size: int = 100,
+                 fusion_weights: Optional[Dict[str, float]] = None, artifacts_dir: Optional[str] = None,
+                 batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 query_cache_size: int = DEFAULT_QUERY_CACHE_SIZE, persist_query_cache: Optional[bool] = None,
+                 embedding_backend: Optional[str] = None, index_type: Optional[str] = None,
+                 index_params: Optional[Dict[str, int]] = None):
         self.cocktail_service = CocktailService()
         self.llm_service = LLMService(cache_ttl=cache_ttl, cache_size=cache_size)
-        self.model = SentenceTransformer(model_name)
+        # Artefacts persistés: indépendants du répertoire courant
+        self.artifacts_dir = Path(artifacts_dir or os.getenv(ARTIFACTS_DIR_ENV) or DEFAULT_ARTIFACTS_DIR)
+        self.model_name = model_name
+        # Backend d'embedding, dont le modèle n'est chargé qu'au premier encodage
+        self.model: EmbeddingBackend = create_backend(embedding_backend or os.getenv(EMBEDDING_BACKEND_ENV) or "torch",
+                                                      model_name, self.artifacts_dir)
+        self.embedding_backend = self.model.name
+        # Identité des embeddings (empreintes, manifeste, cache de requêtes): chaque backend a ses propres vecteurs
+        self.model_id = self.model.model_id
         self.index: Optional[faiss.Index] = None
+        # Type d'index demandé ("auto": selon la taille du catalogue), paramètres imposés et description de l'index courant
+        self.index_type = index_type or os.getenv(INDEX_TYPE_ENV) or "auto"
+        if self.index_type != "auto":
+            resolve_index_type(self.index_type, 0)
+        self.index_params = dict(index_params or {})
+        resolve_params("flat", 0, 1, self.index_params)
+        self.index_info: Optional[Dict[str, Any]] = None
         self.cocktails: List[Cocktail] = []
         self.embeddings: Optional[np.ndarray] = None
-        self.index_path = "backend/data/faiss_index.bin"
-        self.cocktails_path = "backend/data/cocktails_cache.pkl"
-        self.embeddings_path = "backend/data/embeddings_cache.pkl"
+        # Incremental index state: content hash per cocktail id, normalized vector per content hash
+        self.content_hashes: Dict[str, str] = {}
+        self.vector_store: Dict[str, np.ndarray] = {}
+        self._row_by_faiss_id: Dict[int, int] = {}
+        # Blended neighbour table: cocktail id -> ranked neighbours with per-signal scores
+        self.fusion_weights = self._normalize_weights(fusion_weights or DEFAULT_FUSION_WEIGHTS)
+        self.fused_neighbors: Dict[str, List[Dict[str, Any]]] = {}
+        # Index BM25 des textes des cocktails (recherche hybride), construit à la première requête
+        self._bm25_index: Optional[BM25Index] = None
+        # Embeddings des requêtes texte déjà vues (LRU), rechargés du disque si la persistance est activée
+        self.query_cache = EmbeddingLRUCache(max_size=query_cache_size, model_name=self.model_id,
+                                             lowercase=self.model.uncased)
+        if persist_query_cache is None:
+            persist_query_cache = os.getenv(PERSIST_QUERY_CACHE_ENV, "").lower() in ("1", "true", "yes")
+        self.persist_query_cache = persist_query_cache
+        if self.persist_query_cache:
+            self.query_cache.load(self._artifact_path("query_cache"))
+        # Un seul passage du modèle à la fois: thread du QueryBatcher et recherches groupées du threadpool
+        self._model_lock = threading.Lock()
+        # Une seule construction à froid de l'index à la fois (routes asynchrones)
+        self._build_lock = threading.Lock()
+        # Requêtes texte concurrentes absentes du cache encodées par lots (fenêtre de quelques ms)
+        self.query_batcher = QueryBatcher(self._encode_with_model, window_ms=batch_window_ms, max_batch_size=max_batch_size)
         # Create custom cache for cluster title generation
         self.title_cache = SimpleCache(ttl=cache_ttl, max_size=cache_size)
         # Create cache for clusters
@@ -35,10 +117,10 @@ class SimilarityService:
         cocktail_ids = sorted([cocktail.id for cocktail in cocktails])
         key_string = "|".join(cocktail_ids)
         return hashlib.md5(key_string.encode('utf-8')).hexdigest()
-        self.embeddings_path = "backend/data/embeddings_cache.pkl"
         
     def _create_cocktail_text(self, cocktail: Cocktail) -> str:
-        ingredients = cocktail.ingredients or []
+        # ingredients est le texte brut (avec doses): la liste extraite est préférée quand elle existe
+        ingredients = cocktail.parsed_ingredients or ([cocktail.ingredients] if cocktail.ingredients else [])
         ingredients_str = ', '.join(str(i) for i in ingredients if i)
         parts = [f"Nom: {cocktail.name}", f"Ingrédients: {ingredients_str}"]
         if cocktail.description:
@@ -54,67 +136,265 @@ class SimilarityService:
             parts.append(f"Ingrédients liés: {related_str}")
         return " | ".join(parts)
     
+    def _content_hash(self, text: str) -> str:
+        """Empreinte du texte d'un cocktail pour le modèle courant (clé du cache d'embeddings)"""
+        return hashlib.sha1(f"{self.model_id}\n{text}".encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _faiss_id(cocktail_id: str) -> int:
+        """Identifiant FAISS stable (entier 60 bits) dérivé de l'id du cocktail"""
+        return int(hashlib.sha1(cocktail_id.encode('utf-8')).hexdigest()[:15], 16)
+
+    def _reset_index(self) -> None:
+        self.index = None
+        self.index_info = None
+        self.cocktails = []
+        self.embeddings = None
+        self.content_hashes = {}
+        self.vector_store = {}
+        self.fused_neighbors = {}
+        self._row_by_faiss_id = {}
+        self._bm25_index = None
+
     def build_index(self, force_rebuild: bool = False) -> None:
-        if not force_rebuild and os.path.exists(self.index_path) and os.path.exists(self.cocktails_path):
-            print("Chargement de l'index existant...")
-            self.load_index()
-            return
-        
-        print("Construction de l'index FAISS...")
-        self.cocktails = self.cocktail_service.get_all_cocktails()
-        print(f"Nombre de cocktails récupérés: {len(self.cocktails)}")
-        
-        if not self.cocktails:
+        """
+        Met à jour l'index FAISS de façon incrémentale: seuls les cocktails nouveaux ou dont
+        le texte a changé sont encodés, les cocktails supprimés ou modifiés sont retirés de
+        l'index par id. force_rebuild repart d'un index et d'un cache d'embeddings vides.
+        """
+        cocktails = self.cocktail_service.get_all_cocktails()
+        print(f"Nombre de cocktails récupérés: {len(cocktails)}")
+        if not cocktails:
             print("Aucun cocktail trouvé")
             return
-        
-        print("Génération des textes des cocktails pour les embeddings...")
-        cocktail_texts = [self._create_cocktail_text(c) for c in self.cocktails]
-        print("Génération des embeddings...")
-        self.embeddings = self.model.encode(cocktail_texts, show_progress_bar=True)
-        faiss.normalize_L2(self.embeddings)
-        
-        dimension = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
-        self.index.add(self.embeddings)
-        
-        print(f"Index construit avec {self.index.ntotal} cocktails")
-        
+
+        if force_rebuild:
+            self._reset_index()
+        elif self.index is None and self._artifact_path("manifest").exists():
+            print("Chargement de l'index existant...")
+            if not self.load_index():
+                self._reset_index()
+
+        texts = [self._create_cocktail_text(c) for c in cocktails]
+        content_hashes = {c.id: self._content_hash(text) for c, text in zip(cocktails, texts)}
+        stale_ids = [cid for cid, h in self.content_hashes.items() if content_hashes.get(cid) != h]
+        fresh = [(c, text) for c, text in zip(cocktails, texts) if self.content_hashes.get(c.id) != content_hashes[c.id]]
+        index_type = resolve_index_type(self.index_type, len(cocktails))
+        rebuild = self.index is None or self._index_outdated(index_type, len(cocktails)) \
+            or (bool(stale_ids) and not supports_remove(index_type))
+
+        if not rebuild and not stale_ids and not fresh:
+            print(f"Index à jour ({self.index.ntotal} cocktails)")
+            # Lignes déjà dans l'ordre du catalogue: les embeddings mappés en mémoire sont gardés tels quels
+            if [c.id for c in self.cocktails] != [c.id for c in cocktails]:
+                self.embeddings = np.stack([self.vector_store[content_hashes[c.id]] for c in cocktails])
+                self._row_by_faiss_id = {self._faiss_id(c.id): row for row, c in enumerate(cocktails)}
+            self.cocktails = cocktails
+            if not self.fused_neighbors:
+                self.build_fused_neighbors()
+                self.save_index()
+            return
+
+        # Le cache est indexé par empreinte: un texte déjà encodé (ex: retour arrière) n'est pas réencodé
+        to_encode = {content_hashes[c.id]: text for c, text in fresh if content_hashes[c.id] not in self.vector_store}
+        if to_encode:
+            print(f"Génération des embeddings pour {len(to_encode)} cocktails...")
+            vectors = np.asarray(self.model.encode(list(to_encode.values()), show_progress_bar=len(to_encode) > 100),
+                                 dtype=np.float32)
+            faiss.normalize_L2(vectors)
+            self.vector_store.update(zip(to_encode.keys(), vectors))
+
+        if rebuild:
+            # Index neuf (ou d'un autre type, ou à réentraîner): construit à partir des vecteurs en cache
+            self.index, self.index_info = build_vector_index(
+                np.stack([self.vector_store[content_hashes[c.id]] for c in cocktails]),
+                np.array([self._faiss_id(c.id) for c in cocktails], dtype=np.int64),
+                index_type, self.index_params
+            )
+            print(f"Index FAISS {self.index_info['type']} construit {self.index_info['params']}")
+        else:
+            if stale_ids:
+                self.index.remove_ids(np.array([self._faiss_id(cid) for cid in stale_ids], dtype=np.int64))
+            if fresh:
+                self.index.add_with_ids(
+                    np.stack([self.vector_store[content_hashes[c.id]] for c, _ in fresh]),
+                    np.array([self._faiss_id(c.id) for c, _ in fresh], dtype=np.int64)
+                )
+
+        self.cocktails = cocktails
+        self.content_hashes = content_hashes
+        self.embeddings = np.stack([self.vector_store[content_hashes[c.id]] for c in cocktails])
+        self._row_by_faiss_id = {self._faiss_id(c.id): row for row, c in enumerate(cocktails)}
+        # Le cache ne garde que les embeddings encore utilisés
+        in_use = set(content_hashes.values())
+        self.vector_store = {h: v for h, v in self.vector_store.items() if h in in_use}
+
+        removed = len([cid for cid in stale_ids if cid not in content_hashes])
+        print(f"Index mis à jour: {len(fresh)} ajoutés/modifiés, {removed} supprimés, {self.index.ntotal} cocktails")
+        self.build_fused_neighbors()
         self.save_index()
     
+    def _index_outdated(self, index_type: str, n: int) -> bool:
+        """
+        L'index courant doit être reconstruit s'il n'a pas le type voulu, si un paramètre de
+        construction imposé a changé ou si un index IVF a été entraîné sur un catalogue bien plus petit.
+        """
+        if self.index_info is None or self.index_info["type"] != index_type:
+            return True
+        built_with = self.index_info["params"]
+        if any(key in built_with and built_with[key] != value
+               for key, value in self.index_params.items() if key not in SEARCH_PARAMS and value is not None):
+            return True
+        return index_type in ("ivf_flat", "ivf_pq") and n > IVF_RETRAIN_GROWTH * self.index_info["trained_on"]
+
+    def _artifact_path(self, name: str) -> Path:
+        return self.artifacts_dir / ARTIFACT_FILES[name]
+
+    @staticmethod
+    def _data_hash(cocktail_ids: List[str], content_hashes: List[str]) -> str:
+        """Empreinte de l'ensemble indexé: ids et empreintes de texte, dans l'ordre des lignes"""
+        digest = hashlib.sha1()
+        for cocktail_id, content_hash in zip(cocktail_ids, content_hashes):
+            digest.update(f"{cocktail_id}\t{content_hash}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _write_artifact(self, name: str, write) -> None:
+        """
+        Écrit un artefact dans un fichier temporaire puis le renomme: un fichier déjà
+        mappé en mémoire (embeddings.npy) n'est jamais tronqué sous un lecteur.
+        """
+        path = self._artifact_path(name)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
     def save_index(self) -> None:
-        if self.index is None:
+        """
+        Sauvegarde l'index dans le répertoire d'artefacts:
+            manifest.json        format, modèle, backend, dimension, empreinte des données, ids et
+                                 empreintes de texte des cocktails (ordre des lignes)
+            embeddings.npy       matrice float32 des embeddings normalisés (chargée en mmap)
+            faiss.index          index FAISS (type et paramètres dans le manifeste)
+            fused_neighbors.json table du classement fusionné
+        Le manifeste est écrit en dernier: il ne décrit que des fichiers complets.
+        """
+        if self.index is None or self.embeddings is None or not self.cocktails:
             return
-        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
-        with open(self.cocktails_path, 'wb') as f:
-            pickle.dump(self.cocktails, f)
-        with open(self.embeddings_path, 'wb') as f:
-            pickle.dump(self.embeddings, f)
-        print("Index sauvegardé")
-    
+        self.artifacts_dir.mkdir(parents=True, exist_ok=True)
+        cocktail_ids = [c.id for c in self.cocktails]
+        content_hashes = [self.content_hashes[cocktail_id] for cocktail_id in cocktail_ids]
+        data_hash = self._data_hash(cocktail_ids, content_hashes)
+        embeddings = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+
+        def write_embeddings(path: Path) -> None:
+            with open(path, 'wb') as f:
+                np.save(f, embeddings)
+
+        def write_json(payload: Dict[str, Any]):
+            def write(path: Path) -> None:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+            return write
+
+        self._write_artifact("embeddings", write_embeddings)
+        self._write_artifact("index", lambda path: faiss.write_index(self.index, str(path)))
+        if self.fused_neighbors:
+            self._write_artifact("fused", write_json({
+                "weights": self.fusion_weights,
+                "data_hash": data_hash,
+                "neighbors": self.fused_neighbors
+            }))
+        self._write_artifact("manifest", write_json({
+            "format_version": ARTIFACTS_FORMAT_VERSION,
+            "model_name": self.model_id,
+            "embedding_backend": self.embedding_backend,
+            "index": self.index_info,
+            "dimension": int(embeddings.shape[1]),
+            "count": len(cocktail_ids),
+            "data_hash": data_hash,
+            "created_at": time.time(),
+            "cocktail_ids": cocktail_ids,
+            "content_hashes": content_hashes
+        }))
+        print(f"Index sauvegardé dans {self.artifacts_dir}")
+
     def load_index(self) -> bool:
+        """
+        Charge l'index sauvegardé après validation du manifeste (format, modèle, backend, dimension,
+        nombre de lignes, empreinte des données). Les embeddings sont mappés en mémoire et
+        les cocktails repris du catalogue par id; build_index met ensuite l'index à jour.
+        """
         try:
-            if not os.path.exists(self.index_path) or not os.path.exists(self.cocktails_path):
+            manifest_path = self._artifact_path("manifest")
+            if not manifest_path.exists():
+                return False
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("format_version") != ARTIFACTS_FORMAT_VERSION or manifest.get("model_name") != self.model_id \
+                    or manifest.get("embedding_backend") != self.embedding_backend:
+                print("Index obsolète (modèle, backend ou format différent), reconstruction nécessaire")
                 return False
-            self.index = faiss.read_index(self.index_path)
-            with open(self.cocktails_path, 'rb') as f:
-                self.cocktails = pickle.load(f)
-            if os.path.exists(self.embeddings_path):
-                with open(self.embeddings_path, 'rb') as f:
-                    self.embeddings = pickle.load(f)
-            print(f"Index chargé: {len(self.cocktails)} cocktails")
+
+            cocktail_ids, content_hashes = manifest["cocktail_ids"], manifest["content_hashes"]
+            count, dimension = manifest["count"], manifest["dimension"]
+            if len(cocktail_ids) != count or len(content_hashes) != count \
+                    or self._data_hash(cocktail_ids, content_hashes) != manifest["data_hash"]:
+                print("Manifeste de l'index incohérent, reconstruction nécessaire")
+                return False
+            embeddings = np.load(self._artifact_path("embeddings"), mmap_mode='r')
+            if embeddings.dtype != np.float32 or embeddings.shape != (count, dimension):
+                print("Embeddings sauvegardés incohérents avec le manifeste, reconstruction nécessaire")
+                return False
+            index_info = manifest.get("index") or {}
+            index = faiss.read_index(str(self._artifact_path("index")))
+            if index_info.get("type") not in INDEX_TYPES or index.d != dimension or index.ntotal != count:
+                print("Index FAISS incohérent avec le manifeste, reconstruction nécessaire")
+                return False
+            apply_search_params(index, index_info, self.index_params)
+
+            self.index = index
+            self.index_info = index_info
+            self.embeddings = embeddings
+            self.content_hashes = dict(zip(cocktail_ids, content_hashes))
+            self.vector_store = {h: embeddings[row] for row, h in enumerate(content_hashes)}
+            catalog = {c.id: c for c in self.cocktail_service.get_all_cocktails()}
+            if all(cocktail_id in catalog for cocktail_id in cocktail_ids):
+                self.cocktails = [catalog[cocktail_id] for cocktail_id in cocktail_ids]
+                self._row_by_faiss_id = {self._faiss_id(cid): row for row, cid in enumerate(cocktail_ids)}
+            else:
+                # Des cocktails ont disparu du catalogue: build_index réaligne les lignes
+                self.cocktails = []
+                self._row_by_faiss_id = {}
+            self._load_fused_neighbors(manifest["data_hash"])
+            print(f"Index chargé: {count} cocktails (modèle {self.model_id}, backend {self.embedding_backend}, dimension {dimension})")
             return True
         except Exception as e:
             print(f"Erreur chargement index: {e}")
             return False
     
-    def find_similar_cocktails(self, cocktail_id: str, top_k: int = 5, exclude_self: bool = True) -> List[Dict[str, Any]]:
+    def find_similar_cocktails(self, cocktail_id: str, top_k: int = 5, exclude_self: bool = True,
+                               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         if self.index is None or not self.cocktails:
             self.build_index()
         if self.index is None or not self.cocktails:
             return []
-        
+
+        # Classement fusionné précalculé: simple lecture de table (sans filtre: la table ne garde que les meilleurs voisins)
+        if not filters and exclude_self and cocktail_id in self.fused_neighbors and top_k <= FUSED_TOP_K:
+            cocktails_by_id = {c.id: c for c in self.cocktails}
+            return [
+                {
+                    "cocktail": cocktails_by_id[neighbor["id"]],
+                    "similarity_score": neighbor["score"],
+                    "rank": rank + 1,
+                    "scores": neighbor["scores"]
+                }
+                for rank, neighbor in enumerate(self.fused_neighbors[cocktail_id][:top_k])
+            ]
+        return self._find_similar_by_embedding(cocktail_id, top_k, exclude_self, filters)
+
+    def _find_similar_by_embedding(self, cocktail_id: str, top_k: int, exclude_self: bool,
+                                   filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         original_cocktail_idx = None
         for idx, cocktail in enumerate(self.cocktails):
             if cocktail.id == cocktail_id:
@@ -125,11 +405,15 @@ class SimilarityService:
         
         query_embedding = self.embeddings[original_cocktail_idx:original_cocktail_idx+1]
         k = top_k + 1 if exclude_self else top_k
-        distances, indices = self.index.search(query_embedding, k)
-        
+        found = self._search(query_embedding, k, self._filter_rows(filters))
+        if found is None:
+            return []
+        distances, ids = found
+
         results = []
-        for idx, (distance, result_idx) in enumerate(zip(distances[0], indices[0])):
-            if exclude_self and result_idx == original_cocktail_idx:
+        for distance, faiss_id in zip(distances[0], ids[0]):
+            result_idx = self._row_by_faiss_id.get(int(faiss_id))
+            if result_idx is None or (exclude_self and result_idx == original_cocktail_idx):
                 continue
             if len(results) >= top_k:
                 break
@@ -137,26 +421,318 @@ class SimilarityService:
             results.append({"cocktail": cocktail, "similarity_score": float(distance), "rank": len(results) + 1})
         return results
     
-    def find_similar_by_text(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _filter_rows(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Masque des lignes de self.cocktails qui passent les filtres (None sans filtre):
+            include_ingredients  tous ces ingrédients (id ou nom); un ingrédient inconnu ne laisse aucun cocktail
+            exclude_ingredients  aucun de ces ingrédients
+            served               texte contenu dans le service (ex: "rocks")
+            category             texte contenu dans une catégorie (URI ou libellé, ex: "sour")
+            feasible_for         id d'utilisateur: cocktails réalisables avec son inventaire
+        Les ingrédients et l'inventaire sont résolus sur la matrice d'incidence.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value}
+        if not filters:
+            return None
+        unknown = set(filters) - set(SIMILARITY_FILTERS)
+        if unknown:
+            raise ValueError(f"Filtres inconnus: {sorted(unknown)}")
+
+        incidence = get_incidence(self.cocktails)
+        mask = np.ones(len(self.cocktails), dtype=bool)
+        for ingredient in filters.get("include_ingredients", []):
+            col = incidence.column(ingredient)
+            keep = np.zeros_like(mask)
+            if col is not None:
+                keep[incidence.cocktails_with(col)] = True
+            mask &= keep
+        for ingredient in filters.get("exclude_ingredients", []):
+            col = incidence.column(ingredient)
+            if col is not None:
+                mask[incidence.cocktails_with(col)] = False
+        if "feasible_for" in filters:
+            inventory = self.cocktail_service.ingredient_service.get_inventory(filters["feasible_for"])
+            missing = incidence.missing_counts(incidence.ingredient_vector(inventory))
+            mask &= (incidence.sizes > 0) & (missing == 0)
+        if "served" in filters:
+            served = filters["served"].lower()
+            mask &= np.array([served in (c.served or "").lower() for c in self.cocktails], dtype=bool)
+        if "category" in filters:
+            category = filters["category"].lower().replace("_", " ")
+            mask &= np.array([
+                any(category in c_category.lower().replace("_", " ") for c_category in (c.categories or []))
+                for c in self.cocktails
+            ], dtype=bool)
+        return mask
+
+    def _search(self, queries: np.ndarray, k: int,
+                allowed: Optional[np.ndarray] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Recherche FAISS, restreinte par un IDSelectorBatch aux cocktails du masque allowed
+        (voir _filter_rows): le top-k est calculé parmi eux seuls, sans sur-échantillonner
+        puis filtrer. Renvoie None si aucun cocktail n'est autorisé.
+        """
+        if allowed is None:
+            return self.index.search(queries, k)
+        faiss_ids = np.array([self._faiss_id(self.cocktails[row].id) for row in np.flatnonzero(allowed)], dtype=np.int64)
+        if not len(faiss_ids):
+            return None
+        selector = faiss.IDSelectorBatch(faiss_ids)
+        return self.index.search(queries, min(k, len(faiss_ids)), params=search_parameters(self.index_info, selector))
+
+    @staticmethod
+    def _normalize_weights(weights: Dict[str, float]) -> Dict[str, float]:
+        unknown = set(weights) - set(DEFAULT_FUSION_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Signaux inconnus: {sorted(unknown)}")
+        weights = {signal: float(weights.get(signal, 0.0)) for signal in DEFAULT_FUSION_WEIGHTS}
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("La somme des poids doit être positive")
+        return {signal: weight / total for signal, weight in weights.items()}
+
+    def build_fused_neighbors(self, weights: Optional[Dict[str, float]] = None,
+                              top_k: int = FUSED_TOP_K) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Précalcule pour chaque cocktail ses voisins selon un score fusionné:
+            embedding   similarité cosinus des embeddings normalisés
+            ingredients Jaccard sur la matrice d'incidence
+            graph       moyenne de l'allocation de ressources (ingrédients partagés pondérés
+                        par 1/degré, normalisée par cocktail) et de l'appartenance à la
+                        même communauté Louvain
+        Les scores sont calculés par blocs de lignes (produits matriciels), une seule fois.
+        """
+        if weights is not None:
+            self.fusion_weights = self._normalize_weights(weights)
+        if self.embeddings is None or not self.cocktails:
+            return {}
+
+        from backend.services.graph_service import GraphService  # Import local: le graphe n'est utile qu'ici
+        analysis = GraphService().analyze_graph() or {}
+        communities = analysis.get("communities", {})
+
+        incidence = get_incidence(self.cocktails)
+        matrix = incidence.matrix
+        ingredient_degrees = np.asarray(matrix.sum(axis=0)).ravel()
+        resource_weights = matrix.multiply(1.0 / np.maximum(ingredient_degrees, 1.0)).tocsr()
+        community_ids = np.array([communities.get(c.id, -1) for c in self.cocktails])
+        embeddings = np.asarray(self.embeddings, dtype=np.float32)
+        n = len(self.cocktails)
+
+        fused: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, n, FUSED_CHUNK_ROWS):
+            rows = np.arange(start, min(start + FUSED_CHUNK_ROWS, n))
+            local = np.arange(len(rows))
+
+            embedding_scores = embeddings[rows] @ embeddings.T
+            intersections = (matrix[rows] @ matrix.T).toarray()
+            unions = incidence.sizes[rows, None] + incidence.sizes[None, :] - intersections
+            jaccard = np.divide(intersections, unions, out=np.zeros_like(intersections), where=unions > 0)
+
+            resource = (resource_weights[rows] @ matrix.T).toarray()
+            resource[local, rows] = 0.0
+            resource_max = resource.max(axis=1, keepdims=True)
+            resource = np.divide(resource, resource_max, out=np.zeros_like(resource), where=resource_max > 0)
+            same_community = (community_ids[rows, None] == community_ids[None, :]) & (community_ids[rows, None] >= 0)
+            graph_scores = 0.5 * resource + 0.5 * same_community
+
+            signals = {"embedding": embedding_scores, "ingredients": jaccard, "graph": graph_scores}
+            scores = sum(self.fusion_weights[name] * values for name, values in signals.items())
+            scores[local, rows] = -np.inf
+
+            limit = min(top_k, n - 1)
+            for position, row in enumerate(rows):
+                if limit <= 0:
+                    fused[self.cocktails[row].id] = []
+                    continue
+                best = np.argpartition(-scores[position], limit - 1)[:limit]
+                best = best[np.lexsort((best, -scores[position][best]))]
+                fused[self.cocktails[row].id] = [
+                    {
+                        "id": self.cocktails[other].id,
+                        "score": round(float(scores[position][other]), 6),
+                        "scores": {name: round(float(values[position][other]), 6) for name, values in signals.items()}
+                    }
+                    for other in best
+                ]
+
+        self.fused_neighbors = fused
+        print(f"Table de similarité fusionnée construite: {len(fused)} cocktails, poids {self.fusion_weights}")
+        return fused
+
+    def _load_fused_neighbors(self, data_hash: str) -> None:
+        """Charge la table fusionnée si elle correspond aux données et aux poids courants (sinon build_index la recalcule)"""
+        self.fused_neighbors = {}
+        fused_path = self._artifact_path("fused")
+        if fused_path.exists():
+            with open(fused_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get("weights") == self.fusion_weights and stored.get("data_hash") == data_hash:
+                self.fused_neighbors = stored.get("neighbors", {})
+
+    def find_similar_by_text(self, query_text: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None,
+                             mode: str = "dense") -> List[Dict[str, Any]]:
         """Recherche sémantique de cocktails par texte libre (RAG)."""
+        return self.find_similar_by_texts([query_text], top_k, filters, mode)[0]
+
+    def find_similar_by_texts(self, query_texts: List[str], top_k: int = 5, filters: Optional[Dict[str, Any]] = None,
+                              mode: str = "dense") -> List[List[Dict[str, Any]]]:
+        """
+        Recherche sémantique groupée: toutes les requêtes sont encodées en un seul appel au
+        modèle puis cherchées en une seule recherche FAISS. Renvoie un résultat par requête.
+        En mode "hybrid", chaque classement FAISS est fusionné avec le classement BM25.
+        """
+        self._check_mode(mode)
+        if not query_texts:
+            return []
         if self.index is None or not self.cocktails:
             self.build_index()
+        if self.index is None or not self.cocktails:
+            return [[] for _ in query_texts]
+
+        allowed = self._filter_rows(filters)
+        query_embeddings = self._encode_queries(query_texts)
+        found = self._search(query_embeddings, self._search_depth(top_k, mode), allowed)
+        if found is None:
+            return [[] for _ in query_texts]
+        distances, ids = found
+        if mode == "hybrid":
+            return [self._hybrid_results(row_distances, row_ids, self._lexical_search(text, allowed), top_k)
+                    for text, row_distances, row_ids in zip(query_texts, distances, ids)]
+        return [self._search_results(row_distances, row_ids) for row_distances, row_ids in zip(distances, ids)]
+
+    async def find_similar_by_text_async(self, query_text: str, top_k: int = 5,
+                                         filters: Optional[Dict[str, Any]] = None,
+                                         mode: str = "dense") -> List[Dict[str, Any]]:
+        """
+        Version asynchrone de find_similar_by_text pour les routes: l'embedding de la requête
+        est calculé par le QueryBatcher avec les autres requêtes concurrentes. En mode
+        "hybrid", la recherche BM25 tourne pendant l'encodage de la requête.
+        """
+        self._check_mode(mode)
+        if self.index is None or not self.cocktails:
+            # Construction à froid (encodage de tout le catalogue) hors de la boucle d'événements
+            await asyncio.to_thread(self._build_index_once)
         if self.index is None or not self.cocktails:
             return []
-        
-        query_embedding = self.model.encode([query_text])
-        faiss.normalize_L2(query_embedding)
-        distances, indices = self.index.search(query_embedding, top_k)
-        
+
+        allowed = self._filter_rows(filters)
+        query_embedding = self.query_cache.get(query_text)
+        encoding = None
+        if query_embedding is None:
+            encoding = asyncio.ensure_future(self.query_batcher.encode(query_text))
+            # Laisse la requête rejoindre le lot en cours avant le calcul BM25
+            await asyncio.sleep(0)
+        lexical = self._lexical_search(query_text, allowed) if mode == "hybrid" else None
+        if encoding is not None:
+            query_embedding = await encoding
+        found = self._search(query_embedding[None, :], self._search_depth(top_k, mode), allowed)
+        if found is None:
+            return []
+        distances, ids = found
+        if lexical is not None:
+            return self._hybrid_results(distances[0], ids[0], lexical, top_k)
+        return self._search_results(distances[0], ids[0])
+
+    def _build_index_once(self) -> None:
+        """Construit l'index s'il manque; les requêtes arrivées pendant la construction l'attendent"""
+        with self._build_lock:
+            if self.index is None or not self.cocktails:
+                self.build_index()
+
+    @staticmethod
+    def _check_mode(mode: str) -> None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Mode de recherche inconnu '{mode}', attendu parmi {list(SEARCH_MODES)}")
+
+    @staticmethod
+    def _search_depth(top_k: int, mode: str) -> int:
+        return max(top_k, HYBRID_CANDIDATES) if mode == "hybrid" else top_k
+
+    def _lexical_index(self) -> BM25Index:
+        """Index BM25 des textes de self.cocktails, reconstruit quand le catalogue change"""
+        if self._bm25_index is None or self._bm25_index.source is not self.cocktails:
+            self._bm25_index = BM25Index([self._create_cocktail_text(c) for c in self.cocktails], source=self.cocktails)
+        return self._bm25_index
+
+    def _lexical_search(self, query_text: str, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        return self._lexical_index().search(query_text, HYBRID_CANDIDATES, allowed)
+
+    def _hybrid_results(self, distances: np.ndarray, faiss_ids: np.ndarray,
+                        lexical: Tuple[np.ndarray, np.ndarray], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Fusion par rang réciproque du classement FAISS et du classement BM25. Chaque résultat
+        garde ses scores d'origine (cosinus, BM25; None si absent d'un des classements).
+        """
+        dense = {}
+        for distance, faiss_id in zip(distances, faiss_ids):
+            row = self._row_by_faiss_id.get(int(faiss_id))
+            if row is not None:
+                dense[row] = float(distance)
+        lexical_rows, lexical_scores = lexical
+        bm25 = dict(zip(lexical_rows.tolist(), lexical_scores.tolist()))
+        return [
+            {
+                "cocktail": self.cocktails[row],
+                "similarity_score": round(score, 6),
+                "rank": rank + 1,
+                "scores": {"embedding": dense.get(row), "bm25": bm25.get(row)}
+            }
+            for rank, (row, score) in enumerate(reciprocal_rank_fusion([list(dense), list(bm25)], k=RRF_K)[:top_k])
+        ]
+
+    def _encode_queries(self, query_texts: List[str]) -> np.ndarray:
+        """
+        Embeddings normalisés (float32) d'une liste de requêtes: celles du cache LRU sont
+        reprises telles quelles, les autres encodées en un seul passage du modèle.
+        """
+        vectors = [self.query_cache.get(text) for text in query_texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(query_texts, vectors) if vector is None))
+        if missing:
+            encoded = dict(zip(missing, self._encode_with_model(missing)))
+            vectors = [encoded[text] if vector is None else vector for text, vector in zip(query_texts, vectors)]
+        return np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+
+    def _encode_with_model(self, query_texts: List[str]) -> np.ndarray:
+        """Passage du modèle sur une liste de requêtes; les vecteurs normalisés alimentent le cache"""
+        with self._model_lock:
+            query_embeddings = np.ascontiguousarray(self.model.encode(list(query_texts)), dtype=np.float32)
+        faiss.normalize_L2(query_embeddings)
+        for text, vector in zip(query_texts, query_embeddings):
+            self.query_cache.set(text, vector)
+        return query_embeddings
+
+    def save_query_cache(self) -> None:
+        """Sauvegarde le cache des embeddings de requêtes (si la persistance est activée)"""
+        if self.persist_query_cache:
+            self.query_cache.save(self._artifact_path("query_cache"))
+
+    def query_stats(self) -> Dict[str, Any]:
+        """Métriques du chemin des requêtes texte: cache LRU et micro-batching"""
+        return {"query_cache": self.query_cache.stats(), "batching": self.query_batcher.stats()}
+
+    def _search_results(self, distances: np.ndarray, faiss_ids: np.ndarray) -> List[Dict[str, Any]]:
         results = []
-        for idx, (distance, cocktail_idx) in enumerate(zip(distances[0], indices[0])):
+        for distance, faiss_id in zip(distances, faiss_ids):
+            cocktail_idx = self._row_by_faiss_id.get(int(faiss_id))
+            if cocktail_idx is None:
+                continue
             cocktail = self.cocktails[cocktail_idx]
-            results.append({"cocktail": cocktail, "similarity_score": float(distance), "rank": idx + 1})
+            results.append({"cocktail": cocktail, "similarity_score": float(distance), "rank": len(results) + 1})
         return results
     
-    def find_similar_by_ingredients(self, ingredients: List[str], top_k: int = 5) -> List[Dict[str, Any]]:
-        query_text = f"Cocktail avec les ingrédients: {', '.join(ingredients)}"
-        return self.find_similar_by_text(query_text, top_k)
+    @staticmethod
+    def _ingredients_query(ingredients: List[str]) -> str:
+        return f"Cocktail avec les ingrédients: {', '.join(ingredients)}"
+
+    def find_similar_by_ingredients(self, ingredients: List[str], top_k: int = 5,
+                                    filters: Optional[Dict[str, Any]] = None, mode: str = "dense") -> List[Dict[str, Any]]:
+        return self.find_similar_by_text(self._ingredients_query(ingredients), top_k, filters, mode)
+
+    async def find_similar_by_ingredients_async(self, ingredients: List[str], top_k: int = 5,
+                                                filters: Optional[Dict[str, Any]] = None,
+                                                mode: str = "dense") -> List[Dict[str, Any]]:
+        return await self.find_similar_by_text_async(self._ingredients_query(ingredients), top_k, filters, mode)
     
     def _generate_cluster_title(self, cocktails: List[Cocktail]) -> str:
         """Generate a vibe/title for a cluster using LLM based on cocktail characteristics."""
@@ -272,4 +848,20 @@ class SimilarityService:
         self.clusters_cache.set(cache_key, clusters)
         print(f"Clusters cached (n_clusters={n_clusters})")
         
-        return clusters
\ No newline at end of file
+        return clusters
+
+
+if __name__ == "__main__":
+    # Traitement batch: reconstruit l'index FAISS et la table de similarité fusionnée
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construit l'index de similarité et la table fusionnée")
+    for signal, weight in DEFAULT_FUSION_WEIGHTS.items():
+        parser.add_argument(f"--{signal}-weight", type=float, default=weight, dest=signal)
+    parser.add_argument("--backend", default=None, help="Backend d'embedding: torch, onnx ou lexical")
+    parser.add_argument("--index-type", default=None, help="Type d'index: auto, flat, ivf_flat, ivf_pq ou hnsw")
+    args = parser.parse_args()
+
+    service = SimilarityService(fusion_weights={signal: getattr(args, signal) for signal in DEFAULT_FUSION_WEIGHTS},
+                                embedding_backend=args.backend, index_type=args.index_type)
+    service.build_index(force_rebuild=True)
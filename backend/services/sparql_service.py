@@ -1,9 +1,14 @@
 from rdflib import Graph
-from rdflib.term import URIRef
-from typing import Optional, Union
+from rdflib.term import URIRef, Literal, Variable
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.algebra import translateQuery, Join, ToMultiSet
+from rdflib.plugins.sparql.evaluate import evalQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+from typing import Any, Dict, Iterator, Optional, Union, List, Set
 
 # Importer le parser IBA
 from backend.data.ttl_parser import IBADataParser
+from backend.data.text_index import get_text_index
 from backend.utils.graph_loader import get_shared_graph
 
 class SparqlService:
@@ -41,25 +46,132 @@ class SparqlService:
 
         try:
             print("DEBUG: Executing query on local graph")
-            # Execute query on local graph
-            result = self.local_graph.query(query)
-
-            # Convert directly to Python list of dicts
-            rows = []
-            for row in result:
-                row_dict = {}
-                for var, value in zip(result.vars, row):
-                    if value is not None:
-                        row_dict[str(var)] = {
-                            "value": str(value),
-                            "type": "uri" if isinstance(value, URIRef) else "literal"
-                        }
-                    else:
-                        row_dict[str(var)] = {"value": None, "type": "literal"}
-                rows.append(row_dict)
-
+            rows = list(self.iter_local_query(query))
             print(f"DEBUG: Query executed successfully, {len(rows)} results")
             return rows
         except Exception as e:
             print(f"DEBUG: Error executing local SPARQL query: {e}")
             return None
+
+    def iter_local_query(self, query: str) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """
+        Execute SPARQL query on local RDF graph and yield rows one by one.
+        Rows have the same shape as execute_local_query; errors are raised to the caller.
+        SELECT queries are evaluated straight from the query algebra: rdflib's Result
+        would first copy every solution into a list, here each one is produced on demand
+        (operators such as ORDER BY or DISTINCT still need their full input).
+        """
+        if self.local_graph is None:
+            return
+
+        prepared = self._rewrite_text_filters(query)
+        if isinstance(self.local_graph, Graph) and isinstance(prepared, str):
+            prepared = translateQuery(parseQuery(prepared), initNs=dict(self.local_graph.namespaces()))
+
+        if isinstance(self.local_graph, Graph) and prepared.algebra.name == "SelectQuery":
+            evaluated = evalQuery(self.local_graph, prepared)
+            variables = evaluated["vars_"]
+            rows = (tuple(solution.get(var) for var in variables) for solution in evaluated["bindings"])
+        else:
+            rows = self.local_graph.query(prepared)
+            variables = rows.vars
+        variables = [str(var) for var in variables]
+
+        for row in rows:
+            row_dict = {}
+            for var, value in zip(variables, row):
+                if value is not None:
+                    row_dict[var] = {
+                        "value": str(value),
+                        "type": "uri" if isinstance(value, URIRef) else "literal"
+                    }
+                else:
+                    row_dict[var] = {"value": None, "type": "literal"}
+            yield row_dict
+
+    def _rewrite_text_filters(self, query: str):
+        """
+        Rewrite simple FILTER(CONTAINS(LCASE(?x), "term")) patterns to use the text index.
+
+        For each such filter whose variable is bound by a required triple pattern,
+        the candidate literals from the text index are joined in front of the
+        pattern as VALUES bindings. The FILTER itself is kept, so results are
+        identical; the triple store only has to check the candidates.
+        Returns the original query string when nothing can be rewritten.
+        """
+        if not isinstance(self.local_graph, Graph):
+            return query
+
+        try:
+            parsed = translateQuery(parseQuery(query), initNs=dict(self.local_graph.namespaces()))
+        except Exception:
+            # Let the regular execution path report syntax errors
+            return query
+
+        index = get_text_index(self.local_graph)
+        if not self._rewrite_node(parsed.algebra, index):
+            return query
+        return parsed
+
+    def _rewrite_node(self, node, index) -> bool:
+        """Walk the query algebra and rewrite eligible Filter nodes in place"""
+        if not isinstance(node, CompValue) or node.name in ("Graph", "ServiceGraphPattern"):
+            return False
+
+        rewritten = False
+        for value in node.values():
+            if isinstance(value, CompValue):
+                rewritten |= self._rewrite_node(value, index)
+            elif isinstance(value, list):
+                for item in value:
+                    rewritten |= self._rewrite_node(item, index)
+
+        if node.name != "Filter":
+            return rewritten
+
+        bound = self._required_variables(node.p)
+        for variable, term in self._contains_terms(node.expr):
+            if variable not in bound or not index.can_lookup(term):
+                continue
+            values = CompValue("values", res=[{variable: literal} for literal in index.candidates(term)])
+            join = Join(ToMultiSet(values), node.p)
+            join["lazy"] = True  # Evaluate the candidates first, then the pattern with ?x bound
+            node["p"] = join
+            bound = self._required_variables(node.p)
+            rewritten = True
+        return rewritten
+
+    @staticmethod
+    def _contains_terms(expr) -> List[tuple]:
+        """Extract (variable, term) pairs from CONTAINS(LCASE(?x), "term") conjuncts"""
+        if not isinstance(expr, CompValue):
+            return []
+        if expr.name == "ConditionalAndExpression":
+            pairs = SparqlService._contains_terms(expr.expr)
+            for other in expr.other or []:
+                pairs.extend(SparqlService._contains_terms(other))
+            return pairs
+        if expr.name != "Builtin_CONTAINS" or not isinstance(expr.arg2, Literal):
+            return []
+
+        arg = expr.arg1
+        if isinstance(arg, CompValue) and arg.name == "Builtin_LCASE":
+            arg = arg.arg
+        if isinstance(arg, Variable):
+            return [(arg, str(expr.arg2))]
+        return []
+
+    @staticmethod
+    def _required_variables(node) -> Set[Variable]:
+        """Variables bound in every solution of a pattern (non-optional triple patterns)"""
+        if not isinstance(node, CompValue):
+            return set()
+        if node.name == "BGP":
+            return {term for triple in node.triples for term in triple if isinstance(term, Variable)}
+        if node.name == "Join":
+            return SparqlService._required_variables(node.p1) | SparqlService._required_variables(node.p2)
+        if node.name in ("LeftJoin", "Minus"):
+            return SparqlService._required_variables(node.p1)
+        if node.name == "Filter":
+            return SparqlService._required_variables(node.p)
+        return set()
@@ -0,0 +1,215 @@
+"""
+Types d'index FAISS pour l'index de similarité
+    flat      recherche exacte (force brute), idéale pour un petit catalogue
+    ivf_flat  partition en nlist cellules (k-means), nprobe cellules visitées par requête
+    ivf_pq    IVF + quantification produit des vecteurs (pq_m sous-vecteurs de pq_nbits bits)
+    hnsw      graphe de voisinage navigable (M liens par nœud, efSearch candidats par requête)
+"auto" choisit le type d'après la taille du catalogue. Tous les index sont interrogés
+par ids externes (ceux de SimilarityService._faiss_id), comme l'ancien IndexIDMap2(IndexFlatIP).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+import time
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Sélection automatique: recherche exacte jusqu'à AUTO_FLAT_MAX vecteurs, IVF-Flat jusqu'à AUTO_IVF_FLAT_MAX, IVF-PQ au-delà
+AUTO_FLAT_MAX = 20_000
+AUTO_IVF_FLAT_MAX = 500_000
+# Un index IVF entraîné sur n vecteurs est réentraîné quand le catalogue dépasse IVF_RETRAIN_GROWTH × n
+IVF_RETRAIN_GROWTH = 4
+
+DEFAULT_INDEX_PARAMS: Dict[str, Optional[int]] = {
+    "nlist": None,      # IVF: 4·√n par défaut, au plus n/39 (points d'entraînement par centroïde)
+    "nprobe": 16,
+    "pq_m": None,       # IVF-PQ: ~ dimension/8 sous-vecteurs, diviseur de la dimension
+    "pq_nbits": 8,
+    "M": 32,
+    "efConstruction": 80,
+    "efSearch": 64,
+}
+PARAMS_BY_TYPE = {
+    "flat": (),
+    "ivf_flat": ("nlist", "nprobe"),
+    "ivf_pq": ("nlist", "nprobe", "pq_m", "pq_nbits"),
+    "hnsw": ("M", "efConstruction", "efSearch"),
+}
+# Paramètres réglables sans reconstruire l'index
+SEARCH_PARAMS = ("nprobe", "efSearch")
+
+
+def resolve_index_type(index_type: str, n: int) -> str:
+    if index_type == "auto":
+        if n <= AUTO_FLAT_MAX:
+            return "flat"
+        return "ivf_flat" if n <= AUTO_IVF_FLAT_MAX else "ivf_pq"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Type d'index inconnu '{index_type}', attendu 'auto' ou parmi {list(INDEX_TYPES)}")
+    return index_type
+
+
+def resolve_params(index_type: str, n: int, dimension: int,
+                   params: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Paramètres effectifs d'un type d'index pour n vecteurs de la dimension donnée"""
+    params = params or {}
+    unknown = set(params) - set(DEFAULT_INDEX_PARAMS)
+    if unknown:
+        raise ValueError(f"Paramètres d'index inconnus: {sorted(unknown)}")
+    resolved = {**DEFAULT_INDEX_PARAMS, **{key: value for key, value in params.items() if value is not None}}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        if resolved["nlist"] is None:
+            resolved["nlist"] = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        resolved["nlist"] = max(1, min(resolved["nlist"], n))
+        resolved["nprobe"] = max(1, min(resolved["nprobe"], resolved["nlist"]))
+    if index_type == "ivf_pq" and resolved["pq_m"] is None:
+        target = max(1, dimension // 8)
+        resolved["pq_m"] = max(m for m in range(1, target + 1) if dimension % m == 0)
+    return {key: int(resolved[key]) for key in PARAMS_BY_TYPE[index_type]}
+
+
+def supports_remove(index_type: str) -> bool:
+    """HNSW ne sait pas retirer de vecteurs: une suppression impose une reconstruction"""
+    return index_type != "hnsw"
+
+
+def build_vector_index(vectors: np.ndarray, ids: np.ndarray, index_type: str = "auto",
+                       params: Optional[Dict[str, Any]] = None) -> Tuple[faiss.Index, Dict[str, Any]]:
+    """
+    Construit (entraîne si besoin) un index produit scalaire sur des vecteurs normalisés et
+    y ajoute les vecteurs sous leurs ids. Renvoie l'index et sa description
+    {"type", "params", "trained_on"}, enregistrée dans le manifeste.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    n, dimension = vectors.shape
+    index_type = resolve_index_type(index_type, n)
+    resolved = resolve_params(index_type, n, dimension, params)
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, resolved["M"], metric)
+        hnsw.hnsw.efConstruction = resolved["efConstruction"]
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, resolved["nlist"], metric)
+        else:
+            if n < 2 ** resolved["pq_nbits"]:
+                raise ValueError(f"ivf_pq demande au moins {2 ** resolved['pq_nbits']} vecteurs (pq_nbits="
+                                 f"{resolved['pq_nbits']}), {n} disponibles")
+            index = faiss.IndexIVFPQ(quantizer, dimension, resolved["nlist"], resolved["pq_m"],
+                                     resolved["pq_nbits"], metric)
+        index.train(vectors)
+
+    index.add_with_ids(vectors, ids)
+    info = {"type": index_type, "params": resolved, "trained_on": n}
+    apply_search_params(index, info)
+    return index, info
+
+
+def apply_search_params(index: faiss.Index, info: Dict[str, Any],
+                        overrides: Optional[Dict[str, Any]] = None) -> None:
+    """Applique nprobe / efSearch (ceux de info, ou les surcharges de la configuration)"""
+    params = {**info["params"], **{key: value for key, value in (overrides or {}).items()
+                                   if key in SEARCH_PARAMS and key in info["params"] and value is not None}}
+    if info["type"] in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = int(min(params["nprobe"], params["nlist"]))
+    elif info["type"] == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = int(params["efSearch"])
+    info["params"] = {key: int(value) for key, value in params.items()}
+
+
+def search_parameters(info: Optional[Dict[str, Any]], selector: faiss.IDSelector) -> faiss.SearchParameters:
+    """Paramètres de recherche restreinte à un sélecteur d'ids, avec le nprobe / efSearch de l'index"""
+    index_type = (info or {}).get("type", "flat")
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=int(info["params"]["nprobe"]))
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=int(info["params"]["efSearch"]))
+    return faiss.SearchParameters(sel=selector)
+
+
+def benchmark_index_types(vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                          configs: Optional[Sequence[Tuple[str, Dict[str, Any]]]] = None,
+                          repeats: int = 3) -> List[Dict[str, Any]]:
+    """
+    Compare des configurations d'index à la recherche exacte: rappel@k (part des k vrais
+    voisins retrouvés), latence moyenne par requête (recherche groupée, meilleur de repeats)
+    et temps de construction.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    if configs is None:
+        configs = [("flat", {}), ("ivf_flat", {}), ("hnsw", {})]
+        if len(vectors) >= 2 ** DEFAULT_INDEX_PARAMS["pq_nbits"]:
+            configs.append(("ivf_pq", {}))
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type, params in configs:
+        start = time.perf_counter()
+        index, info = build_vector_index(vectors, ids, index_type, params)
+        build_seconds = time.perf_counter() - start
+        latency = math.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, found = index.search(queries, k)
+            latency = min(latency, (time.perf_counter() - start) * 1000 / len(queries))
+        recall = np.mean([len(set(row[row >= 0]) & set(expected)) / k for row, expected in zip(found, truth)])
+        results.append({
+            "type": info["type"],
+            "params": info["params"],
+            f"recall@{k}": round(float(recall), 4),
+            "latency_ms": round(latency, 4),
+            "build_s": round(build_seconds, 3)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark rappel@k / latence sur les embeddings sauvegardés ou sur des données synthétiques
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare les types d'index FAISS à la recherche exacte")
+    parser.add_argument("--embeddings", help="Fichier .npy d'embeddings normalisés (ex: embeddings.npy des artefacts)")
+    parser.add_argument("--size", type=int, default=100_000, help="Nombre de vecteurs synthétiques")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.embeddings:
+        data = np.load(args.embeddings).astype(np.float32)
+    else:
+        # Vecteurs groupés autour de centres aléatoires, comme des embeddings de textes proches
+        centers = rng.standard_normal((max(args.size // 100, 1), args.dim)).astype(np.float32)
+        data = centers[rng.integers(len(centers), size=args.size)] \
+            + 0.5 * rng.standard_normal((args.size, args.dim)).astype(np.float32)
+    faiss.normalize_L2(data)
+    sample = data[rng.choice(len(data), size=min(args.queries, len(data)), replace=False)]
+    queries = sample + 0.05 * rng.standard_normal(sample.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    configs = [("flat", {})]
+    configs += [("ivf_flat", {"nprobe": nprobe}) for nprobe in args.nprobe]
+    if len(data) >= 2 ** DEFAULT_INDEX_PARAMS["pq_nbits"]:
+        configs += [("ivf_pq", {"nprobe": nprobe}) for nprobe in args.nprobe]
+    configs += [("hnsw", {"efSearch": ef}) for ef in args.ef_search]
+
+    print(f"{len(data)} vecteurs de dimension {data.shape[1]}, {len(queries)} requêtes, k={args.k}")
+    for row in benchmark_index_types(data, queries, k=args.k, configs=configs):
+        print(f"{row['type']:<9} {str(row['params']):<60} rappel@{args.k} {row[f'recall@{args.k}']:.4f}  "
+              f"{row['latency_ms']:.4f} ms/requête  construction {row['build_s']:.2f} s")
@@ -9,7 +9,7 @@ This module tests all API routes including:
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 import sys
 from pathlib import Path
 
@@ -176,7 +176,91 @@ class TestCocktailsEndpoints:
         response = client.get("/cocktails/similar/mojito?limit=5")
         
         assert response.status_code == 200
-        mock_service.find_similar_cocktails.assert_called_once_with("mojito", top_k=5)
+        mock_service.find_similar_cocktails.assert_called_once_with("mojito", top_k=5, filters=None)
+
+    @patch('backend.routes.cocktails.similarity_service')
+    def test_similarity_filters_are_passed_to_the_search(self, mock_service, client):
+        """Test filter query parameters on the similarity endpoints"""
+        mock_service.find_similar_cocktails.return_value = []
+        mock_service.find_similar_by_text_async = AsyncMock(return_value=[])
+        mock_service.find_similar_by_texts.return_value = [[]]
+
+        response = client.get("/cocktails/similar/mojito?include=Rum&include=Mint&exclude=Sugar&served=rocks")
+        assert response.status_code == 200
+        mock_service.find_similar_cocktails.assert_called_once_with("mojito", top_k=5, filters={
+            "include_ingredients": ["Rum", "Mint"], "exclude_ingredients": ["Sugar"], "served": "rocks"
+        })
+
+        response = client.get("/cocktails/search-semantic?query=fruity&category=sour&feasible_for=user123")
+        assert response.status_code == 200
+        mock_service.find_similar_by_text_async.assert_awaited_once_with(
+            "fruity", top_k=5, filters={"category": "sour", "feasible_for": "user123"}, mode="dense"
+        )
+
+        response = client.post("/cocktails/search-semantic/batch", json={"queries": ["fruity"], "exclude": ["Gin"]})
+        assert response.status_code == 200
+        mock_service.find_similar_by_texts.assert_called_once_with(
+            ["fruity"], top_k=5, filters={"exclude_ingredients": ["Gin"]}, mode="dense"
+        )
+
+    @patch('backend.routes.cocktails.similarity_service')
+    def test_search_semantic(self, mock_service, client, mock_cocktail):
+        """Test GET /cocktails/search-semantic goes through the micro-batched search"""
+        mock_service.find_similar_by_text_async = AsyncMock(return_value=[
+            {"cocktail": mock_cocktail, "similarity_score": 0.8, "rank": 1}
+        ])
+
+        response = client.get("/cocktails/search-semantic?query=fruity&top_k=3")
+
+        assert response.status_code == 200
+        assert response.json()["results"][0]["similarity_score"] == 0.8
+        mock_service.find_similar_by_text_async.assert_awaited_once_with("fruity", top_k=3, filters=None, mode="dense")
+
+    @patch('backend.routes.cocktails.similarity_service')
+    def test_search_semantic_hybrid(self, mock_service, client, mock_cocktail):
+        """Test GET /cocktails/search-semantic?mode=hybrid returns fused results in one request"""
+        mock_service.find_similar_by_text_async = AsyncMock(return_value=[
+            {"cocktail": mock_cocktail, "similarity_score": 0.032, "rank": 1, "scores": {"embedding": 0.4, "bm25": 3.1}}
+        ])
+
+        response = client.get("/cocktails/search-semantic?query=mojito&mode=hybrid")
+
+        assert response.status_code == 200
+        assert response.json()["results"][0]["scores"]["bm25"] == 3.1
+        mock_service.find_similar_by_text_async.assert_awaited_once_with("mojito", top_k=5, filters=None, mode="hybrid")
+        assert client.get("/cocktails/search-semantic?query=mojito&mode=sparse").status_code == 400
+        assert client.post("/cocktails/search-semantic/batch",
+                           json={"queries": ["mojito"], "mode": "sparse"}).status_code == 400
+
+    @patch('backend.routes.cocktails.similarity_service')
+    def test_search_semantic_stats(self, mock_service, client):
+        """Test GET /cocktails/search-semantic/stats"""
+        mock_service.query_stats.return_value = {"query_cache": {"hit_rate": 0.5}, "batching": {"batches": 2}}
+
+        response = client.get("/cocktails/search-semantic/stats")
+
+        assert response.status_code == 200
+        assert response.json()["query_cache"]["hit_rate"] == 0.5
+
+    @patch('backend.routes.cocktails.similarity_service')
+    def test_search_semantic_batch(self, mock_service, client, mock_cocktail):
+        """Test POST /cocktails/search-semantic/batch"""
+        mock_service.find_similar_by_texts.return_value = [
+            [{"cocktail": mock_cocktail, "similarity_score": 0.9, "rank": 1}],
+            []
+        ]
+
+        response = client.post("/cocktails/search-semantic/batch", json={"queries": ["fruity", "bitter"], "top_k": 3})
+
+        assert response.status_code == 200
+        data = response.json()["results"]
+        assert [entry["query"] for entry in data] == ["fruity", "bitter"]
+        assert data[0]["results"][0]["similarity_score"] == 0.9
+        assert data[1]["results"] == []
+        mock_service.find_similar_by_texts.assert_called_once_with(["fruity", "bitter"], top_k=3, filters=None, mode="dense")
+
+        assert client.post("/cocktails/search-semantic/batch", json={"queries": []}).status_code == 400
+        assert client.post("/cocktails/search-semantic/batch", json={"queries": ["a"], "top_k": 50}).status_code == 422
 
     @patch('backend.routes.cocktails.get_cocktail_service')
     def test_get_same_vibe_cocktails(self, mock_get_service, client, mock_cocktail):
@@ -350,6 +434,30 @@ class TestIngredientsEndpoints:
         assert response.status_code == 500
         assert "Failed to retrieve inventory" in response.json()["detail"]
 
+    @patch('backend.routes.ingredients.service')
+    def test_get_ingredient_pairs(self, mock_service, client):
+        """Test GET /ingredients/{ingredient_id}/pairs with an ingredient URI"""
+        mock_service.get_ingredient_pairs.return_value = {
+            "ingredient": {"id": "http://marmitonic.local/ingredient/gin", "name": "Gin", "cocktail_count": 2},
+            "pairs": [{"id": "http://marmitonic.local/ingredient/campari", "name": "Campari",
+                       "count": 1, "lift": 1.5, "pmi": 0.585}]
+        }
+
+        response = client.get("/ingredients/http://marmitonic.local/ingredient/gin/pairs?limit=5&sort=lift")
+
+        assert response.status_code == 200
+        assert response.json()["pairs"][0]["name"] == "Campari"
+        mock_service.get_ingredient_pairs.assert_called_with(
+            "http://marmitonic.local/ingredient/gin", limit=5, sort_by="lift")
+
+    @patch('backend.routes.ingredients.service')
+    def test_get_ingredient_pairs_not_found(self, mock_service, client):
+        """Test GET /ingredients/{ingredient_id}/pairs for an unknown ingredient or ranking"""
+        mock_service.get_ingredient_pairs.return_value = None
+
+        assert client.get("/ingredients/unknown/pairs").status_code == 404
+        assert client.get("/ingredients/gin/pairs?sort=pmi").status_code == 400
+
 
 class TestPlannerEndpoints:
     """Test planner API endpoints"""
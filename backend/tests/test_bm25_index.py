@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.bm25_index import BM25Index, reciprocal_rank_fusion
+
+
+@pytest.fixture
+def index():
+    return BM25Index([
+        "Nom: Mojito | Ingrédients: Rhum blanc, Menthe, Citron vert",
+        "Nom: Daiquiri | Ingrédients: Rhum blanc, Citron vert, Sucre",
+        "Nom: Aviation | Ingrédients: Gin, Marasquin, Crème de violette, Citron",
+        "Nom: Gin Tonic | Ingrédients: Gin, Tonic",
+    ])
+
+
+class TestBM25Index:
+
+    def test_rare_terms_outweigh_common_ones(self, index):
+        rows, scores = index.search("violette rhum", 10)
+
+        # "violette" appears once in the catalog, "rhum" twice
+        assert rows.tolist() == [2, 0, 1]
+        assert scores[0] > scores[1] >= scores[2] > 0
+
+    def test_exact_name_and_accents(self, index):
+        assert index.search("MOJITO", 1)[0].tolist() == [0]
+        assert index.search("creme de violette", 1)[0].tolist() == [2]
+        assert len(index.search("whisky", 5)[0]) == 0
+
+    def test_allowed_mask_and_k(self, index):
+        rows, _ = index.search("gin citron", 10, allowed=np.array([True, True, False, True]))
+        assert 2 not in rows.tolist()
+        assert len(index.search("gin citron", 2)[0]) == 2
+
+
+class TestReciprocalRankFusion:
+
+    def test_items_ranked_by_both_lists_come_first(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]], k=60)
+
+        assert [item for item, _ in fused] == [1, 3, 2, 4]
+        assert fused[0][1] == pytest.approx(1 / 61 + 1 / 63)
+        assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.embedding_backends import EmbeddingBackend, LexicalBackend, create_backend
+
+
+def cosine(a, b):
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+class TestLexicalBackend:
+
+    def test_vectors_are_deterministic_and_ignore_accents(self):
+        backend = LexicalBackend(n_features=256)
+        first, second, other = backend.encode(["Rhum épicé, citron vert", "rhum epice citron vert", "Gin Campari"])
+
+        assert first.shape == (256,) and first.dtype == np.float32
+        assert np.array_equal(first, second)
+        assert np.array_equal(first, LexicalBackend(n_features=256).encode(["Rhum épicé, citron vert"])[0])
+        assert cosine(first, second) > cosine(first, other)
+
+    def test_shared_words_and_stems_raise_similarity(self):
+        backend = create_backend("lexical")
+        query, close, far = backend.encode(["cocktail fruité", "Nom: Punch aux fruits | Ingrédients: Rhum", "Whisky sec"])
+
+        assert backend.model_id == "lexical-hashing-2048"
+        assert cosine(query, close) > cosine(query, far)
+        # Labels and stopwords only: no feature at all
+        assert not backend.encode(["Nom: cocktail de"]).any()
+
+
+class TestEmbeddingBackendInterface:
+
+    def test_backend_without_loader_cannot_be_created(self):
+        class Incomplete(EmbeddingBackend):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+        with pytest.raises(TypeError):
+            EmbeddingBackend()
+
+    def test_only_known_uncased_models_ignore_case(self):
+        assert create_backend("torch").uncased
+        assert create_backend("lexical").uncased
+        assert not create_backend("torch", "sentence-transformers/all-mpnet-base-v2").uncased
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.embedding_cache import EmbeddingLRUCache
+
+
+class TestEmbeddingLRUCache:
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = EmbeddingLRUCache(max_size=2, lowercase=True)
+        cache.set("fruity", np.array([1.0, 0.0]))
+        cache.set("bitter", np.array([0.0, 1.0]))
+
+        # Lookups ignore case and extra spaces, and refresh the entry
+        assert cache.get("  Fruity ") is not None
+        cache.set("sour", np.array([0.5, 0.5]))
+
+        assert cache.get("bitter") is None
+        assert cache.get("fruity") is not None
+        assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 1, "evictions": 1, "hit_rate": 0.6667}
+
+    def test_saved_cache_is_reloaded_for_same_model(self, tmp_path):
+        path = tmp_path / "query_embeddings.npz"
+        cache = EmbeddingLRUCache(model_name="model-a", lowercase=True)
+        cache.set("refreshing summer", np.array([0.6, 0.8], dtype=np.float32))
+        cache.save(path)
+
+        reloaded = EmbeddingLRUCache(model_name="model-a", lowercase=True)
+        assert reloaded.load(path)
+        assert np.allclose(reloaded.get("Refreshing summer"), [0.6, 0.8])
+        assert not EmbeddingLRUCache(model_name="model-b", lowercase=True).load(path)
+        # Lowercased keys are not reused by a cache that tells cases apart
+        assert not EmbeddingLRUCache(model_name="model-a").load(path)
+        assert not EmbeddingLRUCache(model_name="model-a").load(tmp_path / "missing.npz")
+
+    def test_case_is_kept_for_cased_models(self):
+        cache = EmbeddingLRUCache()
+        cache.set("Gin", np.array([1.0, 0.0]))
+
+        assert cache.get("gin") is None
+        assert cache.get(" Gin  ") is not None
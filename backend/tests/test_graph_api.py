@@ -50,3 +50,60 @@ class TestGraphApi:
         assert len(data['links']) == 1
         assert data['links'][0]['source'] == 'uri1'
         assert data['links'][0]['target'] == 'uri2'
+
+    @patch('backend.routes.graphs.GraphService')
+    def test_sparql_graph_columnar_format(self, mock_service_class, client):
+        """Test that the columnar format is served when requested with Accept"""
+        from backend.services.graph_service import GraphService
+
+        mock_service = Mock()
+        mock_service_class.return_value = mock_service
+        mock_service_class.to_columnar = GraphService.to_columnar
+        mock_service.get_graph_data.return_value = {
+            'nodes': [
+                {'id': 'uri1', 'name': 'n1', 'type': 'cocktail'},
+                {'id': 'uri2', 'name': 'n2', 'type': 'ingredient'}
+            ],
+            'edges': [
+                {'source': 'uri1', 'target': 'uri2', 'value': 1}
+            ]
+        }
+
+        response = client.post(
+            "/graphs/sparql",
+            json={"query": "SELECT * WHERE { ?s ?p ?o }"},
+            headers={"Accept": "application/vnd.marmitonic.graph+json"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith("application/vnd.marmitonic.graph+json")
+        data = response.json()
+        assert data['nodes']['id'] == ['uri1', 'uri2']
+        assert data['links'] == {'source': [0], 'target': [1]}
+
+    @patch('backend.routes.graphs.GraphService')
+    def test_ego_graph_endpoint(self, mock_service_class, client):
+        """Test the ego-network endpoint with an ingredient URI and an unknown node"""
+        mock_service = Mock()
+        mock_service_class.return_value = mock_service
+        mock_service.get_full_layout.return_value = None
+        mock_service.get_ego_network.return_value = {
+            'nodes': [
+                {'id': 'http://marmitonic.local/ingredient/gin', 'name': 'Gin', 'type': 'ingredient'},
+                {'id': 'negroni', 'name': 'Negroni', 'type': 'cocktail'}
+            ],
+            'edges': [
+                {'source': 'negroni', 'target': 'http://marmitonic.local/ingredient/gin', 'value': 1}
+            ]
+        }
+
+        response = client.get("/graphs/ego/http://marmitonic.local/ingredient/gin?radius=2")
+
+        assert response.status_code == 200
+        assert len(response.json()['links']) == 1
+        mock_service.get_ego_network.assert_called_once_with(
+            'http://marmitonic.local/ingredient/gin', radius=2, max_nodes=100)
+
+        mock_service.get_ego_network.return_value = None
+        response = client.get("/graphs/ego/unknown")
+        assert response.status_code == 404
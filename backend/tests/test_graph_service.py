@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch
+import networkx as nx
 import sys
 from pathlib import Path
 
@@ -62,3 +63,210 @@ class TestGraphService:
         result = graph_service.get_graph_data()
 
         assert result is None
+
+    def test_build_graph_uses_canonical_ids_and_is_cached(self, graph_service):
+        from backend.models.cocktail import Cocktail
+        from backend.models.ingredient import Ingredient
+
+        graph_service.cocktail_service = Mock()
+        graph_service.cocktail_service.get_all_cocktails.return_value = [
+            Cocktail(uri="http://example.com/c1", id="c1", name="C1",
+                     parsed_ingredients=["Gin", "Sloe Gin"], ingredient_uris=["ing:gin", "ing:sloe_gin"]),
+            Cocktail(uri="http://example.com/c2", id="c2", name="C2", parsed_ingredients=["Gin"]),
+        ]
+        graph_service.ingredient_service = Mock()
+        graph_service.ingredient_service.get_all_ingredients.return_value = [
+            Ingredient(id="ing:gin", name="Gin"),
+            Ingredient(id="ing:sloe_gin", name="Sloe Gin"),
+        ]
+
+        GraphService.clear_cache()
+        try:
+            with patch('backend.services.graph_service.get_data_version', return_value="v1"):
+                graph_data = graph_service.build_graph()
+                assert graph_service.build_graph() is graph_data
+                graph = graph_service.get_networkx_graph()
+        finally:
+            GraphService.clear_cache()
+
+        edges = {(e['source'], e['target']) for e in graph_data['edges']}
+        assert edges == {("c1", "ing:gin"), ("c1", "ing:sloe_gin"), ("c2", "ing:gin")}
+        assert graph_service.cocktail_service.get_all_cocktails.call_count == 1
+        assert graph.nodes["ing:gin"]["type"] == "ingredient"
+        assert graph.degree("ing:gin") == 2
+
+    def test_analyze_graph_assigns_communities(self, graph_service):
+        graph_data = {
+            'nodes': [{'id': n, 'name': n, 'type': 'cocktail'} for n in ['a1', 'a2', 'b1', 'b2']] +
+                     [{'id': n, 'name': n, 'type': 'ingredient'} for n in ['x', 'y', 'z', 'w']],
+            'edges': [{'source': s, 'target': t} for s, t in [
+                ('a1', 'x'), ('a1', 'y'), ('a2', 'x'), ('a2', 'y'),
+                ('b1', 'z'), ('b1', 'w'), ('b2', 'z'), ('b2', 'w'), ('b2', 'y')
+            ]]
+        }
+        graph_service._get_cached_graph = Mock(return_value={'data': {}, 'graph': None})
+
+        analysis = graph_service.analyze_graph(graph_data)
+
+        communities = analysis['communities']
+        assert communities['a1'] == communities['a2'] == communities['x']
+        assert communities['b1'] == communities['b2'] == communities['z']
+        assert communities['a1'] != communities['b1']
+        assert analysis['betweenness_centrality']['y'] > analysis['betweenness_centrality']['x']
+        assert set(analysis['community_members']) == set(communities.values())
+
+    def test_analyze_graph_cached_per_data_version(self, graph_service):
+        cached = {'data': {'nodes': [], 'edges': []}, 'graph': nx.path_graph(['a', 'b', 'c'])}
+        graph_service._get_cached_graph = Mock(return_value=cached)
+
+        with patch.object(GraphService, '_compute_analysis', wraps=GraphService._compute_analysis) as compute:
+            first = graph_service.analyze_graph()
+            second = graph_service.analyze_graph(cached['data'])
+
+        assert first is second
+        assert compute.call_count == 1
+        assert graph_service.get_node_community('b') == first['communities']['b']
+
+    def test_bridge_scores_rank_cocktails_spanning_communities(self):
+        graph = nx.Graph()
+        graph.add_nodes_from(['bridge', 'pure'], type='cocktail')
+        graph.add_nodes_from(['x', 'y', 'z'], type='ingredient')
+        graph.add_edges_from([('bridge', 'x'), ('bridge', 'y'), ('bridge', 'z'), ('pure', 'x')])
+        communities = {'bridge': 0, 'pure': 0, 'x': 0, 'y': 1, 'z': 1}
+
+        scores = GraphService._compute_bridge_scores(graph, communities, {'bridge': 0.5})
+
+        assert [s['id'] for s in scores] == ['bridge']
+        assert scores[0]['communities_spanned'] == 2
+        assert scores[0]['participation_coefficient'] == pytest.approx(1 - (1 / 3) ** 2 - (2 / 3) ** 2)
+        assert scores[0]['betweenness'] == 0.5
+
+    def test_get_graph_data_streams_and_dedupes_edges(self, graph_service):
+        row = {
+            "cocktail": {"value": "http://example.com/cocktail1", "type": "uri"},
+            "ingredient": {"value": "http://example.com/ingredient1", "type": "uri"},
+            "text": {"value": "raw literal", "type": "literal"}
+        }
+        graph_service.sparql_service.iter_local_query = lambda query: iter([row, dict(row)])
+
+        result = graph_service.get_graph_data('SELECT * WHERE { ?s ?p ?o }', stream=True)
+
+        assert {n['type'] for n in result['nodes']} == {'cocktail', 'ingredient'}
+        assert result['edges'] == [{
+            'source': 'http://example.com/cocktail1',
+            'target': 'http://example.com/ingredient1',
+            'value': 1
+        }]
+
+    def test_to_columnar_indexes_links(self):
+        graph_data = {
+            'nodes': [
+                {'id': 'mojito', 'name': 'Mojito', 'type': 'cocktail'},
+                {'id': 'ing:rum', 'name': 'Rum', 'type': 'ingredient'},
+                {'id': 'ing:mint', 'name': 'Mint', 'type': 'ingredient'}
+            ],
+            'edges': [
+                {'source': 'mojito', 'target': 'ing:rum', 'value': 1},
+                {'source': 'mojito', 'target': 'ing:mint', 'value': 1}
+            ]
+        }
+
+        columnar = GraphService.to_columnar(graph_data)
+
+        assert columnar['types'] == ['cocktail', 'ingredient']
+        assert columnar['nodes']['id'] == ['mojito', 'ing:rum', 'ing:mint']
+        assert columnar['nodes']['type'] == [0, 1, 1]
+        assert columnar['links'] == {'source': [0, 0], 'target': [1, 2]}
+
+    def test_layout_computed_once_per_query(self, graph_service):
+        graph_data = {
+            'nodes': [
+                {'id': 'mojito', 'name': 'Mojito', 'type': 'cocktail'},
+                {'id': 'ing:rum', 'name': 'Rum', 'type': 'ingredient'}
+            ],
+            'edges': [{'source': 'mojito', 'target': 'ing:rum', 'value': 1}]
+        }
+        fingerprint = GraphService.query_fingerprint('SELECT *   WHERE { ?s ?p ?o }')
+        assert fingerprint == GraphService.query_fingerprint('SELECT * WHERE {\n ?s ?p ?o }')
+
+        with patch('backend.services.graph_service.get_data_version', return_value='layout-test'), \
+             patch('backend.services.graph_service.nx.spring_layout', wraps=nx.spring_layout) as spring_layout:
+            first = graph_service.get_layout(graph_data, fingerprint, wait=5.0)
+            second = graph_service.get_layout(graph_data, fingerprint, wait=0.0)
+
+        assert spring_layout.call_count == 1
+        assert first == second
+        assert set(first) == {'mojito', 'ing:rum'}
+        assert all(-1.0 <= c <= 1.0 for position in first.values() for c in position)
+
+        GraphService.attach_layout(graph_data, first)
+        columnar = GraphService.to_columnar(graph_data)
+        assert columnar['nodes']['x'] == [first['mojito'][0], first['ing:rum'][0]]
+
+    def test_ego_network_is_bounded_and_induced(self, graph_service):
+        graph = nx.Graph()
+        graph.add_node('mojito', name='Mojito', type='cocktail')
+        graph.add_node('daiquiri', name='Daiquiri', type='cocktail')
+        for ingredient in ('rum', 'mint', 'lime'):
+            graph.add_node(ingredient, name=ingredient.title(), type='ingredient')
+        graph.add_edges_from([('mojito', 'rum'), ('mojito', 'mint'), ('mojito', 'lime'),
+                              ('daiquiri', 'rum'), ('daiquiri', 'lime')])
+        graph_service.get_networkx_graph = Mock(return_value=graph)
+
+        ego = graph_service.get_ego_network('mojito', radius=1)
+        assert ego['nodes'][0]['id'] == 'mojito'
+        assert {n['id'] for n in ego['nodes']} == {'mojito', 'rum', 'mint', 'lime'}
+        assert len(ego['edges']) == 3
+        assert all(e['source'] == 'mojito' for e in ego['edges'])
+
+        # Most connected neighbours are kept first when the bound is hit
+        bounded = graph_service.get_ego_network('mojito', radius=2, max_nodes=3)
+        assert [n['id'] for n in bounded['nodes']] == ['mojito', 'lime', 'rum']
+
+        two_hops = graph_service.get_ego_network('mint', radius=2)
+        assert {n['id'] for n in two_hops['nodes']} == {'mint', 'mojito', 'rum', 'lime'}
+        assert graph_service.get_ego_network('unknown') is None
+
+    def test_top_subgraph_ranks_by_metric(self, graph_service):
+        graph = nx.star_graph(['hub', 'a', 'b', 'c'])
+        nx.set_node_attributes(graph, 'ingredient', 'type')
+        graph_service.get_networkx_graph = Mock(return_value=graph)
+        graph_service.analyze_graph = Mock(return_value={
+            'degree_centrality': nx.degree_centrality(graph),
+            'betweenness_centrality': nx.betweenness_centrality(graph)
+        })
+
+        top = graph_service.get_top_subgraph(limit=2, metric='betweenness')
+        assert [n['id'] for n in top['nodes']] == ['hub', 'a']
+        assert len(top['edges']) == 1
+        with pytest.raises(ValueError):
+            graph_service.get_top_subgraph(metric='pagerank')
+
+    def test_community_overview_weights_inter_community_edges(self, graph_service):
+        graph = nx.Graph()
+        for node, node_type in [('mojito', 'cocktail'), ('rum', 'ingredient'), ('mint', 'ingredient'),
+                                ('negroni', 'cocktail'), ('gin', 'ingredient')]:
+            graph.add_node(node, name=node.title(), type=node_type)
+        graph.add_edges_from([('mojito', 'rum'), ('mojito', 'mint'), ('negroni', 'gin'),
+                              ('negroni', 'rum'), ('mojito', 'gin')])
+        analysis = {
+            'communities': {'mojito': 0, 'rum': 0, 'mint': 0, 'negroni': 1, 'gin': 1},
+            'community_members': {0: ['mojito', 'rum', 'mint'], 1: ['negroni', 'gin']},
+            'modularity': 0.1
+        }
+        graph_service._get_cached_graph = Mock(return_value={'graph': graph})
+        graph_service.get_networkx_graph = Mock(return_value=graph)
+        graph_service.analyze_graph = Mock(return_value=analysis)
+
+        overview = graph_service.get_community_overview()
+
+        assert [n['id'] for n in overview['nodes']] == ['community:0', 'community:1']
+        assert overview['nodes'][0]['name'] == 'Rum · Mint'
+        assert (overview['nodes'][0]['cocktails'], overview['nodes'][0]['ingredients']) == (1, 2)
+        assert overview['edges'] == [{'source': 'community:0', 'target': 'community:1', 'value': 2}]
+        assert graph_service.get_community_overview() is overview
+
+        expanded = graph_service.get_community_subgraph(1)
+        assert [n['id'] for n in expanded['nodes']] == ['negroni', 'gin']
+        assert expanded['edges'] == [{'source': 'negroni', 'target': 'gin', 'value': 1}]
+        assert graph_service.get_community_subgraph(7) is None
@@ -0,0 +1,131 @@
+import pytest
+import numpy as np
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.data.incidence import IncidenceMatrix, get_incidence
+from backend.models.cocktail import Cocktail
+
+
+@pytest.fixture
+def cocktails():
+    return [
+        Cocktail(uri="http://example.com/negroni", id="negroni", name="Negroni",
+                 parsed_ingredients=["Gin", "Campari", "Sweet Vermouth"]),
+        Cocktail(uri="http://example.com/gimlet", id="gimlet", name="Gimlet",
+                 parsed_ingredients=["Gin", "Lime Juice", "gin"]),
+        Cocktail(uri="http://example.com/empty", id="empty", name="Empty", parsed_ingredients=None)
+    ]
+
+
+class TestIncidenceMatrix:
+
+    def test_rows_and_columns(self, cocktails):
+        incidence = IncidenceMatrix(cocktails)
+
+        assert incidence.shape == (3, 4)
+        assert incidence.ingredient_names == ["Gin", "Campari", "Sweet Vermouth", "Lime Juice"]
+        # Case variants of a name share a column and duplicates are counted once
+        assert incidence.sizes.tolist() == [3, 2, 0]
+        assert incidence.column("GIN") == incidence.column("gin") == 0
+        assert incidence.cocktails_with(0).tolist() == [0, 1]
+        assert incidence.ingredients_of(incidence.cocktail_index["gimlet"]).tolist() == [0, 3]
+
+    def test_columns_use_canonical_uris(self):
+        cocktail = Cocktail(uri="u", id="c", name="C", parsed_ingredients=["Lime Juice"],
+                            ingredient_uris=["http://marmitonic.local/ingredient/lime_juice"])
+        incidence = IncidenceMatrix([cocktail])
+
+        assert incidence.ingredient_ids == ["http://marmitonic.local/ingredient/lime_juice"]
+        assert incidence.column("http://marmitonic.local/ingredient/lime_juice") == 0
+        assert incidence.column("lime juice") == 0
+
+    def test_missing_counts(self, cocktails):
+        incidence = IncidenceMatrix(cocktails)
+        available = incidence.ingredient_vector(["gin", "lime juice", "unknown"])
+
+        assert incidence.missing_counts(available).tolist() == [2, 0, 0]
+
+    def test_shared_matrix_is_keyed_on_contents(self, cocktails):
+        first = get_incidence(cocktails)
+
+        assert get_incidence(cocktails) is first
+        # A copy of the same catalog reuses the matrix, a changed one rebuilds it
+        assert get_incidence(list(cocktails)) is first
+        changed = cocktails[:1] + [Cocktail(uri="http://example.com/gimlet", id="gimlet", name="Gimlet",
+                                            parsed_ingredients=["Gin", "Lime Cordial"])]
+        assert get_incidence(changed) is not first
+        assert get_incidence(changed).ingredient_names[-1] == "Lime Cordial"
+
+    def test_catalog_matrix_is_keyed_on_data_version(self, cocktails, monkeypatch):
+        import backend.data.ttl_parser as ttl_parser
+        monkeypatch.setattr(ttl_parser, "get_all_cocktails", lambda: cocktails)
+        monkeypatch.setattr(ttl_parser, "get_data_version", lambda: "v1")
+        first = get_incidence()
+
+        assert get_incidence(cocktails) is first
+        monkeypatch.setattr(ttl_parser, "get_data_version", lambda: "v2")
+        assert get_incidence() is not first
+
+    def test_lazy_structures_are_computed_once_under_concurrency(self, cocktails):
+        incidence = IncidenceMatrix(cocktails)
+        calls = []
+        compute_pairs = incidence._compute_pairs
+
+        def slow_compute_pairs():
+            calls.append(1)
+            time.sleep(0.05)
+            return compute_pairs()
+
+        incidence._compute_pairs = slow_compute_pairs
+        threads = [threading.Thread(target=incidence.top_pairs, args=("gin",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert [p['name'] for p in incidence.top_pairs("gin")] == ["Campari", "Sweet Vermouth", "Lime Juice"]
+
+    def test_top_pairs_from_cooccurrence(self, cocktails):
+        cocktails = cocktails + [
+            Cocktail(uri="http://example.com/gin-tonic", id="gin-tonic", name="Gin Tonic",
+                     parsed_ingredients=["Gin", "Lime Juice", "Tonic"])
+        ]
+        incidence = IncidenceMatrix(cocktails)
+
+        pairs = incidence.top_pairs("gin")
+        assert [p['name'] for p in pairs] == ["Lime Juice", "Campari", "Sweet Vermouth", "Tonic"]
+        assert pairs[0]['count'] == 2
+        # Gin is in every cocktail having ingredients, so it carries no information (lift 1)
+        assert all(p['lift'] == 1.0 and p['pmi'] == 0.0 for p in pairs)
+
+        # Tonic (1 of 3 cocktails) with Lime Juice (2 of 3): lift = 1 * 3 / (1 * 2)
+        by_lift = incidence.top_pairs("Tonic", limit=1, sort_by='lift')
+        assert by_lift == [{'id': 'lime juice', 'name': 'Lime Juice', 'count': 1, 'lift': 1.5, 'pmi': 0.585}]
+        assert incidence.top_pairs("unknown") is None
+        with pytest.raises(ValueError):
+            incidence.top_pairs("gin", sort_by='pmi')
+
+    def test_similar_cocktails_jaccard_top_k(self, cocktails):
+        cocktails = cocktails + [
+            Cocktail(uri="http://example.com/gin-tonic", id="gin-tonic", name="Gin Tonic",
+                     parsed_ingredients=["Gin", "Lime Juice", "Tonic"]),
+            Cocktail(uri="http://example.com/mojito", id="mojito", name="Mojito",
+                     parsed_ingredients=["Rum", "Mint"])
+        ]
+        incidence = IncidenceMatrix(cocktails)
+        gimlet = incidence.cocktail_index["gimlet"]
+
+        neighbors = incidence.similar_cocktails(gimlet)
+        # Gin Tonic: 2 common / 3 distinct; Negroni: 1 common / 4 distinct; Mojito shares nothing
+        assert [(incidence.cocktails[row].id, round(score, 4)) for row, score in neighbors] == \
+            [("gin-tonic", 0.6667), ("negroni", 0.25)]
+        assert incidence.similar_cocktails(gimlet, limit=1) == neighbors[:1]
+        assert incidence.similar_cocktails(gimlet, limit=50) == neighbors
+        assert incidence.similar_cocktails(incidence.cocktail_index["empty"]) == []
@@ -0,0 +1,73 @@
+import pytest
+import json
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+from backend.services.onnx_embedding import ONNX_CONFIG_FILE, OnnxEmbeddingModel, PARITY_TEXTS, export_quantized_model
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """Small random BERT saved as a sentence-transformers model (Transformer + mean pooling + Normalize)"""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    root = tmp_path_factory.mktemp("tiny_bert")
+    words = sorted({word.strip(",|:'").lower() for text in PARITY_TEXTS for word in text.split()} - {""})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words
+    (root / "vocab.txt").write_text("\n".join(vocab))
+    tokenizer = BertTokenizerFast(str(root / "vocab.txt"), do_lower_case=True)
+    config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64)
+    BertModel(config).save_pretrained(root / "hf")
+    tokenizer.save_pretrained(root / "hf")
+    transformer = models.Transformer(str(root / "hf"), max_seq_length=32)
+    SentenceTransformer(modules=[transformer, models.Pooling(32, "mean"), models.Normalize()]).save(str(root / "st"))
+    return root
+
+
+class TestOnnxEmbedding:
+
+    def test_export_matches_torch_embeddings(self, tiny_model):
+        output_dir = tiny_model / "onnx"
+        config = export_quantized_model(str(tiny_model / "st"), output_dir)
+
+        assert OnnxEmbeddingModel.is_exported(output_dir)
+        assert config["quantization"] == "dynamic-int8"
+        assert config["parity"]["min_cosine"] >= 0.98
+
+        model = OnnxEmbeddingModel(output_dir)
+        embeddings = model.encode(["gin", PARITY_TEXTS[1], "vodka"])
+        assert embeddings.shape == (3, 32)
+        assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+        # Batches are sorted by length: results come back in input order
+        assert np.allclose(embeddings[1], model.encode([PARITY_TEXTS[1]])[0], atol=1e-2)
+
+    def test_parity_failure_is_reported(self, tiny_model):
+        with pytest.raises(ValueError):
+            export_quantized_model(str(tiny_model / "st"), tiny_model / "strict", min_cosine=1.01)
+
+        # A failed export leaves nothing the backend could pick up on the next start
+        assert not (tiny_model / "strict").exists()
+        assert not (tiny_model / ".strict.tmp").exists()
+
+    def test_export_below_parity_is_not_reused(self, tiny_model):
+        output_dir = tiny_model / "onnx"
+        if not OnnxEmbeddingModel.is_exported(output_dir):
+            export_quantized_model(str(tiny_model / "st"), output_dir)
+        config = json.loads((output_dir / ONNX_CONFIG_FILE).read_text())
+
+        assert not OnnxEmbeddingModel.is_exported(output_dir, min_cosine=1.01)
+        config["parity"]["min_cosine"] = 0.5
+        (output_dir / ONNX_CONFIG_FILE).write_text(json.dumps(config))
+        assert not OnnxEmbeddingModel.is_exported(output_dir)
+        del config["parity"]
+        (output_dir / ONNX_CONFIG_FILE).write_text(json.dumps(config))
+        assert not OnnxEmbeddingModel.is_exported(output_dir)
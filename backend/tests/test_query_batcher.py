@@ -0,0 +1,62 @@
+import pytest
+import asyncio
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.query_batcher import QueryBatcher
+
+
+def fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+    return encode
+
+
+class TestQueryBatcher:
+
+    def test_concurrent_queries_share_one_batch(self):
+        calls = []
+        batcher = QueryBatcher(fake_encoder(calls), window_ms=20, max_batch_size=10)
+
+        async def run():
+            return await asyncio.gather(*(batcher.encode(text) for text in ["a", "bb", "a", "cccc"]))
+
+        vectors = asyncio.run(run())
+
+        # One model call; the duplicated query is encoded once and fanned out to both callers
+        assert calls == [["a", "bb", "cccc"]]
+        assert [v[0] for v in vectors] == [1.0, 2.0, 1.0, 4.0]
+        assert batcher.stats() == {"batches": 1, "queries": 4, "average_batch_size": 4.0}
+
+    def test_batch_is_flushed_when_full(self):
+        calls = []
+        batcher = QueryBatcher(fake_encoder(calls), window_ms=10_000, max_batch_size=2)
+
+        async def run():
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.encode(text) for text in ["a", "b", "c", "d"])), timeout=5
+            )
+
+        asyncio.run(run())
+
+        assert calls == [["a", "b"], ["c", "d"]]
+
+    def test_errors_reach_every_waiting_request(self):
+        def failing(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = QueryBatcher(failing, window_ms=1)
+
+        async def run():
+            return await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions=True)
+
+        errors = asyncio.run(run())
+
+        assert all(isinstance(e, RuntimeError) for e in errors)
+        with pytest.raises(ValueError):
+            QueryBatcher(failing, max_batch_size=0)
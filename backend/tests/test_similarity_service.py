@@ -0,0 +1,402 @@
+import pytest
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+from unittest.mock import Mock, patch
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.similarity_service import SimilarityService
+from backend.services.vector_index import build_vector_index
+from backend.models.cocktail import Cocktail
+
+
+@pytest.fixture
+def cocktails():
+    return [
+        Cocktail(uri="http://example.com/mojito", id="mojito", name="Mojito",
+                 parsed_ingredients=["Rum", "Mint", "Lime Juice"]),
+        Cocktail(uri="http://example.com/daiquiri", id="daiquiri", name="Daiquiri",
+                 parsed_ingredients=["Rum", "Lime Juice"]),
+        Cocktail(uri="http://example.com/negroni", id="negroni", name="Negroni",
+                 parsed_ingredients=["Gin", "Campari"])
+    ]
+
+
+@pytest.fixture
+def similarity_service(cocktails, tmp_path):
+    """SimilarityService without model nor LLM, with unit embeddings set by hand"""
+    with patch('backend.services.similarity_service.LLMService'):
+        service = SimilarityService(artifacts_dir=str(tmp_path))
+    service.model = Mock()
+    service.cocktails = cocktails
+    service.embeddings = np.array([[1.0, 0.0], [0.6, 0.8], [0.8, 0.6]], dtype=np.float32)
+    service.index = object()
+    return service
+
+
+class TestFusedSimilarity:
+
+    def test_weights_are_normalized(self):
+        assert SimilarityService._normalize_weights({"embedding": 2, "ingredients": 2}) == \
+            {"embedding": 0.5, "ingredients": 0.5, "graph": 0.0}
+        with pytest.raises(ValueError):
+            SimilarityService._normalize_weights({"popularity": 1})
+
+    def test_fused_table_blends_signals(self, similarity_service):
+        communities = {"mojito": 0, "daiquiri": 0, "negroni": 1}
+        with patch('backend.services.graph_service.GraphService.analyze_graph',
+                   return_value={"communities": communities}):
+            fused = similarity_service.build_fused_neighbors()
+
+        # Negroni has the closest embedding but Daiquiri shares ingredients and community
+        daiquiri, negroni = fused["mojito"]
+        assert (daiquiri["id"], negroni["id"]) == ("daiquiri", "negroni")
+        assert daiquiri["scores"] == {"embedding": pytest.approx(0.6), "ingredients": pytest.approx(2 / 3, abs=1e-6),
+                                      "graph": 1.0}
+        assert negroni["scores"] == {"embedding": pytest.approx(0.8), "ingredients": 0.0, "graph": 0.0}
+        assert daiquiri["score"] == pytest.approx(0.5 * 0.6 + 0.3 * 2 / 3 + 0.2, abs=1e-6)
+
+        with patch('backend.services.graph_service.GraphService.analyze_graph',
+                   return_value={"communities": communities}):
+            similarity_service.build_fused_neighbors(weights={"embedding": 1})
+        assert similarity_service.fused_neighbors["mojito"][0]["id"] == "negroni"
+
+    def test_find_similar_cocktails_reads_fused_table(self, similarity_service):
+        similarity_service.fused_neighbors = {
+            "mojito": [{"id": "daiquiri", "score": 0.7, "scores": {"embedding": 0.5, "ingredients": 0.6, "graph": 1.0}}]
+        }
+
+        results = similarity_service.find_similar_cocktails("mojito", top_k=5)
+
+        assert [r["cocktail"].id for r in results] == ["daiquiri"]
+        assert results[0]["similarity_score"] == 0.7
+        assert results[0]["rank"] == 1
+
+
+class TestIncrementalIndex:
+
+    @pytest.fixture
+    def service(self, similarity_service, cocktails):
+        similarity_service._reset_index()
+        similarity_service.cocktail_service = Mock()
+        similarity_service.cocktail_service.get_all_cocktails.return_value = cocktails
+        encoded = []
+
+        def encode(texts, **kwargs):
+            encoded.append(len(texts))
+            return np.array([[len(text) % 7 + 1.0, 1.0, float(i)] for i, text in enumerate(texts)], dtype=np.float32)
+
+        similarity_service.model.encode.side_effect = encode
+        similarity_service.encoded = encoded
+        with patch('backend.services.graph_service.GraphService.analyze_graph', return_value={}):
+            yield similarity_service
+
+    def test_only_new_or_changed_cocktails_are_encoded(self, service, cocktails):
+        service.build_index()
+        assert service.encoded == [3]
+        assert service.index.ntotal == 3
+
+        service.build_index()
+        assert service.encoded == [3]
+
+        changed = cocktails[0].model_copy(update={"description": "Fresh and minty"})
+        added = Cocktail(uri="http://example.com/gimlet", id="gimlet", name="Gimlet", parsed_ingredients=["Gin"])
+        service.cocktail_service.get_all_cocktails.return_value = [changed, cocktails[2], added]
+        service.build_index()
+
+        assert service.encoded == [3, 2]
+        assert service.index.ntotal == 3
+        assert [c.id for c in service.cocktails] == ["mojito", "negroni", "gimlet"]
+        assert service.find_similar_cocktails("gimlet", top_k=5, exclude_self=False)[0]["cocktail"].id == "gimlet"
+
+    def test_saved_index_is_reused_and_checked_against_model(self, service, cocktails):
+        service.build_index()
+
+        with patch('backend.services.similarity_service.LLMService'):
+            restarted = SimilarityService(artifacts_dir=str(service.artifacts_dir))
+            other_model = SimilarityService(model_name="other-model", artifacts_dir=str(service.artifacts_dir))
+        restarted.cocktail_service = service.cocktail_service
+
+        assert restarted.load_index()
+        assert restarted.index.ntotal == 3
+        assert isinstance(restarted.embeddings, np.memmap)
+        assert np.array_equal(restarted.embeddings, service.embeddings)
+        assert [c.id for c in restarted.cocktails] == ["mojito", "daiquiri", "negroni"]
+        assert restarted.fused_neighbors == service.fused_neighbors
+        assert not other_model.load_index()
+
+    def test_index_type_is_configurable_and_persisted(self, service, cocktails):
+        service.index_type = "hnsw"
+        service.build_index()
+        assert service.index_info["type"] == "hnsw"
+        assert json.loads((service.artifacts_dir / "manifest.json").read_text())["index"]["type"] == "hnsw"
+
+        # HNSW cannot remove vectors: a removal rebuilds it from the cached embeddings, without re-encoding
+        service.cocktail_service.get_all_cocktails.return_value = cocktails[:2]
+        service.build_index()
+        assert service.index.ntotal == 2
+        assert service.encoded == [3]
+
+        service.index_type = "ivf_flat"
+        service.index_params = {"nlist": 1}
+        service.build_index()
+        assert service.index_info == {"type": "ivf_flat", "params": {"nlist": 1, "nprobe": 1}, "trained_on": 2}
+        assert service.find_similar_cocktails("mojito", top_k=1, exclude_self=False)[0]["cocktail"].id == "mojito"
+
+    def test_artifacts_are_validated_against_manifest(self, service, monkeypatch, tmp_path):
+        monkeypatch.setenv("MARMITONIC_SIMILARITY_DIR", str(tmp_path / "artifacts"))
+        with patch('backend.services.similarity_service.LLMService'):
+            assert SimilarityService().artifacts_dir == tmp_path / "artifacts"
+
+        service.build_index()
+        manifest_path = service.artifacts_dir / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        assert {key: manifest[key] for key in ("format_version", "dimension", "count")} == \
+            {"format_version": 3, "dimension": 3, "count": 3}
+
+        manifest["content_hashes"][0] = "0" * 16
+        manifest_path.write_text(json.dumps(manifest))
+        assert not service.load_index()
+
+        # A manifest that no longer matches the artifacts triggers a full re-encode
+        service._reset_index()
+        service.build_index()
+        assert service.encoded == [3, 3]
+        np.save(service.artifacts_dir / "embeddings.npy", np.zeros((2, 3), dtype=np.float32))
+        assert not service.load_index()
+
+
+class TestBatchedSearch:
+
+    def test_queries_are_encoded_and_searched_together(self, similarity_service):
+        similarity_service.index = Mock()
+        similarity_service.index.search.return_value = (
+            np.array([[0.9, 0.5], [0.8, 0.1]], dtype=np.float32),
+            np.array([[11, 13], [12, -1]], dtype=np.int64)
+        )
+        similarity_service._row_by_faiss_id = {11: 0, 12: 1, 13: 2}
+        similarity_service.model.encode.return_value = np.array([[3.0, 4.0], [1.0, 0.0]], dtype=np.float32)
+
+        results = similarity_service.find_similar_by_texts(["fresh mint", "bitter"], top_k=2)
+
+        similarity_service.model.encode.assert_called_once_with(["fresh mint", "bitter"])
+        queries, k = similarity_service.index.search.call_args[0]
+        assert k == 2
+        assert np.allclose(queries, [[0.6, 0.8], [1.0, 0.0]])
+        assert [[r["cocktail"].id for r in query] for query in results] == [["mojito", "negroni"], ["daiquiri"]]
+        assert results[0][1]["rank"] == 2
+        assert similarity_service.find_similar_by_texts([]) == []
+
+    def test_repeated_queries_skip_the_model(self, similarity_service):
+        similarity_service.index = Mock()
+        similarity_service.index.search.side_effect = lambda queries, k: (
+            np.ones((len(queries), 1), dtype=np.float32), np.full((len(queries), 1), 11, dtype=np.int64)
+        )
+        similarity_service._row_by_faiss_id = {11: 0}
+        similarity_service.model.encode.side_effect = lambda texts: np.ones((len(texts), 2), dtype=np.float32)
+
+        similarity_service.find_similar_by_texts(["fruity", "bitter"])
+        similarity_service.find_similar_by_texts(["Fruity", "sour", "bitter"])
+        results = asyncio.run(similarity_service.find_similar_by_text_async("fruity  "))
+
+        assert [call.args[0] for call in similarity_service.model.encode.call_args_list] == [["fruity", "bitter"], ["sour"]]
+        assert results[0]["cocktail"].id == "mojito"
+        assert similarity_service.query_stats()["query_cache"]["hits"] == 3
+
+    def test_cold_index_is_built_off_the_event_loop(self, similarity_service, cocktails):
+        similarity_service._reset_index()
+        builds = []
+
+        def build_index():
+            time.sleep(0.05)
+            builds.append(threading.current_thread())
+            similarity_service.cocktails = cocktails
+            similarity_service.index = Mock()
+            similarity_service.index.search.return_value = (np.zeros((1, 0), dtype=np.float32),
+                                                            np.zeros((1, 0), dtype=np.int64))
+
+        similarity_service.build_index = build_index
+        similarity_service.model.encode.side_effect = lambda texts: np.ones((len(texts), 2), dtype=np.float32)
+
+        async def run():
+            return await asyncio.gather(*(similarity_service.find_similar_by_text_async(text) for text in ["a", "b"]))
+
+        assert asyncio.run(run()) == [[], []]
+        # Built once, in a worker thread, even with two cold requests
+        assert len(builds) == 1 and builds[0] is not threading.main_thread()
+
+    def test_model_passes_never_overlap(self, similarity_service):
+        similarity_service.index = Mock()
+        similarity_service.index.search.side_effect = lambda queries, k: (
+            np.ones((len(queries), 1), dtype=np.float32), np.full((len(queries), 1), 11, dtype=np.int64)
+        )
+        similarity_service._row_by_faiss_id = {11: 0}
+        active, overlaps = [], []
+
+        def encode(texts):
+            active.append(1)
+            overlaps.append(len(active) > 1)
+            time.sleep(0.01)
+            active.pop()
+            return np.ones((len(texts), 2), dtype=np.float32)
+
+        similarity_service.model.encode.side_effect = encode
+
+        async def run():
+            # Batch searches run in worker threads while the QueryBatcher thread encodes single queries
+            threads = [asyncio.to_thread(similarity_service.find_similar_by_texts, [f"batch {i}"]) for i in range(4)]
+            singles = [similarity_service.find_similar_by_text_async(f"single {i}") for i in range(4)]
+            await asyncio.gather(*threads, *singles)
+
+        asyncio.run(run())
+
+        assert len(overlaps) >= 5 and not any(overlaps)
+
+
+@pytest.fixture
+def indexed_service(similarity_service):
+    """Four cocktails with serving and category metadata in a real flat FAISS index"""
+    cocktails = [
+        Cocktail(uri="http://example.com/mojito", id="mojito", name="Mojito", served="Highball",
+                 categories=["http://example.com/Category:Rum_cocktails"], parsed_ingredients=["Rum", "Mint", "Lime Juice"]),
+        Cocktail(uri="http://example.com/daiquiri", id="daiquiri", name="Daiquiri", served="Straight up",
+                 categories=["http://example.com/Category:Sour_cocktails"], parsed_ingredients=["Rum", "Lime Juice"]),
+        Cocktail(uri="http://example.com/negroni", id="negroni", name="Negroni", served="On the rocks",
+                 parsed_ingredients=["Gin", "Campari", "Vermouth"]),
+        Cocktail(uri="http://example.com/gimlet", id="gimlet", name="Gimlet", served="Straight up",
+                 categories=["http://example.com/Category:Sour_cocktails"], parsed_ingredients=["Gin", "Lime Juice"]),
+    ]
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((len(cocktails), 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarity_service._reset_index()
+    similarity_service.cocktails = cocktails
+    similarity_service.embeddings = embeddings
+    similarity_service.index, similarity_service.index_info = build_vector_index(
+        embeddings, np.array([similarity_service._faiss_id(c.id) for c in cocktails]), "flat"
+    )
+    similarity_service._row_by_faiss_id = {similarity_service._faiss_id(c.id): row for row, c in enumerate(cocktails)}
+    return similarity_service
+
+
+class TestFilteredSearch:
+
+    def filtered(self, service, **filters):
+        mask = service._filter_rows(filters)
+        return sorted(c.id for c, allowed in zip(service.cocktails, mask) if allowed)
+
+    def test_filters_select_matching_cocktails(self, indexed_service):
+        service = indexed_service
+        service.cocktail_service = Mock()
+        service.cocktail_service.ingredient_service.get_inventory.return_value = ["Gin", "Lime Juice", "Rum"]
+
+        assert service._filter_rows({}) is None
+        assert self.filtered(service, include_ingredients=["rum", "Lime Juice"]) == ["daiquiri", "mojito"]
+        assert self.filtered(service, include_ingredients=["Absinthe"]) == []
+        assert self.filtered(service, exclude_ingredients=["Lime Juice"]) == ["negroni"]
+        assert self.filtered(service, served="straight") == ["daiquiri", "gimlet"]
+        assert self.filtered(service, category="sour cocktails", exclude_ingredients=["Rum"]) == ["gimlet"]
+        assert self.filtered(service, feasible_for="user123") == ["daiquiri", "gimlet"]
+        with pytest.raises(ValueError):
+            service._filter_rows({"color": "blue"})
+
+    def test_filtered_search_returns_exact_top_k_among_allowed(self, indexed_service):
+        service = indexed_service
+        query = service.embeddings[2]
+        service.model.encode.return_value = query[None, :]
+        allowed = {"mojito", "daiquiri", "gimlet"}
+        expected = sorted((c for c in service.cocktails if c.id in allowed),
+                          key=lambda c: -float(service.embeddings[service.cocktails.index(c)] @ query))
+
+        results = service.find_similar_by_text("query", top_k=5, filters={"include_ingredients": ["Lime Juice"]})
+        neighbours = service.find_similar_cocktails("negroni", top_k=2, filters={"served": "straight"})
+
+        assert [r["cocktail"].id for r in results] == [c.id for c in expected]
+        assert [r["cocktail"].id for r in neighbours] == [c.id for c in expected if c.id != "mojito"]
+        assert service.find_similar_by_text("query", filters={"include_ingredients": ["Absinthe"]}) == []
+
+
+class TestHybridSearch:
+
+    def test_bm25_ranking_is_fused_with_vector_ranking(self, indexed_service):
+        service = indexed_service
+        # The query vector is closest to the Negroni, but the text names the Gimlet
+        service.model.encode.return_value = service.embeddings[2][None, :]
+
+        dense = service.find_similar_by_text("gimlet", top_k=4)
+        hybrid = service.find_similar_by_text("gimlet", top_k=4, mode="hybrid")
+
+        assert dense[0]["cocktail"].id == "negroni"
+        assert hybrid[0]["cocktail"].id == "gimlet"
+        assert hybrid[0]["scores"]["bm25"] > 0
+        assert {r["cocktail"].id for r in hybrid} == {c.id for c in service.cocktails}
+        assert [r["rank"] for r in hybrid] == [1, 2, 3, 4]
+        with pytest.raises(ValueError):
+            service.find_similar_by_text("gimlet", mode="sparse")
+
+    def test_async_hybrid_search_respects_filters(self, indexed_service):
+        service = indexed_service
+        service.model.encode.return_value = service.embeddings[2][None, :]
+
+        results = asyncio.run(service.find_similar_by_text_async(
+            "gimlet", top_k=3, filters={"include_ingredients": ["Rum"]}, mode="hybrid"
+        ))
+
+        # Only rum cocktails are ranked by either retriever; none mentions the Gimlet
+        assert {r["cocktail"].id for r in results} == {"mojito", "daiquiri"}
+        assert all(r["scores"]["bm25"] is None for r in results)
+
+
+class TestEmbeddingBackend:
+
+    def test_models_are_loaded_on_first_encode(self, tmp_path):
+        with patch('backend.services.similarity_service.LLMService'), \
+             patch('sentence_transformers.SentenceTransformer') as sentence_transformer:
+            sentence_transformer.return_value.encode.return_value = np.ones((1, 2), dtype=np.float32)
+            service = SimilarityService(artifacts_dir=str(tmp_path))
+            sentence_transformer.assert_not_called()
+
+            service.model.encode(["Mojito"])
+            service.model.encode(["Negroni"])
+            sentence_transformer.assert_called_once_with(service.model_name)
+
+    def test_onnx_backend_is_exported_once_and_keyed_separately(self, tmp_path):
+        with patch('backend.services.similarity_service.LLMService'), \
+             patch('backend.services.onnx_embedding.OnnxEmbeddingModel') as onnx_model, \
+             patch('backend.services.onnx_embedding.export_quantized_model') as export:
+            onnx_model.is_exported.return_value = False
+            service = SimilarityService(artifacts_dir=str(tmp_path), embedding_backend="onnx")
+            torch_service = SimilarityService(artifacts_dir=str(tmp_path))
+
+            assert service.model.model is onnx_model.return_value
+            export.assert_called_once_with(service.model_name, tmp_path / "onnx" / "sentence-transformers__all-MiniLM-L6-v2")
+            assert service._content_hash("Mojito") != torch_service._content_hash("Mojito")
+
+            with pytest.raises(ValueError):
+                SimilarityService(artifacts_dir=str(tmp_path), embedding_backend="tensorrt")
+
+    def test_lexical_backend_builds_index_without_model(self, cocktails, tmp_path):
+        cocktails = cocktails + [
+            Cocktail(uri="http://example.com/gimlet", id="gimlet", name="Gimlet", parsed_ingredients=["Gin", "Lime Juice"])
+        ]
+        with patch('backend.services.similarity_service.LLMService'):
+            service = SimilarityService(artifacts_dir=str(tmp_path), embedding_backend="lexical")
+            torch_service = SimilarityService(artifacts_dir=str(tmp_path))
+        for copy in (service, torch_service):
+            copy.cocktail_service = Mock()
+            copy.cocktail_service.get_all_cocktails.return_value = cocktails
+
+        with patch('backend.services.graph_service.GraphService.analyze_graph', return_value={}):
+            service.build_index()
+
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        assert manifest["embedding_backend"] == "lexical"
+        assert service.find_similar_by_text("gin et lime")[0]["cocktail"].id == "gimlet"
+        # An index built by another backend is never reused
+        assert not torch_service.load_index()
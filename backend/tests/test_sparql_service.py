@@ -1,8 +1,9 @@
+import gc
 import pytest
 from unittest.mock import Mock, patch
 import sys
 from pathlib import Path
-from rdflib import URIRef
+from rdflib import Graph, Literal, URIRef
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -63,3 +64,81 @@ class TestSparqlService:
 
         result = sparql_service.execute_local_query('INVALID QUERY')
         assert result is None
+
+    def test_text_filter_rewrite_returns_identical_results(self, sparql_service):
+        query = 'SELECT ?c ?i WHERE { ?c dbp:ingredients ?i . FILTER(CONTAINS(LCASE(?i), "vodka")) }'
+        rewritten = sparql_service._rewrite_text_filters(query)
+        assert not isinstance(rewritten, str)
+
+        graph = sparql_service.local_graph
+        expected = sorted(map(tuple, graph.query(query, initNs=dict(graph.namespaces()))))
+        actual = sorted(map(tuple, graph.query(rewritten)))
+        assert expected
+        assert actual == expected
+
+    def test_text_filter_rewrite_skips_optional_variables(self, sparql_service):
+        query = '''SELECT ?c WHERE {
+            ?c rdfs:label ?l .
+            OPTIONAL { ?c dbo:description ?d }
+            FILTER(CONTAINS(LCASE(?d), "rum"))
+        }'''
+        assert sparql_service._rewrite_text_filters(query) == query
+
+    def test_text_filter_rewrite_ignores_invalid_syntax(self, sparql_service):
+        assert sparql_service._rewrite_text_filters('INVALID QUERY SYNTAX') == 'INVALID QUERY SYNTAX'
+
+    def test_text_index_follows_graph_identity(self):
+        from backend.data import text_index
+
+        graph = Graph()
+        graph.add((URIRef("http://example.com/gin"), URIRef("http://example.com/name"), Literal("Gin")))
+        index = text_index.get_text_index(graph)
+        assert text_index.get_text_index(graph) is index
+
+        # A collected graph leaves no entry behind for a later graph reusing its id
+        key = id(graph)
+        del graph
+        gc.collect()
+        assert key not in text_index._indexes
+        other = Graph()
+        other.add((URIRef("http://example.com/rum"), URIRef("http://example.com/name"), Literal("Rum")))
+        assert [str(l) for l in text_index.get_text_index(other).candidates("rum")] == ["Rum"]
+
+        # New triples rebuild the index
+        other.add((URIRef("http://example.com/rhum"), URIRef("http://example.com/name"), Literal("Rhum")))
+        assert [str(l) for l in text_index.get_text_index(other).candidates("hum")] == ["Rhum"]
+
+    def test_iter_local_query_yields_rows(self, sparql_service):
+        rows = sparql_service.iter_local_query('SELECT ?s WHERE { ?s ?p ?o } LIMIT 3')
+        assert not isinstance(rows, list)
+        rows = list(rows)
+        assert len(rows) == 3
+        assert rows[0]['s']['type'] == 'uri'
+
+    def test_iter_local_query_matches_result_rows(self, sparql_service):
+        query = '''
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            SELECT ?s ?label ?missing WHERE {
+                ?s rdfs:label ?label .
+                OPTIONAL { ?s <http://example.com/none> ?missing }
+                FILTER(CONTAINS(LCASE(?label), "gin"))
+            } ORDER BY ?s ?label
+        '''
+        expected = [
+            {str(var): {"value": str(value) if value is not None else None,
+                        "type": "uri" if isinstance(value, URIRef) else "literal"}
+             for var, value in zip(result.vars, row)}
+            for result in [sparql_service.local_graph.query(query)] for row in result
+        ]
+
+        assert expected
+        assert list(sparql_service.iter_local_query(query)) == expected
+
+    def test_select_rows_bypass_materialized_result(self, sparql_service, monkeypatch):
+        def materialized(*args, **kwargs):
+            raise AssertionError("SELECT rows should not go through Graph.query")
+
+        monkeypatch.setattr(sparql_service.local_graph, "query", materialized)
+        rows = sparql_service.iter_local_query('SELECT ?s WHERE { ?s ?p ?o }')
+
+        assert next(rows)['s']['type'] == 'uri'
@@ -0,0 +1,70 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.data.ttl_parser import IBADataParser, get_parser
+from backend.data.entity_linker import AhoCorasick, IngredientLinker
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return get_parser()
+
+
+class TestMaterializedIngredients:
+
+    def test_ingredient_uri(self):
+        assert IBADataParser.ingredient_uri("lime juice") == "http://marmitonic.local/ingredient/lime_juice"
+
+    def test_ingredient_uris_match_catalog(self, parser):
+        ingredient_ids = {ing.id for ing in parser.get_all_ingredients()}
+        rows = parser.execute_sparql("""
+        SELECT DISTINCT ?ing WHERE { ?cocktail marmitonic:hasIngredient ?ing . }
+        """)
+        assert rows
+        assert ingredient_ids <= {row["ing"] for row in rows}
+
+    def test_has_ingredient_join_matches_parsed_ingredients(self, parser):
+        rows = parser.execute_sparql("""
+        SELECT ?cocktail WHERE {
+            ?cocktail marmitonic:hasIngredient ?ing .
+            ?ing rdfs:label "Vodka"@en .
+        }
+        """)
+        joined = {row["cocktail"] for row in rows}
+        expected = {c.uri for c in parser.get_all_cocktails() if "Vodka" in (c.parsed_ingredients or [])}
+        assert joined
+        assert joined == expected
+
+
+class TestIngredientLinking:
+
+    def test_cocktail_ingredient_uris_are_aligned(self, parser):
+        ingredient_ids = {ing.id for ing in parser.get_all_ingredients()}
+        for cocktail in parser.get_all_cocktails():
+            assert len(cocktail.ingredient_uris) == len(cocktail.parsed_ingredients)
+            assert set(cocktail.ingredient_uris) <= ingredient_ids
+
+    def test_ingredients_linked_to_dbpedia(self, parser):
+        by_name = {ing.name: ing for ing in parser.get_all_ingredients()}
+        assert by_name["Gin"].dbpedia_uri == "http://dbpedia.org/resource/Gin"
+        assert by_name["Lime Juice"].dbpedia_uri == "http://dbpedia.org/resource/Lime_juice"
+
+    def test_aho_corasick_finds_overlapping_patterns(self):
+        matcher = AhoCorasick(["he", "she", "his", "hers"])
+        assert sorted(p for _, p in matcher.find_all("ushers")) == ["he", "hers", "she"]
+
+    def test_linker_prefers_longest_whole_word_label(self):
+        links = {
+            "http://dbpedia.org/resource/Vermouth",
+            "http://dbpedia.org/resource/Sweet_vermouth",
+            "http://dbpedia.org/resource/Rum",
+        }
+        linker = IngredientLinker(links)
+        assert linker.link("sweet vermouth", links) == "http://dbpedia.org/resource/Sweet_vermouth"
+        assert linker.link("sweet vermouth", links - {"http://dbpedia.org/resource/Sweet_vermouth"}) == \
+            "http://dbpedia.org/resource/Vermouth"
+        assert linker.link("drum syrup", links) is None
@@ -0,0 +1,89 @@
+import pytest
+import faiss
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.vector_index import (
+    benchmark_index_types, build_vector_index, resolve_index_type, resolve_params, search_parameters,
+    supports_remove
+)
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((600, 16)).astype(np.float32)
+    faiss.normalize_L2(data)
+    return data
+
+
+class TestVectorIndex:
+
+    def test_type_is_selected_by_catalog_size(self):
+        assert resolve_index_type("auto", 56) == "flat"
+        assert resolve_index_type("auto", 100_000) == "ivf_flat"
+        assert resolve_index_type("auto", 5_000_000) == "ivf_pq"
+        assert resolve_index_type("hnsw", 56) == "hnsw"
+        with pytest.raises(ValueError):
+            resolve_index_type("lsh", 56)
+
+    def test_params_are_resolved_per_type(self):
+        assert resolve_params("flat", 600, 384) == {}
+        assert resolve_params("ivf_flat", 10_000, 384) == {"nlist": 256, "nprobe": 16}
+        # nprobe never exceeds nlist, and pq_m divides the dimension
+        assert resolve_params("ivf_pq", 600, 384, {"nlist": 8}) == {"nlist": 8, "nprobe": 8, "pq_m": 48, "pq_nbits": 8}
+        assert resolve_params("hnsw", 600, 384, {"efSearch": 128})["efSearch"] == 128
+        with pytest.raises(ValueError):
+            resolve_params("hnsw", 600, 384, {"ef": 128})
+
+    def test_indexes_answer_with_external_ids(self, vectors):
+        ids = np.arange(len(vectors), dtype=np.int64) * 1000 + 7
+        for index_type, params in (("flat", {}), ("ivf_flat", {"nlist": 8, "nprobe": 8}),
+                                   ("ivf_pq", {"nlist": 2, "pq_m": 4}), ("hnsw", {})):
+            index, info = build_vector_index(vectors, ids, index_type, params)
+            _, found = index.search(vectors[:5], 1)
+
+            assert info["type"] == index_type and info["trained_on"] == 600
+            assert index.ntotal == 600
+            assert set(found.ravel()) <= set(ids)
+            if index_type != "ivf_pq":
+                assert found.ravel().tolist() == ids[:5].tolist()
+
+        assert not supports_remove("hnsw")
+        index, _ = build_vector_index(vectors, ids, "ivf_flat", {"nlist": 8})
+        index.remove_ids(ids[:10])
+        assert index.ntotal == 590
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+    def test_selector_restricts_search_to_allowed_ids(self, vectors, index_type):
+        ids = np.arange(len(vectors), dtype=np.int64) * 7 + 3
+        index, info = build_vector_index(vectors, ids, index_type, {"nlist": 8, "nprobe": 8})
+        allowed = ids[::10]
+        selector = faiss.IDSelectorBatch(allowed)
+
+        _, found = index.search(vectors[:5], 10, params=search_parameters(info, selector))
+
+        # Exact top-10 among the allowed ids, not a post-filtered top-10 of the whole index
+        exact = np.argsort(-(vectors[:5] @ vectors[::10].T), axis=1)[:, :10]
+        assert set(found.ravel().tolist()) <= set(allowed.tolist())
+        assert np.mean([len(set(row) & set(allowed[expected])) / 10 for row, expected in zip(found, exact)]) >= 0.9
+
+    def test_ivf_pq_needs_enough_training_vectors(self, vectors):
+        with pytest.raises(ValueError):
+            build_vector_index(vectors[:100], np.arange(100), "ivf_pq")
+
+    def test_benchmark_reports_recall_against_exact_search(self, vectors):
+        results = benchmark_index_types(vectors, vectors[:20], k=5, configs=[
+            ("flat", {}), ("ivf_flat", {"nlist": 8, "nprobe": 8}), ("ivf_flat", {"nlist": 8, "nprobe": 1})
+        ], repeats=1)
+
+        assert [r["type"] for r in results] == ["flat", "ivf_flat", "ivf_flat"]
+        assert results[0]["recall@5"] == 1.0
+        # Probing every list is exhaustive; a single list can only lose neighbours
+        assert results[1]["recall@5"] == 1.0
+        assert results[2]["recall@5"] <= 1.0
+        assert all(r["latency_ms"] >= 0 for r in results)
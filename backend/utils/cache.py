@@ -0,0 +1,35 @@
+import time
+
+
+class SimpleCache:
+    """Simple in-memory cache with TTL support."""
+    
+    def __init__(self, ttl: int = 3600, max_size: int = 100):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache = {}  # key: (value, timestamp)
+    
+    def _cleanup(self):
+        """Remove expired entries from cache."""
+        current_time = time.time()
+        expired_keys = [key for key, (_, timestamp) in self.cache.items() 
+                      if current_time - timestamp > self.ttl]
+        for key in expired_keys:
+            del self.cache[key]
+    
+    def get(self, key):
+        """Get value from cache if not expired."""
+        self._cleanup()
+        if key in self.cache:
+            value, timestamp = self.cache[key]
+            return value
+        return None
+    
+    def set(self, key, value):
+        """Set value in cache with current timestamp."""
+        self._cleanup()
+        # Remove oldest entry if cache is full
+        if len(self.cache) >= self.max_size:
+            oldest_key = min(self.cache.items(), key=lambda x: x[1][1])[0]
+            del self.cache[oldest_key]
+        self.cache[key] = (value, time.time())
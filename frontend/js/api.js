@@ -103,6 +103,93 @@ async function executeSparqlQuery(query) {
     }
 }
 
+// Format compact des graphes : table de noeuds + liens indexés par entier
+const GRAPH_COLUMNAR_MEDIA_TYPE = 'application/vnd.marmitonic.graph+json';
+
+// Reconstruit les tableaux nodes/links attendus par D3 depuis le format colonnes
+function decodeColumnarGraph(data) {
+    if (!data || data.format !== 'columnar') {
+        return data;
+    }
+    const { id, name, type, x, y } = data.nodes;
+    const nodes = new Array(id.length);
+    for (let i = 0; i < id.length; i++) {
+        nodes[i] = { id: id[i], name: name[i], type: data.types[type[i]] };
+        if (x && y && x[i] !== null && y[i] !== null) {
+            nodes[i].x = x[i];
+            nodes[i].y = y[i];
+        }
+    }
+    const { source, target } = data.links;
+    const links = new Array(source.length);
+    for (let i = 0; i < source.length; i++) {
+        links[i] = { source: id[source[i]], target: id[target[i]], value: 1 };
+    }
+    return { nodes, links };
+}
+
+// Sous-graphe borné autour d'un cocktail (slug) ou d'un ingrédient (URI)
+async function fetchEgoGraph(nodeId, radius = 1, maxNodes = 100) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/graphs/ego/${encodeURIComponent(nodeId)}?radius=${radius}&max_nodes=${maxNodes}`, {
+            headers: { 'Accept': GRAPH_COLUMNAR_MEDIA_TYPE }
+        });
+        if (!response.ok) {
+            throw new Error('Failed to fetch ego graph');
+        }
+        return decodeColumnarGraph(await response.json());
+    } catch (error) {
+        console.error('Error fetching ego graph:', error);
+        return { nodes: [], links: [] };
+    }
+}
+
+// Vue d'ensemble : un noeud par communauté, liens pondérés entre communautés
+async function fetchCommunityOverview() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/graphs/communities`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch community overview');
+        }
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching community overview:', error);
+        return { nodes: [], links: [] };
+    }
+}
+
+// Détail d'une communauté : ses cocktails et ingrédients
+async function fetchCommunityGraph(communityId) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/graphs/communities/${communityId}`, {
+            headers: { 'Accept': GRAPH_COLUMNAR_MEDIA_TYPE }
+        });
+        if (!response.ok) {
+            throw new Error('Failed to fetch community graph');
+        }
+        return decodeColumnarGraph(await response.json());
+    } catch (error) {
+        console.error('Error fetching community graph:', error);
+        return { nodes: [], links: [] };
+    }
+}
+
+// Sous-graphe des N noeuds les plus centraux (metric: degree ou betweenness)
+async function fetchTopGraph(n = 50, metric = 'degree') {
+    try {
+        const response = await fetch(`${API_BASE_URL}/graphs/top?n=${n}&metric=${metric}`, {
+            headers: { 'Accept': GRAPH_COLUMNAR_MEDIA_TYPE }
+        });
+        if (!response.ok) {
+            throw new Error('Failed to fetch top graph');
+        }
+        return decodeColumnarGraph(await response.json());
+    } catch (error) {
+        console.error('Error fetching top graph:', error);
+        return { nodes: [], links: [] };
+    }
+}
+
 // Recherche de cocktails similaires par ID
 async function fetchSimilarCocktails(cocktailId, topK = 5) {
     try {
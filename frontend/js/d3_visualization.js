@@ -14,6 +14,10 @@ class D3DisjointForceGraph {
         this.forceStrength = 0.1;
         this.distance = 100;
         this.chargeStrength = -50;
+        // Called with the community id when a community supernode is clicked
+        this.onCommunityExpand = null;
+        // Called with the node id when an ingredient node is clicked (ego-network drill-down)
+        this.onNodeExpand = null;
         
         this.init();
     }
@@ -48,8 +52,10 @@ class D3DisjointForceGraph {
             return;
         }
 
-        this.nodes = graphData.nodes;
-        this.links = graphData.links;
+        // Work on copies: the simulation mutates nodes and links, and the caller's data
+        // must stay reusable. Server positions (in [-1, 1]) are kept apart from x/y.
+        this.nodes = graphData.nodes.map(d => ({ ...d, layoutX: d.x, layoutY: d.y }));
+        this.links = graphData.links.map(l => ({ ...l }));
 
         // Stop any existing simulation
         if (this.simulation) {
@@ -63,6 +69,15 @@ class D3DisjointForceGraph {
         // Clear previous elements
         this.graphGroup.selectAll('*').remove();
 
+        // Seed nodes with server-side positions (in [-1, 1]) so the simulation only refines them
+        const hasLayout = this.nodes.length > 0 && this.nodes.every(d => d.layoutX !== undefined && d.layoutY !== undefined);
+        if (hasLayout) {
+            this.nodes.forEach(d => {
+                d.x = d.layoutX * this.width / 2 * 0.9;
+                d.y = d.layoutY * this.height / 2 * 0.9;
+            });
+        }
+
         // Create simulation with disjoint force layout
         this.simulation = d3.forceSimulation(this.nodes)
             .force('link', d3.forceLink(this.links).id(d => d.id).distance(this.distance))
@@ -73,6 +88,10 @@ class D3DisjointForceGraph {
             .force('collide', d3.forceCollide().radius(20))
             .on('tick', () => this.ticked());
 
+        if (hasLayout) {
+            this.simulation.alpha(0.05);
+        }
+
         // Create links
         this.linkElements = this.graphGroup.append('g')
             .selectAll('line')
@@ -87,11 +106,11 @@ class D3DisjointForceGraph {
             .selectAll('circle')
             .data(this.nodes)
             .enter().append('circle')
-            .attr('r', 10)
+            .attr('r', d => d.type === 'community' ? 8 + 2 * Math.sqrt(d.size || 1) : 10)
             .attr('fill', d => this.getNodeColor(d.type))
             .attr('stroke', '#fff')
             .attr('stroke-width', 1.5)
-            .style('cursor', d => d.type === 'cocktail' ? 'pointer' : 'default')
+            .style('cursor', d => d.type === 'cocktail' || d.type === 'community' || (d.type === 'ingredient' && this.onNodeExpand) ? 'pointer' : 'default')
             .on('click', (event, d) => this.handleNodeClick(event, d))
             .call(this.drag(this.simulation));
 
@@ -155,6 +174,7 @@ class D3DisjointForceGraph {
         const colors = {
             'cocktail': '#4e79a7',
             'ingredient': '#f28e2b',
+            'community': '#59a14f',
             'unknown': '#e15759',
             'default': '#76b7b2'
         };
@@ -163,7 +183,11 @@ class D3DisjointForceGraph {
 
     handleNodeClick(event, d) {
         console.log(`Node clicked: ${d.name} (${d.type})`);
-        if (d.type === 'cocktail' && d.id) {
+        if (d.type === 'community' && this.onCommunityExpand) {
+            this.onCommunityExpand(d.community);
+        } else if (d.type === 'ingredient' && d.id && this.onNodeExpand) {
+            this.onNodeExpand(d.id);
+        } else if (d.type === 'cocktail' && d.id) {
             console.log(`Navigating to cocktail detail page for ID: ${d.id}`);
             window.location.href = `cocktail-detail.html?id=${encodeURIComponent(d.id)}`;
         }
@@ -11,6 +11,7 @@ class GraphVisualizationPage {
         this.elements = {
             graphContainer: document.getElementById('graph-container'),
             loadBtn: document.getElementById('load-graph'),
+            topGraphBtn: document.getElementById('load-top-graph'),
             highlightBtn: document.getElementById('highlight-components'),
             clearBtn: document.getElementById('clear-graph'),
             forceSlider: document.getElementById('force-strength'),
@@ -44,6 +45,9 @@ class GraphVisualizationPage {
     setupEventListeners() {
         // Main control buttons
         this.elements.loadBtn.addEventListener('click', () => this.loadGraph());
+        if (this.elements.topGraphBtn) {
+            this.elements.topGraphBtn.addEventListener('click', () => this.loadTopGraph());
+        }
         this.elements.highlightBtn.addEventListener('click', () => this.highlightComponents());
         this.elements.clearBtn.addEventListener('click', () => this.clearGraph());
         
@@ -145,10 +149,11 @@ class GraphVisualizationPage {
         this.showLoadingState();
 
         try {
-            const response = await fetch(`${API_BASE_URL}/graphs/sparql`, {
+            const response = await fetch(`${API_BASE_URL}/graphs/sparql?layout=true`, {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Accept': GRAPH_COLUMNAR_MEDIA_TYPE
                 },
                 body: JSON.stringify({ query: query })
             });
@@ -158,7 +163,7 @@ class GraphVisualizationPage {
                 throw new Error(errorData.detail || 'Erreur lors de l\'exécution');
             }
 
-            const data = await response.json();
+            const data = decodeColumnarGraph(await response.json());
             
             if (data && data.nodes && data.nodes.length > 0) {
                 this.loadData(data);
@@ -314,7 +319,57 @@ class GraphVisualizationPage {
     
     
     async loadGraph() {
-        await this.loadAllCocktails();
+        // Start from the community overview (tens of nodes), the full graph is the fallback
+        this.showLoadingState();
+        let overview = null;
+        try {
+            overview = await fetchCommunityOverview();
+        } finally {
+            this.hideLoadingState();
+        }
+        if (overview && overview.nodes && overview.nodes.length > 0) {
+            this.loadData(overview);
+        } else {
+            await this.loadAllCocktails();
+        }
+    }
+    
+    async expandCommunity(communityId) {
+        this.showLoadingState();
+        try {
+            const data = await fetchCommunityGraph(communityId);
+            if (data && data.nodes && data.nodes.length > 0) {
+                this.loadData(data);
+            }
+        } finally {
+            this.hideLoadingState();
+        }
+    }
+    
+    async loadTopGraph() {
+        // Subgraph of the most connected cocktails and ingredients
+        this.showLoadingState();
+        try {
+            const data = await fetchTopGraph(50, 'degree');
+            if (data && data.nodes && data.nodes.length > 0) {
+                this.loadData(data);
+            }
+        } finally {
+            this.hideLoadingState();
+        }
+    }
+    
+    async expandNode(nodeId) {
+        // Drill down from an ingredient to its neighbourhood (cocktails using it and their ingredients)
+        this.showLoadingState();
+        try {
+            const data = await fetchEgoGraph(nodeId, 2);
+            if (data && data.nodes && data.nodes.length > 0) {
+                this.loadData(data);
+            }
+        } finally {
+            this.hideLoadingState();
+        }
     }
     
     loadData(data) {
@@ -338,6 +393,8 @@ class GraphVisualizationPage {
         const height = this.elements.graphContainer.clientHeight;
         
         this.graph = new D3DisjointForceGraph('#graph-container', width, height);
+        this.graph.onCommunityExpand = (communityId) => this.expandCommunity(communityId);
+        this.graph.onNodeExpand = (nodeId) => this.expandNode(nodeId);
         this.graph.updateData(data);
         
         // Update UI state
@@ -415,8 +472,11 @@ class GraphVisualizationPage {
         
         const nodesCount = data.nodes.length;
         const linksCount = data.links.length;
-        const cocktailsCount = data.nodes.filter(n => n.type === 'cocktail').length;
-        const ingredientsCount = data.nodes.filter(n => n.type === 'ingredient').length;
+        // Community supernodes carry the counts of the nodes they collapse
+        const countType = (type, field) => data.nodes.reduce(
+            (total, n) => total + (n.type === type ? 1 : n.type === 'community' ? (n[field] || 0) : 0), 0);
+        const cocktailsCount = countType('cocktail', 'cocktails');
+        const ingredientsCount = countType('ingredient', 'ingredients');
         
         if (this.elements.nodesCount) {
             this.elements.nodesCount.textContent = nodesCount;